@@ -0,0 +1,46 @@
+"""Add denormalized registration/comment counters to events
+
+Revision ID: 3b9f1c2d7a41
+Revises: 6e22e296fc8d
+Create Date: 2025-06-02 10:12:31.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3b9f1c2d7a41'
+down_revision: Union[str, None] = '6e22e296fc8d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = ('registrations_count', 'confirmed_count', 'comments_count', 'rating_sum')
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        for name in COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the source tables
+    op.execute("""
+        UPDATE events SET
+            registrations_count = (
+                SELECT COUNT(*) FROM registrations WHERE registrations.event_id = events.id),
+            confirmed_count = (
+                SELECT COUNT(*) FROM registrations
+                WHERE registrations.event_id = events.id
+                AND registrations.status IN ('CONFIRMED', 'ATTENDED')),
+            comments_count = (
+                SELECT COUNT(*) FROM comments WHERE comments.event_id = events.id),
+            rating_sum = (
+                SELECT COALESCE(SUM(rating), 0) FROM comments WHERE comments.event_id = events.id)
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        for name in reversed(COUNTERS):
+            batch_op.drop_column(name)
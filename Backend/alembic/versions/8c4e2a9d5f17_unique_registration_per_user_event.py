@@ -0,0 +1,44 @@
+"""Unique registration per (user_id, event_id)
+
+Revision ID: 8c4e2a9d5f17
+Revises: 3b9f1c2d7a41
+Create Date: 2025-06-03 14:27:05.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8c4e2a9d5f17'
+down_revision: Union[str, None] = '3b9f1c2d7a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the oldest registration of every duplicated (user_id, event_id) pair
+    op.execute("""
+        DELETE FROM registrations
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM registrations GROUP BY user_id, event_id
+        )
+    """)
+    op.execute("""
+        UPDATE events SET
+            registrations_count = (
+                SELECT COUNT(*) FROM registrations WHERE registrations.event_id = events.id),
+            confirmed_count = (
+                SELECT COUNT(*) FROM registrations
+                WHERE registrations.event_id = events.id
+                AND registrations.status IN ('CONFIRMED', 'ATTENDED'))
+    """)
+
+    with op.batch_alter_table('registrations') as batch_op:
+        batch_op.create_unique_constraint('uq_registrations_user_event', ['user_id', 'event_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('registrations') as batch_op:
+        batch_op.drop_constraint('uq_registrations_user_event', type_='unique')
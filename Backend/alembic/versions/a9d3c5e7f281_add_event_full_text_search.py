@@ -0,0 +1,88 @@
+"""Add a full-text search index over event title, location and description
+
+PostgreSQL gets a weighted tsvector column kept up to date by a trigger and
+a GIN index; SQLite gets an external-content FTS5 table with sync triggers.
+The DDL mirrors services/search.py at the time of this revision.
+
+Revision ID: a9d3c5e7f281
+Revises: f2b8d4e61a75
+Create Date: 2025-06-14 15:21:38.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = 'a9d3c5e7f281'
+down_revision: Union[str, None] = 'f2b8d4e61a75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.add_column('events', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute("""
+            CREATE OR REPLACE FUNCTION events_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.location, '')), 'B') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER events_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF title, location, description ON events
+            FOR EACH ROW EXECUTE FUNCTION events_search_vector_update()
+        """)
+        op.execute("UPDATE events SET title = title")
+        op.create_index('ix_events_search_vector', 'events', ['search_vector'], postgresql_using='gin')
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE events_fts USING fts5(
+                title, location, description,
+                content='events', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER events_fts_insert AFTER INSERT ON events BEGIN
+                INSERT INTO events_fts(rowid, title, location, description)
+                VALUES (new.id, new.title, new.location, new.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER events_fts_delete AFTER DELETE ON events BEGIN
+                INSERT INTO events_fts(events_fts, rowid, title, location, description)
+                VALUES ('delete', old.id, old.title, old.location, old.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER events_fts_update AFTER UPDATE OF title, location, description ON events BEGIN
+                INSERT INTO events_fts(events_fts, rowid, title, location, description)
+                VALUES ('delete', old.id, old.title, old.location, old.description);
+                INSERT INTO events_fts(rowid, title, location, description)
+                VALUES (new.id, new.title, new.location, new.description);
+            END
+        """)
+        op.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_events_search_vector', table_name='events')
+        op.execute("DROP TRIGGER IF EXISTS events_search_vector_trigger ON events")
+        op.execute("DROP FUNCTION IF EXISTS events_search_vector_update()")
+        op.drop_column('events', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS events_fts_insert")
+        op.execute("DROP TRIGGER IF EXISTS events_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS events_fts_update")
+        op.execute("DROP TABLE IF EXISTS events_fts")
@@ -0,0 +1,87 @@
+"""Add composite and partial indexes for the hot query shapes
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY, outside
+a transaction, so the tables stay writable while they build. If the upgrade
+is interrupted, a half-built index is left behind as INVALID: drop it and
+run the upgrade again.
+
+Revision ID: b5e8f1a3c794
+Revises: a9d3c5e7f281
+Create Date: 2025-06-16 10:08:44.519273
+
+"""
+from contextlib import contextmanager
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b5e8f1a3c794'
+down_revision: Union[str, None] = 'a9d3c5e7f281'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_events_start_datetime_id', 'events', ['start_datetime', 'id'], None),
+    ('ix_events_category_start_datetime', 'events', ['category', 'start_datetime'], None),
+    ('ix_events_organizer_id', 'events', ['organizer_id'], None),
+    ('ix_comments_event_created', 'comments', ['event_id', 'created_at', 'id'], None),
+    ('ix_registrations_event_status', 'registrations', ['event_id', 'status'], None),
+    ('ix_registrations_user_date', 'registrations', ['user_id', 'registration_date', 'id'], None),
+    ('ix_registrations_waitlist', 'registrations', ['event_id', 'waitlist_ticket'], 'waitlist_ticket IS NOT NULL'),
+    ('ix_password_resets_user_id', 'password_resets', ['user_id'], None),
+    ('ix_password_resets_expires_at', 'password_resets', ['expires_at'], None),
+    ('ix_email_verifications_user_id', 'email_verifications', ['user_id'], None),
+    ('ix_email_verifications_expires_at', 'email_verifications', ['expires_at'], None),
+]
+
+# Superseded by ix_registrations_event_status and the partial ix_registrations_waitlist
+OLD_WAITLIST_INDEX = ('ix_registrations_event_waitlist', 'registrations', ['event_id', 'waitlist_ticket'], None)
+
+
+@contextmanager
+def _index_ddl():
+    """Yields whether to build concurrently (PostgreSQL, outside a transaction block)."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            yield True
+    else:
+        yield False
+
+
+def _existing_tables():
+    # password_resets and email_verifications are created by the app (create_all), with these indexes
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _create(name, table, columns, where, concurrently):
+    where = sa.text(where) if where else None
+    op.create_index(
+        name, table, columns,
+        postgresql_concurrently=concurrently, postgresql_where=where, sqlite_where=where,
+    )
+
+
+def _drop(name, table, concurrently):
+    op.drop_index(name, table_name=table, postgresql_concurrently=concurrently)
+
+
+def upgrade() -> None:
+    tables = _existing_tables()
+    with _index_ddl() as concurrently:
+        for name, table, columns, where in INDEXES:
+            if table in tables:
+                _create(name, table, columns, where, concurrently)
+        _drop(OLD_WAITLIST_INDEX[0], OLD_WAITLIST_INDEX[1], concurrently)
+
+
+def downgrade() -> None:
+    tables = _existing_tables()
+    with _index_ddl() as concurrently:
+        _create(*OLD_WAITLIST_INDEX, concurrently)
+        for name, table, _, _ in reversed(INDEXES):
+            if table in tables:
+                _drop(name, table, concurrently)
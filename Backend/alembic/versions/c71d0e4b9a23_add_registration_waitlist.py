@@ -0,0 +1,37 @@
+"""Add waitlist tickets to registrations and waitlist counters to events
+
+Revision ID: c71d0e4b9a23
+Revises: 8c4e2a9d5f17
+Create Date: 2025-06-05 09:48:12.337640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c71d0e4b9a23'
+down_revision: Union[str, None] = '8c4e2a9d5f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.add_column(sa.Column('waitlist_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('waitlist_served', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('registrations') as batch_op:
+        batch_op.add_column(sa.Column('waitlist_ticket', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_registrations_event_waitlist', ['event_id', 'waitlist_ticket'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('registrations') as batch_op:
+        batch_op.drop_index('ix_registrations_event_waitlist')
+        batch_op.drop_column('waitlist_ticket')
+
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('waitlist_served')
+        batch_op.drop_column('waitlist_count')
@@ -0,0 +1,27 @@
+"""Add image_variants to events for the resized event images
+
+Revision ID: d6f1a8c3e52b
+Revises: b5e8f1a3c794
+Create Date: 2025-06-18 14:21:37.604912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd6f1a8c3e52b'
+down_revision: Union[str, None] = 'b5e8f1a3c794'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.add_column(sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('events') as batch_op:
+        batch_op.drop_column('image_variants')
@@ -0,0 +1,27 @@
+"""Add token_version to users for revoking issued access tokens
+
+Revision ID: f2b8d4e61a75
+Revises: e4a7b2c9d013
+Create Date: 2025-06-12 09:47:03.226815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f2b8d4e61a75'
+down_revision: Union[str, None] = 'e4a7b2c9d013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_version')
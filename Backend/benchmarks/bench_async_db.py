@@ -0,0 +1,131 @@
+"""
+Throughput of the async route handlers with and without the async engine.
+
+Starts the API once per mode (`DATABASE_ASYNC=false`, then `true`) with
+uvicorn on a free port and the database configured in `.env`. For each
+mode, `--concurrency` clients call DB-backed `async def` endpoints in a
+loop for `--duration` seconds: `/api/auth/me`, `/api/users/me/registrations`
+and `/api/admin/stats`. The benchmark reports requests per second and
+p50/p99 latency per mode.
+
+In "sync" mode these handlers run their queries on the threadpool
+(`database.ThreadedSession`). In "async" mode they use an `AsyncSession`
+on asyncpg or aiosqlite. `DATABASE_ASYNC` must not be set in `.env`,
+because it would override the mode chosen here.
+
+Usage:
+    python benchmarks/bench_async_db.py
+    python benchmarks/bench_async_db.py --concurrency 100 --duration 20
+    python benchmarks/bench_async_db.py --base-url http://127.0.0.1:8000   # measure a running server only
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import settings
+
+ENDPOINTS = ["/api/auth/me", "/api/users/me/registrations", "/api/admin/stats"]
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(async_mode, port, workers):
+    env = dict(os.environ, DATABASE_ASYNC="true" if async_mode else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit("The API did not start within 60 seconds")
+
+async def client_loop(client, headers, stop, latencies, outcomes):
+    i = 0
+    while not stop.is_set():
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            outcomes[response.status_code] += 1
+        except httpx.TransportError as e:
+            outcomes[type(e).__name__] += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def measure(base_url, headers, concurrency, duration):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        # Warm up connections and caches
+        await asyncio.gather(*(client.get(path, headers=headers) for path in ENDPOINTS))
+
+        stop = asyncio.Event()
+        latencies, outcomes = [], Counter()
+        tasks = [asyncio.create_task(client_loop(client, headers, stop, latencies, outcomes))
+                 for _ in range(concurrency)]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        return latencies, outcomes
+
+def run(label, base_url, args):
+    response = httpx.post(f"{base_url}/api/auth/login", timeout=30,
+                          json={"email": args.email, "password": args.password})
+    if response.status_code != 200:
+        sys.exit(f"Login as {args.email} failed ({response.status_code}): {response.text}")
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    latencies, outcomes = asyncio.run(measure(base_url, headers, args.concurrency, args.duration))
+    statuses = ", ".join(f"{code}: {count}" for code, count in sorted(outcomes.items(), key=str))
+    print(f"{label:<6} {len(latencies) / args.duration:8.1f} req/s  p50={percentile(latencies, 50):6.1f} ms  "
+          f"p99={percentile(latencies, 99):6.1f} ms  ({statuses})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Measure an already running server instead of starting one per mode")
+    parser.add_argument("--email", default=settings.FIRST_ADMIN_EMAIL)
+    parser.add_argument("--password", default=settings.FIRST_ADMIN_PASSWORD)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    args = parser.parse_args()
+
+    print(f"{args.concurrency} clients, {args.duration:.0f}s per mode, endpoints: {', '.join(ENDPOINTS)}")
+    if args.base_url:
+        run("server", args.base_url, args)
+        return
+
+    for async_mode in (False, True):
+        server, base_url = start_server(async_mode, free_port(), args.workers)
+        try:
+            run("async" if async_mode else "sync", base_url, args)
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
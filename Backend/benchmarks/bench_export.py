@@ -0,0 +1,141 @@
+"""
+Memory use of exporting a large event's registrations: the JSON list
+endpoint against the streaming CSV/NDJSON export.
+
+Seeds a scratch SQLite database with one event and `--rows` registrations
+(one user each), then runs every mode in a fresh interpreter so their
+memory does not mix:
+
+    list     GET /api/events/{id}/registrations: ORM objects, one JSON body
+    csv      GET /api/events/{id}/registrations/export?format=csv, chunks discarded
+    ndjson   the same with format=ndjson
+
+For each mode the benchmark reports the time to the first byte, the total
+time, the growth of the resident set size over the interpreter's baseline at
+the start, middle and end of the export, and the largest growth seen
+(sampled per chunk for the exports). A streaming export should stay flat
+however many rows there are.
+
+Usage:
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --rows 500000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import models
+
+def rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+def seed(url, count):
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(models.User), [
+            {"email": f"user{i}@example.com", "full_name": f"Registrant Number {i}", "hashed_password": "x"}
+            for i in range(count + 1)
+        ])
+        connection.execute(insert(models.Event).values(
+            title="Big event", description="Benchmark", category="culture", location="Stadium",
+            start_datetime=now + timedelta(days=30), end_datetime=now + timedelta(days=31), organizer_id=1,
+        ))
+        connection.execute(insert(models.Registration), [
+            {"user_id": i + 2, "event_id": 1, "status": models.RegistrationStatus.CONFIRMED,
+             "registration_date": now - timedelta(seconds=count - i)}
+            for i in range(count)
+        ])
+    engine.dispose()
+
+def run_child(url, mode, rows):
+    """Runs one mode in this (fresh) interpreter and prints its numbers as JSON."""
+    from typing import List
+
+    from pydantic import TypeAdapter
+
+    import schemas
+    from routes import event as event_routes
+    from services.export import export_registrations
+
+    Session = sessionmaker(bind=create_engine(url))
+    admin = SimpleNamespace(id=1, is_admin=True)
+    baseline = rss_mb()
+    samples = {}
+    started = time.perf_counter()
+
+    if mode == "list":
+        with Session() as db:
+            registrations = event_routes.get_event_registrations(event_id=1, db=db, current_user=admin)
+            adapter = TypeAdapter(List[schemas.Registration])
+            samples["middle"] = rss_mb() - baseline
+            validated = adapter.validate_python(registrations, from_attributes=True)
+            peak = rss_mb() - baseline
+            body = adapter.dump_json(validated)
+            first_byte = time.perf_counter() - started  # the body is sent only once it is complete
+            samples["end"] = rss_mb() - baseline
+            peak = max(peak, samples["end"])
+            size = len(body)
+        samples["start"] = None
+    else:
+        db = Session()
+        first_byte, size, sent_rows, peak = None, 0, 0, 0.0
+        for chunk in export_registrations(db, 1, 0, mode):
+            peak = max(peak, rss_mb() - baseline)
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+                samples["start"] = rss_mb() - baseline
+            size += len(chunk)
+            sent_rows += chunk.count(b"\n")
+            if "middle" not in samples and sent_rows >= rows // 2:
+                samples["middle"] = rss_mb() - baseline
+        samples["end"] = rss_mb() - baseline
+
+    print(json.dumps({
+        "first_byte": first_byte, "total": time.perf_counter() - started, "size": size,
+        "samples": samples, "peak": peak,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args.url, args.child, args.rows)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        url = f"sqlite:///{os.path.join(scratch, 'export.db')}"
+        seed(url, args.rows)
+        print(f"{args.rows} registrations; RSS growth in MB over the interpreter baseline")
+        print(f"{'mode':<8} {'first byte':>11} {'total':>8} {'MB out':>7} {'start':>7} {'middle':>7} {'end':>7} {'peak':>7}")
+        for mode in ("list", "csv", "ndjson"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, "--url", url, "--rows", str(args.rows)],
+                capture_output=True, text=True, check=True, cwd=BACKEND_DIR,
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            samples = result["samples"]
+            cells = [f"{samples[key]:7.1f}" if samples.get(key) is not None else f"{'-':>7}"
+                     for key in ("start", "middle", "end")]
+            print(f"{mode:<8} {result['first_byte'] * 1000:9.0f}ms {result['total']:7.2f}s "
+                  f"{result['size'] / 2 ** 20:7.1f} {' '.join(cells)} {result['peak']:7.1f}")
+
+if __name__ == "__main__":
+    main()
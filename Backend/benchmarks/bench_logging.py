@@ -0,0 +1,125 @@
+"""
+Throughput of `list_events` under different logging setups.
+
+Seeds a scratch SQLite database with `--events` upcoming events and calls
+the `list_events` handler directly (response cache bypassed) in a loop for
+`--seconds` per setup:
+
+    legacy            root logger at DEBUG with a synchronous file handler, plus the
+                      ten eagerly formatted f-string debug lines list_events used to emit
+    debug-sync        today's handler, root at DEBUG, synchronous file handler
+    pipeline-debug    services.logs pipeline (queue + writer thread, JSON) at DEBUG
+    pipeline-sampled  the same, keeping 1% of the routes.event DEBUG records
+    pipeline-info     the same at INFO (the default): debug calls cost a level check
+
+Records go to a temporary file, so the synchronous setups pay for real
+writes. The benchmark reports requests per second and the bytes logged per
+request for each setup.
+
+Usage:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --events 2000 --limit 50 --seconds 5
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import models
+from routes.event import list_events
+from services.logs import configure_logging, shutdown_logging
+
+legacy_logger = logging.getLogger("routes.event")
+
+def legacy_logging(skip, limit, category, upcoming_only, cursor, result):
+    # The debug lines list_events emitted before the logging pipeline, verbatim
+    legacy_logger.debug("Starting list_events function")
+    legacy_logger.debug(f"Parameters: skip={skip}, limit={limit}, category={category}, upcoming_only={upcoming_only}, cursor={cursor}")
+    legacy_logger.debug("Created filtered query")
+    legacy_logger.debug("Ordering by start_datetime")
+    legacy_logger.debug(f"Applying offset {skip} and limit {limit}")
+    legacy_logger.debug(f"Found {len(result)} events")
+    for event in result[:4]:
+        legacy_logger.debug(f"Event found: {event.title}")
+        legacy_logger.debug(f"Event registration_link: {event.registration_link}")
+
+def seed(engine, count):
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        organizer_id = connection.execute(insert(models.User).values(
+            email="bench@eventnow.com", full_name="Bench", hashed_password="x", role="admin",
+        )).inserted_primary_key[0]
+        connection.execute(insert(models.Event), [
+            {"title": f"Event {i}", "description": "Benchmark event", "category": "workshop",
+             "location": "Hall", "start_datetime": now + timedelta(hours=i + 1),
+             "end_datetime": now + timedelta(hours=i + 3), "organizer_id": organizer_id}
+            for i in range(count)
+        ])
+
+def sync_logging(path):
+    root = logging.getLogger()
+    shutdown_logging()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    handler = logging.StreamHandler(open(path, "a"))
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+
+def pipeline_logging(path, level, sample_rates=""):
+    configure_logging(level, "json", sample_rates, stream=open(path, "a"))
+
+def measure(Session, args, legacy):
+    requests = 0
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    while time.perf_counter() < deadline:
+        with Session() as db:
+            result = list_events.__wrapped__(request=None, skip=0, limit=args.limit, category=None,
+                                             upcoming_only=True, cursor=None, db=db)
+            if legacy:
+                legacy_logging(0, args.limit, None, True, None, result)
+        requests += 1
+    return requests / (time.perf_counter() - started), requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=20, help="Page size of each list_events call")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duration per setup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        seed(engine, args.events)
+        Session = sessionmaker(bind=engine)
+
+        setups = [
+            ("legacy", lambda path: sync_logging(path), True),
+            ("debug-sync", lambda path: sync_logging(path), False),
+            ("pipeline-debug", lambda path: pipeline_logging(path, "DEBUG"), False),
+            ("pipeline-sampled", lambda path: pipeline_logging(path, "DEBUG", "routes.event=0.01"), False),
+            ("pipeline-info", lambda path: pipeline_logging(path, "INFO"), False),
+        ]
+        print(f"{'setup':<17} {'req/s':>9} {'bytes/req':>10}")
+        for name, setup, legacy in setups:
+            path = os.path.join(scratch, f"{name}.log")
+            setup(path)
+            throughput, requests = measure(Session, args, legacy)
+            shutdown_logging()  # drains the queue before the file is measured
+            for handler in logging.getLogger().handlers:
+                handler.flush()
+            print(f"{name:<17} {throughput:9.0f} {os.path.getsize(path) / requests:10.1f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Latency of cheap endpoints during a login flood.
+
+Measures p50/p95/p99 latency of `GET /api/health` and `GET /api/events/`
+twice: first on an idle server, then while `--concurrency` clients
+call `POST /api/auth/login` in a loop. Each login costs one bcrypt verify.
+If bcrypt runs on the event loop, the probes queue behind it and p99
+jumps by hundreds of milliseconds. With `services.hashing` the probes
+should stay close to their idle latency, and logins beyond
+`PASSWORD_HASH_MAX_PENDING` are shed with 503.
+
+Start the API first (a single worker makes the effect visible), then run:
+    uvicorn main:app --port 8000
+    python benchmarks/bench_login_flood.py
+    python benchmarks/bench_login_flood.py --concurrency 64 --duration 20
+
+The flood logs in as the first admin user by default; pass --email and
+--password to use another account.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import settings
+
+PROBES = ["/api/health", "/api/events/?limit=10"]
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+async def probe(client, path, interval, stop, latencies, errors):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code != 200:
+                errors[path] += 1
+        except httpx.TimeoutException:
+            errors[path] += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+
+async def login_loop(client, credentials, stop, outcomes):
+    while not stop.is_set():
+        try:
+            response = await client.post("/api/auth/login", json=credentials)
+        except httpx.TimeoutException:
+            outcomes["timeout"] += 1
+            continue
+        outcomes[response.status_code] += 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+async def measure(base_url, duration, interval, concurrency, credentials):
+    limits = httpx.Limits(max_connections=concurrency + len(PROBES) + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=10, limits=limits) as client:
+        stop = asyncio.Event()
+        latencies = {path: [] for path in PROBES}
+        errors = Counter()
+        outcomes = Counter()
+
+        tasks = [asyncio.create_task(probe(client, path, interval, stop, latencies[path], errors)) for path in PROBES]
+        tasks += [asyncio.create_task(login_loop(client, credentials, stop, outcomes)) for _ in range(concurrency)]
+
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        return latencies, errors, outcomes
+
+def report(title, latencies, errors, outcomes, duration):
+    print(title)
+    for path, samples in latencies.items():
+        print(f"  {path:<24} n={len(samples):<5} p50={percentile(samples, 50):7.1f} ms  "
+              f"p95={percentile(samples, 95):7.1f} ms  p99={percentile(samples, 99):7.1f} ms  "
+              f"max={max(samples):7.1f} ms  errors={errors[path]}")
+    if outcomes:
+        logins = sum(outcomes.values())
+        statuses = ", ".join(f"{code}: {count}" for code, count in sorted(outcomes.items(), key=str))
+        print(f"  logins: {logins} ({logins / duration:.1f}/s) -> {statuses}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", default=settings.FIRST_ADMIN_EMAIL)
+    parser.add_argument("--password", default=settings.FIRST_ADMIN_PASSWORD)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent login clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.02, help="Pause between probe requests")
+    args = parser.parse_args()
+
+    credentials = {"email": args.email, "password": args.password}
+    response = httpx.post(f"{args.base_url}/api/auth/login", json=credentials, timeout=30)
+    if response.status_code != 200:
+        sys.exit(f"Login as {args.email} failed ({response.status_code}): {response.text}")
+
+    idle, errors, _ = asyncio.run(measure(args.base_url, args.duration, args.interval, 0, credentials))
+    report("Idle:", idle, errors, None, args.duration)
+
+    flood, errors, outcomes = asyncio.run(
+        measure(args.base_url, args.duration, args.interval, args.concurrency, credentials)
+    )
+    report(f"Login flood ({args.concurrency} clients):", flood, errors, outcomes, args.duration)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Throughput benchmark for the email outbox and mail worker.
+
+Creates a throw-away database with a few thousand active users, queues one
+event notification per user through
+`services.notification_service.queue_event_notification` (the code
+`POST /api/events/` uses), then drains the outbox with `mail_worker.OutboxWorker`
+against the local SMTP sink in `services.smtp_sink`.
+
+Reports messages per second and the number of SMTP connections opened.
+`--per-message` also times the old behaviour of one SMTP connection per
+recipient for comparison.
+
+The run fails (exit code 1) if any email is left undelivered.
+
+Usage:
+    python benchmarks/bench_mail_outbox.py
+    python benchmarks/bench_mail_outbox.py --users 20000 --pool 4 --per-message
+    python benchmarks/bench_mail_outbox.py --fail-rate 0.05
+"""
+import argparse
+import json
+import os
+import smtplib
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import models
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from mail_worker import OutboxWorker
+from services.mailer import RateLimiter, SMTPPool, build_message, render_email
+from services.notification_service import queue_event_notification
+from services.outbox import outbox_depth
+from services.smtp_sink import SMTPSink
+
+def setup_database(url, users):
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    Session = sessionmaker(bind=engine, autoflush=False)
+    db = Session()
+    organizer = models.User(email="organizer@bench.local", hashed_password="x", full_name="Organizer")
+    db.add(organizer)
+    db.execute(
+        models.User.__table__.insert(),
+        [
+            {"email": f"user{i}@bench.local", "hashed_password": "x", "full_name": f"User {i}",
+             "role": models.UserRole.GENERAL, "is_active": True}
+            for i in range(users)
+        ],
+    )
+    db.flush()
+
+    event = models.Event(
+        title="Launch party",
+        description="Benchmark event",
+        category="meetup",
+        location="Main hall",
+        start_datetime=datetime.utcnow() + timedelta(days=7),
+        end_datetime=datetime.utcnow() + timedelta(days=7, hours=2),
+        organizer_id=organizer.id,
+    )
+    db.add(event)
+    db.flush()
+
+    started = time.perf_counter()
+    queued = queue_event_notification(db, event)
+    db.commit()
+    elapsed = time.perf_counter() - started
+    db.close()
+    return engine, Session, queued, elapsed
+
+def send_per_message(sink, Session, limit):
+    """One SMTP connection per email, as the BackgroundTasks implementation did."""
+    db = Session()
+    emails = db.query(models.EmailOutbox).order_by(models.EmailOutbox.id).limit(limit).all()
+    db.close()
+
+    started = time.perf_counter()
+    for email in emails:
+        message = build_message(email.recipient, email.subject, render_email(email.template_name, json.loads(email.body)))
+        with smtplib.SMTP(sink.host, sink.port) as client:
+            client.send_message(message)
+    return len(emails), time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Database URL (default: temporary SQLite file). "
+                        "Its tables are dropped and recreated, use a dedicated database.")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--pool", type=int, default=2, help="SMTP connections in the worker pool")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--rate-limit", type=int, default=0, help="Messages per minute (0 = unlimited)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of messages the sink rejects with 451")
+    parser.add_argument("--per-message", action="store_true",
+                        help="Also time one SMTP connection per email (on up to 1000 emails)")
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        tmpdir = tempfile.mkdtemp(prefix="eventnow_bench_")
+        url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    engine, Session, queued, enqueue_elapsed = setup_database(url, args.users)
+    print(f"Database:  {engine.url.render_as_string(hide_password=True)}")
+    print(f"Queued:    {queued} emails in {enqueue_elapsed * 1000:.0f} ms")
+
+    with SMTPSink(fail_rate=args.fail_rate) as sink:
+        if args.per_message:
+            count, elapsed = send_per_message(sink, Session, min(queued, 1000))
+            print(f"Per-message SMTP: {count} emails in {elapsed:.2f}s -> {count / elapsed:.0f} msg/s, "
+                  f"{sink.connections} connections")
+            sink.connections = sink.messages = 0
+
+        pool = SMTPPool(args.pool, host=sink.host, port=sink.port)
+        worker = OutboxWorker(
+            session_factory=Session,
+            pool=pool,
+            rate_limiter=RateLimiter(args.rate_limit),
+            batch_size=args.batch_size,
+            retry_base_seconds=0.001,
+        )
+        started = time.perf_counter()
+        deadline = started + 600
+        while time.perf_counter() < deadline:
+            worker.drain()
+            db = Session()
+            depth = outbox_depth(db)
+            db.close()
+            if not depth.get(models.OutboxStatus.PENDING) and not depth.get(models.OutboxStatus.SENDING):
+                break
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        worker.close()
+
+        print(f"Outbox worker:    {sink.messages} emails in {elapsed:.2f}s -> {sink.messages / elapsed:.0f} msg/s, "
+              f"{pool.connections_opened} connections (pool of {pool.size})")
+        if args.fail_rate:
+            print(f"Retried:   {sink.rejected} temporary failures")
+
+    print(f"Outbox:    {depth}")
+    engine.dispose()
+    sys.exit(0 if depth.get(models.OutboxStatus.SENT, 0) == queued else 1)
+
+if __name__ == "__main__":
+    main()
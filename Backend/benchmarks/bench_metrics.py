@@ -0,0 +1,100 @@
+"""
+Per-request cost of the metrics middleware.
+
+Drives a minimal ASGI app directly (no server, no HTTP parsing) `--requests`
+times, bare and wrapped, and reports the mean time per request:
+
+    bare        the app alone
+    metrics     wrapped in services.metrics.MetricsMiddleware
+    basehttp    wrapped in an empty Starlette BaseHTTPMiddleware, for scale
+
+The difference between `metrics` and `bare` is what recording latency,
+status and in-flight count adds to every request. Requests are spread over
+`--routes` route templates, as in a real app. The exposition rendering time
+for the resulting samples is reported too.
+
+Usage:
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --requests 200000 --routes 40
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from starlette.middleware.base import BaseHTTPMiddleware
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.metrics import Exposition, HttpMetrics, MetricsMiddleware
+
+async def app(scope, receive, send):
+    # What the router does: record the matched route in the scope, then respond
+    scope["route"] = scope["_route"]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+def receiver():
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # The client disconnects once the request body has been read
+        return messages.pop() if messages else {"type": "http.disconnect"}
+    return receive
+
+async def send(message):
+    pass
+
+async def passthrough(request, call_next):
+    return await call_next(request)
+
+def scopes(count, routes):
+    route_objects = [SimpleNamespace(path=f"/api/resource{i}/{{item_id}}") for i in range(routes)]
+    for i in range(count):
+        yield {
+            "type": "http", "method": "GET", "path": f"/api/resource{i % routes}/{i}",
+            "headers": [], "query_string": b"", "_route": route_objects[i % routes],
+        }
+
+async def run(asgi, count, routes):
+    requests = list(scopes(count, routes))
+    started = time.perf_counter()
+    for scope in requests:
+        await asgi(scope, receiver(), send)
+    return (time.perf_counter() - started) / count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--routes", type=int, default=20)
+    args = parser.parse_args()
+
+    metrics = HttpMetrics()
+    variants = {
+        "bare": app,
+        "metrics": MetricsMiddleware(app, metrics),
+        "basehttp": BaseHTTPMiddleware(app, dispatch=passthrough),
+    }
+    basehttp_count = max(1, args.requests // 10)  # an order of magnitude slower
+
+    results = {}
+    for name, asgi in variants.items():
+        count = basehttp_count if name == "basehttp" else args.requests
+        asyncio.run(run(asgi, min(count, 1000), args.routes))  # warm up
+        results[name] = asyncio.run(run(asgi, count, args.routes))
+
+    for name, seconds in results.items():
+        print(f"{name:<9} {seconds * 1e6:8.2f} us/request")
+    print(f"metrics overhead {(results['metrics'] - results['bare']) * 1e6:.2f} us/request")
+
+    started = time.perf_counter()
+    out = Exposition()
+    metrics.collect(out)
+    text = out.render()
+    print(f"exposition: {len(text.splitlines())} lines, {len(text)} bytes, "
+          f"rendered in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
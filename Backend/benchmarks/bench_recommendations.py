@@ -0,0 +1,136 @@
+"""
+Build time, memory and top-K latency of the recommendation model.
+
+Loads a `services.recommendation_model.RecommendationModel` with `--users`
+synthetic users, `--events` upcoming events and `--interactions`
+registrations and ratings (no database needed). It then reports:
+
+- build time and matrix memory;
+- p50/p99 of `recommend()` on a cache miss (one vectorized scoring over all
+  events) and on a cache hit;
+- the cost of recomputing one user's row after a write;
+- the same scoring written as a Python loop, for comparison.
+
+Needs numpy.
+
+Usage:
+    python benchmarks/bench_recommendations.py
+    python benchmarks/bench_recommendations.py --users 200000 --events 50000 --interactions 2000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import recommendation_model as recommendations
+from services.recommendation_model import Interaction, RecommendationModel, UpcomingEvent
+
+CATEGORIES = ["academic", "culture", "sports", "seminar", "workshop", "competition", "other"]
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def synthetic_data(users, events, interactions):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    upcoming = [
+        UpcomingEvent(i, rng.choice(CATEGORIES), now + timedelta(hours=rng.randint(1, 24 * 180)),
+                      int(rng.paretovariate(1.2)) - 1)
+        for i in range(1, events + 1)
+    ]
+    # Every user leans towards two categories
+    tastes = {user: rng.sample(CATEGORIES, 2) for user in range(1, users + 1)}
+    history = []
+    for _ in range(interactions):
+        user = rng.randint(1, users)
+        category = rng.choice(tastes[user]) if rng.random() < 0.8 else rng.choice(CATEGORIES)
+        when = now - timedelta(days=rng.uniform(0, 365))
+        weight = 2.0 if rng.random() < 0.3 else 1.0 if rng.random() < 0.9 else rng.choice([-1.0, -0.5, 0.5, 1.0])
+        history.append(Interaction(user, category, when, weight))
+    return upcoming, history
+
+def python_top(model, user_id, limit, now):
+    """The model's scoring without numpy: a loop over every event."""
+    row = model.affinity[model.users[user_id]].tolist()
+    total = sum(abs(value) for value in row) or 1.0
+    columns = {event_id: model.features[position].argmax() for event_id, position in model.events.items()}
+    scored = []
+    for event_id, position in model.events.items():
+        start = model.starts[position]
+        if start > now:
+            score = row[columns[event_id]] / total + recommendations.POPULARITY_WEIGHT * model.popularity[position]
+            scored.append((-score, start, event_id))
+    scored.sort()
+    return [event_id for _, _, event_id in scored[:limit]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--interactions", type=int, default=500000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000, help="Timed recommend() calls per case")
+    args = parser.parse_args()
+    if recommendations.np is None:
+        sys.exit("This benchmark needs numpy (pip install numpy)")
+
+    upcoming, history = synthetic_data(args.users, args.events, args.interactions)
+    model = RecommendationModel(refresh_seconds=0, half_life_days=90, history_days=365, cache_size=args.users)
+    started = time.perf_counter()
+    model.load(upcoming, history)
+    build_seconds = time.perf_counter() - started
+    stats = model.stats()
+    print(f"{stats['users']} users x {stats['categories']} categories, {stats['events']} events, "
+          f"{args.interactions} interactions")
+    print(f"build {build_seconds:.2f} s, matrices {stats['memory_bytes'] / 2**20:.1f} MiB")
+
+    rng = random.Random(7)
+    users = [rng.randint(1, args.users) for _ in range(args.requests)]
+    print(f"{'case':<24} {'p50 ms':>8} {'p99 ms':>8}")
+    for case in ("miss", "hit"):
+        if case == "miss":
+            model._top.clear()
+            model.cache_size = 0
+        else:
+            model.cache_size = args.users
+            for user in users:
+                model.recommend(None, user, args.limit)
+        samples = []
+        for user in users:
+            started = time.perf_counter()
+            model.recommend(None, user, args.limit)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(f"{'recommend (' + case + ')':<24} {percentile(samples, 50):>8.3f} {percentile(samples, 99):>8.3f}")
+
+    by_user = {}
+    for item in history:
+        by_user.setdefault(item.user_id, []).append(item)
+    samples = []
+    for user in users[:500]:
+        started = time.perf_counter()
+        with model._lock:
+            model._model.set_user(user, by_user.get(user, []))
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"{'row update':<24} {percentile(samples, 50):>8.3f} {percentile(samples, 99):>8.3f}")
+
+    now = time.time()
+    samples = []
+    different = 0
+    for user in users[:50]:
+        if user not in model._model.users:
+            continue
+        started = time.perf_counter()
+        expected = python_top(model._model, user, args.limit, now)
+        samples.append((time.perf_counter() - started) * 1000)
+        # float64 instead of float32 sums may order near-ties differently
+        different += expected != model._model.top(user, args.limit, now)[0]
+    print(f"{'python loop (miss)':<24} {percentile(samples, 50):>8.3f} {percentile(samples, 99):>8.3f}"
+          f"   ({different} of {len(samples)} lists differ)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Throughput of the public event reads with and without the response cache.
+
+Starts the API twice with uvicorn on a free port and the database configured
+in `.env`: first with `RESPONSE_CACHE_TTL_SECONDS=0` (cache off), then with
+the cache on. Each run has `--concurrency` clients fetching
+`GET /api/events/`, the detail, similar-events and comments of the first
+`--events` events for `--duration` seconds. The benchmark reports requests
+per second and p50/p99 latency.
+
+The database needs some upcoming events, for example from
+`python add_sample_data.py`.
+
+Usage:
+    python benchmarks/bench_response_cache.py
+    python benchmarks/bench_response_cache.py --concurrency 100 --duration 20 --events 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(ttl, port):
+    env = dict(os.environ, RESPONSE_CACHE_TTL_SECONDS=str(ttl))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit("The API did not start within 60 seconds")
+
+async def client_loop(client, paths, offset, stop, latencies, outcomes):
+    i = offset
+    while not stop.is_set():
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            outcomes[response.status_code] += 1
+        except httpx.TransportError as e:
+            outcomes[type(e).__name__] += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def measure(base_url, paths, concurrency, duration):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        stop = asyncio.Event()
+        latencies, outcomes = [], Counter()
+        tasks = [asyncio.create_task(client_loop(client, paths, n, stop, latencies, outcomes))
+                 for n in range(concurrency)]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        return latencies, outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--events", type=int, default=10, help="Events whose detail pages are fetched")
+    parser.add_argument("--ttl", type=float, default=60.0, help="RESPONSE_CACHE_TTL_SECONDS of the cached run")
+    args = parser.parse_args()
+
+    for label, ttl in (("no cache", 0), ("cache", args.ttl)):
+        server, base_url = start_server(ttl, free_port())
+        try:
+            events = httpx.get(f"{base_url}/api/events/", params={"limit": args.events}, timeout=30).json()
+            if not events:
+                sys.exit("No upcoming events in the database; add some first (python add_sample_data.py)")
+            paths = ["/api/events/", "/api/events/?limit=10"]
+            for event in events:
+                paths += [f"/api/events/{event['id']}", f"/api/recommendations/similar-events/{event['id']}",
+                          f"/api/comments/event/{event['id']}"]
+
+            latencies, outcomes = asyncio.run(measure(base_url, paths, args.concurrency, args.duration))
+            statuses = ", ".join(f"{code}: {count}" for code, count in sorted(outcomes.items(), key=str))
+            print(f"{label:<9} {len(latencies) / args.duration:8.1f} req/s  p50={percentile(latencies, 50):6.1f} ms  "
+                  f"p99={percentile(latencies, 99):6.1f} ms  ({statuses})")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Cost of building a large page of `GET /api/events/`: the ORM and Pydantic
+path against column rows encoded by `services.fast_json.RowEncoder`, with
+every field and with the `card` view (`?fields=card`).
+
+Seeds a scratch SQLite database with `--rows` events whose descriptions are
+`--description-bytes` long, and loads the first `--rows` of them,
+`--repeat` times per path. Each run reports the median time to load the
+page, the median time to turn it into JSON, and the size of the JSON:
+
+    orm+pydantic   full Event objects, TypeAdapter(List[schemas.Event]) validation and dump
+    rows+orjson    the schema's columns as rows, dicts in schema field order, orjson
+    card+orjson    only the columns of the card view: no description
+
+The first two paths must produce the same bytes, and the benchmark checks this.
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --rows 5000 --repeat 50 --description-bytes 8000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import models, schemas
+from services import fast_json
+from routes.event import EVENT_VIEWS
+from services.fast_json import RowEncoder, parse_fields
+
+def seed(engine, count, description_bytes):
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        organizer_id = connection.execute(insert(models.User).values(
+            email="bench@eventnow.com", full_name="Bench", hashed_password="x", role="admin",
+        )).inserted_primary_key[0]
+        connection.execute(insert(models.Event), [
+            {"title": f"Event {i}", "description": ("A benchmark event description. " * (description_bytes // 30 + 1))[:description_bytes],
+             "category": "workshop", "location": "Main hall", "start_datetime": now + timedelta(hours=i + 1),
+             "end_datetime": now + timedelta(hours=i + 3), "max_participants": 100,
+             "registration_link": f"https://example.com/events/{i}", "organizer_id": organizer_id,
+             "created_at": now, "updated_at": now}
+            for i in range(count)
+        ])
+
+def orm_pydantic(rows):
+    adapter = TypeAdapter(List[schemas.Event])
+    order = (models.Event.start_datetime, models.Event.id)
+
+    def load(db):
+        return db.query(models.Event).order_by(*order).limit(rows).all()
+
+    def encode(events):
+        return adapter.dump_json(adapter.validate_python(events, from_attributes=True), by_alias=True)
+
+    return load, encode
+
+def rows_orjson(rows, fields=None):
+    encoder = RowEncoder(models.Event, schemas.Event, fields)
+    order = (models.Event.start_datetime, models.Event.id)
+
+    def load(db):
+        return db.query(*encoder.columns).order_by(*order).limit(rows).all()
+
+    return load, encoder.encode
+
+def measure(Session, load, encode, repeat):
+    load_times, encode_times, body = [], [], None
+    for _ in range(repeat):
+        with Session() as db:
+            started = time.perf_counter()
+            page = load(db)
+            loaded = time.perf_counter()
+            body = encode(page)
+            load_times.append(loaded - started)
+            encode_times.append(time.perf_counter() - loaded)
+    return statistics.median(load_times), statistics.median(encode_times), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Events per page")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--description-bytes", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        seed(engine, args.rows, args.description_bytes)
+        Session = sessionmaker(bind=engine)
+
+        print(f"{args.rows} events per page, orjson {'installed' if fast_json.orjson else 'missing (stdlib json)'}")
+        print(f"{'path':<14} {'load ms':>9} {'json ms':>9} {'total ms':>9} {'KB':>7}")
+        bodies = []
+        card = parse_fields("card", schemas.Event, EVENT_VIEWS)
+        paths = (
+            ("orm+pydantic", orm_pydantic(args.rows)),
+            ("rows+orjson", rows_orjson(args.rows)),
+            ("card+orjson", rows_orjson(args.rows, card)),
+        )
+        for name, (load, encode) in paths:
+            load_s, encode_s, body = measure(Session, load, encode, args.repeat)
+            bodies.append(body)
+            print(f"{name:<14} {load_s * 1000:9.2f} {encode_s * 1000:9.2f} "
+                  f"{(load_s + encode_s) * 1000:9.2f} {len(body) / 1024:7.0f}")
+        assert bodies[0] == bodies[1], "the two paths produced different JSON"
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Memory footprint and lookup latency of the event autocomplete index.
+
+Fills a `services.suggest.SuggestIndex` with `--events` synthetic upcoming
+events (no database needed), then reports the build time, the index's own
+size estimate, the memory allocated while building it (tracemalloc), the
+cost of an incremental `add`, and p50/p99 latency of `suggest()` for exact
+prefixes and typos. The first lookup of a misspelt word is slower than the
+rest, which reuse its remembered matches; both show in p99.
+
+Usage:
+    python benchmarks/bench_suggest.py
+    python benchmarks/bench_suggest.py --events 100000 --repeat 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.suggest import Suggestion, SuggestIndex
+
+WORDS = (
+    "python jazz marathon workshop festival startup design robotics yoga chess photography "
+    "poetry cooking hackathon concert theatre gardening blockchain painting cinema dance "
+    "science history climate football volunteering networking meetup conference lecture"
+).split()
+PLACES = "Hall Auditorium Library Stadium Cafe Park Gallery Lab Campus Center".split()
+PREFIXES = {
+    "exact": ["p", "py", "pyth", "jazz con", "marathon", "robotics wor", "lib"],
+    "typo": ["pyhton", "jaz cocnert", "marahton", "robtics", "photgraphy", "gallrey"],
+}
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def synthetic_events(count):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    for i in range(1, count + 1):
+        # A tail of rarer words gives a realistic vocabulary size
+        words = rng.choices(WORDS, k=3) + [f"{rng.choice(WORDS)}{rng.randint(1, count // 10 + 1)}"]
+        yield Suggestion(i, " ".join(words).capitalize(), f"{rng.choice(PLACES)} {rng.randint(1, 50)}",
+                         now + timedelta(days=1, hours=rng.randint(0, 2000)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=100, help="Lookups per prefix")
+    parser.add_argument("--limit", type=int, default=8)
+    args = parser.parse_args()
+
+    events = list(synthetic_events(args.events))
+    index = SuggestIndex(refresh_seconds=0)
+    tracemalloc.start()
+    started = time.perf_counter()
+    index.load(events)
+    build_seconds = time.perf_counter() - started
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    samples = []
+    for event in events[:200]:
+        started = time.perf_counter()
+        index.add(event._replace(title=event.title + " updated"))
+        samples.append((time.perf_counter() - started) * 1000)
+
+    stats = index.stats()
+    print(f"{args.events} events, {stats['words']} words, {stats['postings']} postings")
+    print(f"build {build_seconds:.2f} s, index estimate {stats['memory_bytes'] / 2**20:.1f} MiB, "
+          f"allocated {allocated / 2**20:.1f} MiB ({allocated / args.events:.0f} B/event)")
+    print(f"add p50={percentile(samples, 50):.3f} ms p99={percentile(samples, 99):.3f} ms")
+
+    print(f"{'prefix':<16} {'kind':<6} {'hits':>4} {'p50 ms':>8} {'p99 ms':>8}")
+    for kind, prefixes in PREFIXES.items():
+        for prefix in prefixes:
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                hits = index.suggest(prefix, args.limit)
+                samples.append((time.perf_counter() - started) * 1000)
+            print(f"{prefix:<16} {kind:<6} {len(hits):>4} {percentile(samples, 50):8.3f} {percentile(samples, 99):8.3f}")
+
+if __name__ == "__main__":
+    main()
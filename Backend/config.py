@@ -16,12 +16,44 @@ class Settings(BaseSettings):
     DATABASE_PASSWORD: str = "postgres"
     DATABASE_HOST: str = "localhost"
     DATABASE_PORT: str = "5432"
+    DATABASE_ASYNC: bool = False  # Async route handlers use an asyncpg/aiosqlite engine
     
     # JWT settings
     SECRET_KEY: str = "your-secret-key-here"  # Change this in production
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+
+    # Authenticated user cache (services/user_cache.py)
+    USER_CACHE_SIZE: int = 10000             # Cached principals per process; 0 disables the cache
+    USER_CACHE_TTL_SECONDS: float = 60.0     # Upper bound on staleness for writes made elsewhere
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False    # Authorize from the signed id/role/active/ver claims without a DB lookup
     
+    # Response cache for public event reads (services/response_cache.py)
+    RESPONSE_CACHE_TTL_SECONDS: float = 60.0  # 0 disables the cache
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000    # Memory backend only
+    RESPONSE_CACHE_BACKEND: str = "memory"    # Options: memory (per process), redis (shared by all workers)
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Event title autocomplete (services/suggest.py)
+    SUGGEST_REFRESH_SECONDS: float = 300.0    # Rebuild from the database this often; 0 never
+
+    # Recommendation model (services/recommendation_model.py, needs numpy)
+    RECOMMENDATION_REFRESH_SECONDS: float = 900.0  # Rebuild from the database this often; 0 never
+    RECOMMENDATION_HALF_LIFE_DAYS: float = 90.0    # An interaction counts half as much after this long
+    RECOMMENDATION_HISTORY_DAYS: int = 365         # Older registrations and comments are ignored
+    RECOMMENDATION_CACHE_SIZE: int = 10000         # Cached top-K lists per process; 0 disables the cache
+
+    # SQL statement counting (services/query_counter.py)
+    QUERY_STATS_HEADERS: bool = False         # X-DB-Queries / X-DB-Time on every response, N+1 warnings in the log
+
+    # Logging (services/logs.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"                  # Options: json (one object per line), text
+    LOG_SAMPLE_RATES: str = ""                # e.g. "routes.event=0.01": fraction of DEBUG records kept per logger
+
+    # Prometheus metrics at /api/metrics (services/metrics.py)
+    METRICS_ENABLED: bool = True
+
     # CORS settings
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
     
@@ -37,6 +69,32 @@ class Settings(BaseSettings):
     MAIL_USE_CREDENTIALS: bool = True
     MAIL_VALIDATE_CERTS: bool = True
     
+    # Email outbox worker (mail_worker.py)
+    MAIL_POOL_SIZE: int = 2                  # Reused SMTP connections per worker
+    MAIL_RATE_LIMIT_PER_MINUTE: int = 600    # 0 disables rate limiting
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 2.0        # Seconds to sleep when the outbox is empty
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BASE_SECONDS: int = 30      # Doubles after every failed attempt
+    OUTBOX_LEASE_SECONDS: int = 300          # Claimed rows are retried after this if a worker dies
+    
+    # Event image uploads (services/images.py)
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024  # Larger uploads get 413
+    IMAGE_WORKERS: int = 1                   # Processes rendering resized variants; 0 renders on a background thread
+    IMAGE_STORAGE: str = "local"             # Options: local (static/event_images), s3 (needs boto3)
+    IMAGE_S3_BUCKET: str = ""
+    IMAGE_S3_ENDPOINT_URL: Optional[str] = None  # For S3-compatible services (MinIO, R2, ...)
+    IMAGE_S3_PUBLIC_URL: str = ""            # URL prefix the bucket's objects are served under
+    IMAGE_GC_INTERVAL_SECONDS: int = 3600    # Full sweeps for unreferenced images; 0 disables the collector
+    IMAGE_GC_GRACE_SECONDS: int = 3600       # Blobs written or touched more recently are never collected
+
+    # Manifest of static/ (services/static_manifest.py)
+    STATIC_MANIFEST_WATCH: bool = False      # Follow changes made by other processes with inotify (needs inotify_simple)
+    
+    # Password hashing (services/hashing.py)
+    PASSWORD_HASH_WORKERS: int = 2           # bcrypt processes; 0 hashes on the default threadpool
+    PASSWORD_HASH_MAX_PENDING: int = 64      # Queued hash/verify calls before answering 503
+    
     # First admin user (for initial setup)
     FIRST_ADMIN_EMAIL: str = "admin@eventnow.com"
     FIRST_ADMIN_PASSWORD: str = "admin123"  # Change this in production
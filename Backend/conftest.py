@@ -0,0 +1,72 @@
+"""Shared pytest fixtures."""
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from services import query_counter
+
+EVENT_START = datetime(2030, 5, 1, 9, 30)
+
+@pytest.fixture
+def db():
+    """
+    A session on a fresh in-memory database. Its one connection is shared by
+    every thread, so `sessionmaker(bind=db.get_bind())` opens more sessions on
+    the same data for request handlers; the engine is disposed on teardown.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def make_event(db):
+    """
+    `make_event(title="Jazz", ...)` adds an event to `db`, by default in the
+    "sports" category at `EVENT_START`, organized by one shared organizer.
+    Commit to give it an id.
+    """
+    organizer = models.User(email="organizer@example.com", full_name="Organizer", hashed_password="x")
+
+    def make(**fields):
+        start = fields.pop("start_datetime", EVENT_START)
+        event = models.Event(**{
+            "title": "Event", "description": "d", "category": "sports", "location": "Hall",
+            "start_datetime": start, "end_datetime": start, "organizer": organizer, **fields,
+        })
+        db.add(event)
+        return event
+
+    return make
+
+@pytest.fixture
+def query_budget():
+    """
+    `with query_budget(4): ...` fails when the block executes more than 4 SQL
+    statements, or the same SELECT shape repeatedly (an N+1 pattern).
+    Yields the `QueryLog` of the block.
+    """
+    query_counter.install()
+
+    @contextmanager
+    def budget(limit: int, label: str = "block"):
+        with query_counter.track_queries() as log:
+            yield log
+        repeated = log.repeated()
+        assert not repeated, f"{label} repeats statements (N+1): " + "; ".join(
+            f"{count}x {shape}" for shape, count in repeated.items()
+        )
+        assert log.count <= limit, (
+            f"{label} executed {log.count} statements, budget is {limit}:\n" + "\n".join(log.shapes)
+        )
+
+    return budget
@@ -1,9 +1,13 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import os
 from dotenv import load_dotenv
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from fastapi import Depends
+from starlette.concurrency import run_in_threadpool
+
+from services.metrics import MeteredQueuePool
 
 # Load environment variables from .env file
 load_dotenv(override=True)
@@ -15,18 +19,23 @@ DATABASE_USER = os.getenv('DATABASE_USER', 'postgres')
 DATABASE_PASSWORD = os.getenv('DATABASE_PASSWORD', 'yani12345')
 DATABASE_HOST = os.getenv('DATABASE_HOST', 'localhost')
 DATABASE_PORT = os.getenv('DATABASE_PORT', '5432')
+# Serve `get_async_db` from an asyncio engine (asyncpg / aiosqlite) instead of the threadpool
+DATABASE_ASYNC = os.getenv('DATABASE_ASYNC', 'false').lower() in ('1', 'true', 'yes')
 
 # Build connection URL
 if DATABASE_TYPE.lower() == 'postgresql':
     SQLALCHEMY_DATABASE_URL = f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
+    ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
     print(f"Connecting to PostgreSQL database at {DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}")
 else:
     SQLALCHEMY_DATABASE_URL = f"sqlite:///./{DATABASE_NAME}.db"
+    ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///./{DATABASE_NAME}.db"
     print("Using SQLite database (not recommended for production)")
 
 # Create SQLAlchemy engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    poolclass=MeteredQueuePool,  # QueuePool that feeds the /api/metrics pool stats
     pool_pre_ping=True,  # Enable connection health checks
     pool_recycle=300,     # Recycle connections after 5 minutes
     pool_size=5,          # Number of connections to keep open
@@ -50,6 +59,92 @@ def get_db():
     finally:
         db.close()
 
+# Async database access for `async def` route handlers.
+#
+# Handlers depend on `get_async_db` and use the awaitable SQLAlchemy 2.0 API
+# (`await db.execute(select(...))`, `await db.commit()`, ...). With
+# DATABASE_ASYNC enabled this is a real `AsyncSession` on an asyncio engine.
+# Otherwise it is a `ThreadedSession` that runs the same calls of the
+# request's regular `Session` on the threadpool, so the event loop is never
+# blocked either way. Existing sync helpers taking a `Session` can be called
+# from both with `await db.run_sync(fn, *args)`.
+
+class ThreadedSession:
+    """Awaitable facade over a sync `Session`, mirroring the `AsyncSession` API we use."""
+
+    def __init__(self, session: Session):
+        # Like AsyncSessionLocal: attributes read after `await db.commit()` must not
+        # lazy-load with blocking SQL on the event loop
+        session.expire_on_commit = False
+        self.sync_session = session
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance, *args, **kwargs) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    # Same pool as the sync engine; aiosqlite opens a connection per session instead
+    pool_options = {"pool_size": 5, "max_overflow": 10} if DATABASE_TYPE.lower() == 'postgresql' else {}
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=False,
+        **pool_options
+    )
+    # Objects stay usable after commit: expired attributes would need IO to reload
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    print(f"Async database access enabled ({async_engine.dialect.driver})")
+
+    async def get_async_db() -> AsyncGenerator:
+        """Dependency to get an AsyncSession"""
+        async with AsyncSessionLocal() as db:
+            yield db
+else:
+    async def get_async_db(db: Session = Depends(get_db)) -> AsyncGenerator:
+        """Dependency to get the request's DB session behind the awaitable API"""
+        yield ThreadedSession(db)
+
 def create_tables():
     """Create database tables"""
     from models.base import Base
@@ -0,0 +1,137 @@
+"""
+Outbox mail worker.
+
+Drains the `email_outbox` table in batches and delivers the emails over a
+small pool of reused SMTP connections, with per-minute rate limiting and
+exponential backoff for failed deliveries. Run it next to the API:
+
+    python mail_worker.py              # run until interrupted
+    python mail_worker.py --once       # drain what is due now and exit
+
+Several workers can run at the same time against PostgreSQL.
+"""
+import argparse
+import json
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import models  # noqa: F401 - register all models before the session is used
+from config import settings
+from database import SessionLocal
+from services.logs import configure_logging
+from services.mailer import RateLimiter, SMTPPool, build_message, is_permanent_failure, render_email
+from services.outbox import claim_batch, mark_failed, mark_sent
+
+logger = logging.getLogger("mail_worker")
+
+class OutboxWorker:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        pool=None,
+        rate_limiter=None,
+        batch_size=None,
+        max_attempts=None,
+        retry_base_seconds=None,
+        lease_seconds=None,
+    ):
+        self.session_factory = session_factory
+        self.pool = pool or SMTPPool.from_settings()
+        self.rate_limiter = rate_limiter or RateLimiter(settings.MAIL_RATE_LIMIT_PER_MINUTE)
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self.retry_base_seconds = retry_base_seconds or settings.OUTBOX_RETRY_BASE_SECONDS
+        self.lease_seconds = lease_seconds or settings.OUTBOX_LEASE_SECONDS
+        self.executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp")
+        self.running = True
+
+    def _deliver(self, item):
+        """Send one claimed email. Returns None on success or the exception."""
+        try:
+            html = render_email(item.template_name, json.loads(item.body))
+            message = build_message(item.recipient, item.subject, html)
+            self.rate_limiter.acquire()
+            with self.pool.connection() as connection:
+                connection.send(message)
+            return None
+        except Exception as e:
+            return e
+
+    def run_once(self) -> int:
+        """Deliver one batch of due emails. Returns the number of emails claimed."""
+        db = self.session_factory()
+        try:
+            batch = claim_batch(db, self.batch_size, self.lease_seconds)
+            if not batch:
+                return 0
+
+            results = list(self.executor.map(self._deliver, batch))
+
+            sent = [item.id for item, error in zip(batch, results) if error is None]
+            mark_sent(db, sent)
+            for item, error in zip(batch, results):
+                if error is not None:
+                    logger.warning("Delivery of outbox email %s failed: %s", item.id, error)
+                    mark_failed(
+                        db, item, str(error), self.max_attempts, self.retry_base_seconds,
+                        permanent=is_permanent_failure(error),
+                    )
+            db.commit()
+            logger.info("Outbox batch: %d sent, %d failed", len(sent), len(batch) - len(sent))
+            return len(batch)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def drain(self) -> int:
+        """Deliver batches until nothing is due. Returns the number of emails claimed."""
+        total = 0
+        while self.running:
+            claimed = self.run_once()
+            if not claimed:
+                break
+            total += claimed
+        return total
+
+    def run_forever(self, poll_interval=None) -> None:
+        poll_interval = poll_interval or settings.OUTBOX_POLL_INTERVAL
+        while self.running:
+            try:
+                if not self.run_once():
+                    time.sleep(poll_interval)
+            except Exception as e:
+                logger.error("Outbox worker error: %s", e, exc_info=True)
+                time.sleep(poll_interval)
+
+    def stop(self, *args) -> None:
+        self.running = False
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="Drain due emails and exit")
+    args = parser.parse_args()
+
+    configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_SAMPLE_RATES)
+    worker = OutboxWorker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    logger.info("Mail worker started (%s:%s, pool=%d)", settings.MAIL_SERVER, settings.MAIL_PORT, worker.pool.size)
+    try:
+        if args.once:
+            logger.info("Claimed %d emails", worker.drain())
+        else:
+            worker.run_forever()
+    finally:
+        worker.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,35 @@
+import logging
 import os
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 import models, schemas
 from database import engine, get_db
 from config import settings
+from services.logs import RequestIdMiddleware, configure_logging
 from security import get_password_hash
+from services.hashing import HashingOverloaded, hasher
+from services.image_gc import image_collector
+from services.images import image_pipeline
+from services import query_counter
+from services.metrics import MetricsMiddleware
+from services.recommendation_model import refresh as build_recommendation_model
+from services.search import install_search_index
+from services.static_files import CachedStaticFiles
+from services.static_manifest import static_manifest
+from services.suggest import refresh as build_suggest_index
+
+configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_SAMPLE_RATES)
+logger = logging.getLogger(__name__)
 
 # Import all routes
-from routes import auth, event, comment, registration, recommendation, password_reset, email_verification, user, static_test, admin
+from routes import auth, event, comment, registration, recommendation, password_reset, email_verification, user, static_test, admin, metrics
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
+install_search_index(engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -33,6 +49,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, status codes and in-flight requests for /api/metrics
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Statement count and time per request, for spotting N+1 queries while developing
+if settings.QUERY_STATS_HEADERS:
+    query_counter.install()
+
+    @app.middleware("http")
+    async def query_stats_headers(request: Request, call_next):
+        with query_counter.track_queries() as log:
+            response = await call_next(request)
+        response.headers.update(log.headers())
+        query_counter.report(log, f"{request.method} {request.url.path}")
+        return response
+
+# Outermost, so every log record of a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # Include API routes
 app.include_router(auth.router)
 app.include_router(event.router)
@@ -44,10 +79,22 @@ app.include_router(email_verification.router)
 app.include_router(user.router)
 app.include_router(static_test.router)
 app.include_router(admin.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
+
+# Shed load instead of queueing logins without bound (see services/hashing.py)
+@app.exception_handler(HashingOverloaded)
+async def hashing_overloaded_handler(request: Request, exc: HashingOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
 
 # Create static files directory for event images
 os.makedirs("static/event_images", exist_ok=True)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Long-lived caching for content-addressed images, conditional and range requests (services/static_files.py)
+app.mount("/static", CachedStaticFiles(directory="static", manifest=static_manifest), name="static")
 
 # Root endpoint
 @app.get("/")
@@ -75,12 +122,51 @@ def create_first_admin():
             )
             db.add(admin_user)
             db.commit()
-            print("Created first admin user")
+            logger.info("Created first admin user")
     except Exception as e:
-        print(f"Error creating first admin: {e}")
+        logger.error("Error creating first admin: %s", e)
     finally:
         db.close()
 
+@app.on_event("startup")
+def start_password_hasher():
+    hasher.start()
+
+@app.on_event("startup")
+def load_suggest_index():
+    build_suggest_index()
+
+@app.on_event("startup")
+def load_recommendation_model():
+    build_recommendation_model()
+
+@app.on_event("startup")
+def start_image_collector():
+    image_collector.start()
+
+@app.on_event("startup")
+def build_static_manifest():
+    static_manifest.build()
+    if settings.STATIC_MANIFEST_WATCH:
+        static_manifest.watch()
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    hasher.shutdown()
+
+@app.on_event("shutdown")
+def stop_image_pipeline():
+    # Let variants already being rendered finish
+    image_pipeline.shutdown()
+
+@app.on_event("shutdown")
+def stop_image_collector():
+    image_collector.shutdown()
+
+@app.on_event("shutdown")
+def stop_static_manifest():
+    static_manifest.stop()
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
@@ -5,6 +5,7 @@ from .comment import Comment
 from .registration import Registration, RegistrationStatus
 from .password_reset import PasswordReset
 from .email_verification import EmailVerification
+from .email_outbox import EmailOutbox, OutboxStatus
 
 __all__ = [
     'Base',
@@ -20,4 +21,6 @@ __all__ = [
     'RegistrationStatus',
     'PasswordReset',
     'EmailVerification',
+    'EmailOutbox',
+    'OutboxStatus',
 ]
\ No newline at end of file
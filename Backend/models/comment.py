@@ -1,10 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # An event's thread, newest first: (event_id, created_at DESC, id DESC) is a backward scan
+        Index('ix_comments_event_created', 'event_id', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from .base import Base
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+class EmailOutbox(Base):
+    """One email waiting to be delivered by mail_worker.py"""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String(320), nullable=False)
+    subject = Column(String(255), nullable=False)
+    template_name = Column(String(100), nullable=True)
+    body = Column(Text, nullable=False)  # JSON encoded template context
+    status = Column(String(20), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.id} to {self.recipient} ({self.status})>"
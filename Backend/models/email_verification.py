@@ -3,16 +3,16 @@ from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
 import uuid
 
-from database import Base
+from .base import Base
 
 class EmailVerification(Base):
     __tablename__ = "email_verifications"
 
     token = Column(String, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     email = Column(String, nullable=False)
     is_verified = Column(Boolean, default=False)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from .base import Base
 import enum
@@ -21,6 +21,12 @@ class EventStatus(enum.Enum):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Upcoming listings and keyset pages ordered by (start_datetime, id)
+        Index('ix_events_start_datetime_id', 'start_datetime', 'id'),
+        # Similar events and recommendations: category = / IN (...) and upcoming, soonest first
+        Index('ix_events_category_start_datetime', 'category', 'start_datetime'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -33,15 +39,25 @@ class Event(Base):
     max_participants = Column(Integer, nullable=True)
     registration_link = Column(String(500), nullable=True)
     image_url = Column(String(500), nullable=True)
+    # Resized versions of image_url by name and format, see services/images.py. NULL until rendered.
+    image_variants = Column(JSON, nullable=True)
     status = Column(String(50), default='upcoming')  # Menggunakan String alih-alih Enum
     is_featured = Column(Boolean, default=False)
     # Sementara komentar is_public karena kolom belum tersedia di database
     # is_public = Column(Boolean, default=True)  # Menambahkan field is_public dengan default True
+    # Denormalized counters kept in sync by services/event_counters.py
+    registrations_count = Column(Integer, default=0, server_default='0', nullable=False)
+    confirmed_count = Column(Integer, default=0, server_default='0', nullable=False)
+    comments_count = Column(Integer, default=0, server_default='0', nullable=False)
+    rating_sum = Column(Integer, default=0, server_default='0', nullable=False)
+    # Waitlist bookkeeping: tickets waitlist_served+1 .. waitlist_served+waitlist_count are queued
+    waitlist_count = Column(Integer, default=0, server_default='0', nullable=False)
+    waitlist_served = Column(Integer, default=0, server_default='0', nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Foreign Keys
-    organizer_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    organizer_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     
     # Relationships
     organizer = relationship("User", back_populates="events_created")
@@ -61,4 +77,4 @@ class Event(Base):
     def available_slots(self):
         if not self.max_participants:
             return float('inf')
-        return max(0, self.max_participants - len(self.registrations))
\ No newline at end of file
+        return max(0, self.max_participants - (self.confirmed_count or 0))
\ No newline at end of file
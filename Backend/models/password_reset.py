@@ -3,14 +3,14 @@ from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
 import uuid
 
-from database import Base
+from .base import Base
 
 class PasswordReset(Base):
     __tablename__ = "password_resets"
 
     token = Column(String, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    expires_at = Column(DateTime, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship
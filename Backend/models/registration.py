@@ -1,11 +1,11 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Enum, Boolean, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from .base import Base
 import enum
 
 class RegistrationStatus(enum.Enum):
-    PENDING = "pending"
+    PENDING = "pending"  # On the waitlist of a full event
     CONFIRMED = "confirmed"
     CANCELLED = "cancelled"
     ATTENDED = "attended"
@@ -13,6 +13,16 @@ class RegistrationStatus(enum.Enum):
 class Registration(Base):
     __tablename__ = "registrations"
     __table_args__ = (
+        UniqueConstraint('user_id', 'event_id', name='uq_registrations_user_event'),
+        Index('ix_registrations_event_status', 'event_id', 'status'),
+        # "My registrations", most recent first
+        Index('ix_registrations_user_date', 'user_id', 'registration_date', 'id'),
+        # Only waitlisted rows carry a ticket, so the ticket lookups get a small partial index
+        Index(
+            'ix_registrations_waitlist', 'event_id', 'waitlist_ticket',
+            postgresql_where=text('waitlist_ticket IS NOT NULL'),
+            sqlite_where=text('waitlist_ticket IS NOT NULL'),
+        ),
         {'sqlite_autoincrement': True},
     )
 
@@ -20,6 +30,8 @@ class Registration(Base):
     status = Column(Enum(RegistrationStatus), default=RegistrationStatus.PENDING)
     registration_date = Column(DateTime, default=datetime.utcnow)
     attended = Column(Boolean, default=False)
+    # FIFO ticket while waitlisted, NULL otherwise (see services/registration_service.py)
+    waitlist_ticket = Column(Integer, nullable=True)
     
     # Foreign Keys
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -29,5 +41,12 @@ class Registration(Base):
     user = relationship("User", back_populates="registrations")
     event = relationship("Event", back_populates="registrations")
     
+    @property
+    def waitlist_position(self):
+        """1-based position on the event waitlist, or None if not waitlisted."""
+        if self.waitlist_ticket is None:
+            return None
+        return self.waitlist_ticket - self.event.waitlist_served
+    
     def __repr__(self):
         return f"<Registration {self.user.email} for {self.event.title}>"
\ No newline at end of file
@@ -20,6 +20,8 @@ class User(Base):
     role = Column(Enum(UserRole), default=UserRole.GENERAL, nullable=False)
     is_active = Column(Boolean, default=True)
     email_verified = Column(Boolean, default=False)
+    # Bumped on password change/reset; tokens carrying an older "ver" claim are rejected
+    token_version = Column(Integer, default=0, server_default='0', nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
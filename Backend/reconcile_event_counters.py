@@ -0,0 +1,33 @@
+"""
+Rebuild the denormalized counters on the events table
+(registrations_count, confirmed_count, waitlist_count, comments_count,
+rating_sum) from the registrations and comments tables, and renumber each
+waitlist 1..n in queue order.
+
+Usage:
+    python reconcile_event_counters.py            # all events
+    python reconcile_event_counters.py 3 17 42    # only these event ids
+"""
+import sys
+
+import models  # noqa: F401 - register all models before the session is used
+from database import SessionLocal
+from services.event_counters import reconcile_event_counters
+
+def main():
+    event_ids = [int(arg) for arg in sys.argv[1:]] or None
+    
+    print("\n===== Reconciling event counters =====\n")
+    db = SessionLocal()
+    try:
+        updated = reconcile_event_counters(db, event_ids)
+        print(f"Counters rebuilt for {updated} event(s)")
+    except Exception as e:
+        db.rollback()
+        print(f"\nError: {str(e)}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
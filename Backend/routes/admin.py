@@ -1,40 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 import models, schemas
-from database import get_db
+from database import get_async_db
 from security import get_current_active_user, get_current_admin
+from services.image_gc import image_collector
+from services.recommendation_model import recommendation_model
+from services.response_cache import response_cache
+from services.suggest import suggest_index
+from services.user_cache import user_cache
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
 @router.get("/stats", response_model=dict)
-async def get_admin_stats(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_admin)):
+async def get_admin_stats(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_admin)):
     """
     Get admin dashboard statistics.
     Only accessible by admin users.
     """
     try:
         # Get total events count
-        total_events = db.query(models.Event).count()
+        total_events = await db.scalar(select(func.count(models.Event.id)))
         
         # Get upcoming events count
-        upcoming_events = db.query(models.Event).filter(
-            models.Event.start_datetime >= datetime.utcnow()
-        ).count()
+        upcoming_events = await db.scalar(
+            select(func.count(models.Event.id)).where(models.Event.start_datetime >= datetime.utcnow())
+        )
         
         # Get total users count
-        total_users = db.query(models.User).count()
+        total_users = await db.scalar(select(func.count(models.User.id)))
         
         # Get total registrations count
-        total_registrations = db.query(models.Registration).count()
+        total_registrations = await db.scalar(select(func.count(models.Registration.id)))
         
         # Get events by category
-        events_by_category = db.query(
-            models.Event.category, 
-            func.count(models.Event.id).label('count')
-        ).group_by(models.Event.category).all()
+        events_by_category = (await db.execute(
+            select(
+                models.Event.category, 
+                func.count(models.Event.id).label('count')
+            ).group_by(models.Event.category)
+        )).all()
         
         # Format events by category for response
         categories = []
@@ -45,10 +52,12 @@ async def get_admin_stats(db: Session = Depends(get_db), current_user: models.Us
             })
         
         # Get registrations by status
-        registrations_by_status = db.query(
-            models.Registration.status, 
-            func.count(models.Registration.id).label('count')
-        ).group_by(models.Registration.status).all()
+        registrations_by_status = (await db.execute(
+            select(
+                models.Registration.status, 
+                func.count(models.Registration.id).label('count')
+            ).group_by(models.Registration.status)
+        )).all()
         
         # Format registrations by status for response
         registration_stats = []
@@ -71,3 +80,43 @@ async def get_admin_stats(db: Session = Depends(get_db), current_user: models.Us
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error getting admin stats: {str(e)}"
         )
+
+@router.get("/auth-cache", response_model=dict)
+async def get_auth_cache_stats(current_user: models.User = Depends(get_current_admin)):
+    """
+    Hit/miss counters of this process's authenticated-user cache.
+    Only accessible by admin users.
+    """
+    return user_cache.stats()
+
+@router.get("/response-cache", response_model=dict)
+def get_response_cache_stats(current_user: models.User = Depends(get_current_admin)):
+    """
+    Hit/miss counters of the response cache for public event reads.
+    Only accessible by admin users.
+    """
+    return response_cache.stats()
+
+@router.get("/suggest-index", response_model=dict)
+def get_suggest_index_stats(current_user: models.User = Depends(get_current_admin)):
+    """
+    Size and memory footprint of this process's event autocomplete index.
+    Only accessible by admin users.
+    """
+    return suggest_index.stats()
+
+@router.get("/recommendation-model", response_model=dict)
+def get_recommendation_model_stats(current_user: models.User = Depends(get_current_admin)):
+    """
+    Size, age and top-K cache counters of this process's recommendation model.
+    Only accessible by admin users.
+    """
+    return recommendation_model.stats()
+
+@router.get("/image-gc", response_model=dict)
+def get_image_gc_stats(current_user: models.User = Depends(get_current_admin)):
+    """
+    Counters of this process's garbage collector for unreferenced event images.
+    Only accessible by admin users.
+    """
+    return image_collector.stats()
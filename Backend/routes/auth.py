@@ -1,39 +1,41 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import models, schemas
-from database import get_db
+from database import get_async_db
 from security import (
-    get_password_hash,
-    create_access_token,
+    create_user_token,
     get_current_user,
     get_current_active_user,
+    get_current_user_profile,
     oauth2_scheme,
-    pwd_context,
-    verify_password
 )
 from config import settings
+from services import response_cache, user_cache
+from services.hashing import hash_password, verify_and_update
 from services.email import send_verification_email, send_welcome_email
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=schemas.Token)
 async def register(
-    user_data: schemas.UserCreate, db: Session = Depends(get_db)
+    user_data: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)
 ):
     """Register a new user."""
     # Check if user already exists
-    db_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+    db_user = await db.scalar(select(models.User).where(models.User.email == user_data.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user (the DB connection goes back to the pool while bcrypt runs)
+    await db.close()
+    hashed_password = await hash_password(user_data.password)
     db_user = models.User(
         email=user_data.email,
         full_name=user_data.full_name,
@@ -43,13 +45,13 @@ async def register(
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Create email verification token
     verification_token = models.EmailVerification.create_token(db_user.id, db_user.email)
     db.add(verification_token)
-    db.commit()
+    await db.commit()
     
     # Send verification email asynchronously
     await send_verification_email(db_user.email, db_user.full_name, verification_token.token)
@@ -59,47 +61,57 @@ async def register(
     
     # Generate access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": db_user.email}, expires_delta=access_token_expires
-    )
+    access_token = create_user_token(db_user, expires_delta=access_token_expires)
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=schemas.LoginResponse)
 async def login(
     login_data: schemas.LoginRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Login user and return access token and user info."""
-    user = db.query(models.User).filter(models.User.email == login_data.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == login_data.email))
+    
+    valid, new_hash = (False, None)
+    if user:
+        # Hand the DB connection back to the pool while bcrypt runs
+        await db.close()
+        valid, new_hash = await verify_and_update(login_data.password, user.hashed_password)
     
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # The stored hash uses deprecated settings: replace it while we have the password
+    if new_hash:
+        user.hashed_password = new_hash
+        db.add(user)
+        await db.commit()
+    
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
     # Check if email is verified - only if verification is required
     if settings.REQUIRE_EMAIL_VERIFICATION and not user.email_verified:
         # Create a new verification token if needed
-        verification = db.query(models.EmailVerification).filter(
+        verification = await db.scalar(select(models.EmailVerification).where(
             models.EmailVerification.user_id == user.id,
             models.EmailVerification.is_verified == False
-        ).first()
+        ))
         
         if not verification or not verification.is_valid():
             # Create a new token if none exists or the existing one is expired
             if verification:
-                db.delete(verification)
-                db.commit()
+                await db.delete(verification)
+                await db.commit()
             
             verification_token = models.EmailVerification.create_token(user.id, user.email)
             db.add(verification_token)
-            db.commit()
+            await db.commit()
             
             # Send a new verification email
             await send_verification_email(user.email, user.full_name, verification_token.token)
@@ -110,9 +122,7 @@ async def login(
         )
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    access_token = create_user_token(user, expires_delta=access_token_expires)
     
     # Convert user model to dictionary for response
     user_dict = {
@@ -131,7 +141,7 @@ async def login(
     }
 
 @router.get("/me", response_model=schemas.UserResponse)
-async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
+async def read_users_me(current_user: models.User = Depends(get_current_user_profile)):
     """Get current user's profile."""
     return current_user
 
@@ -139,31 +149,39 @@ async def read_users_me(current_user: models.User = Depends(get_current_active_u
 async def update_user_me(
     user_update: schemas.UserBase,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update current user's profile."""
-    current_user.full_name = user_update.full_name
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    db_user = await db.get(models.User, current_user.id)
+    db_user.full_name = user_update.full_name
+    await db.commit()
+    await db.refresh(db_user)
+    user_cache.invalidate(db_user.email)
+    response_cache.invalidate(response_cache.author_tag(db_user.id))
+    return db_user
 
 @router.post("/change-password", status_code=status.HTTP_204_NO_CONTENT)
 async def change_password(
     password_data: schemas.ChangePassword,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Change current user's password."""
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    """Change current user's password. Tokens issued before the change stop working."""
+    db_user = await db.get(models.User, current_user.id)
+    # Hand the DB connection back to the pool while bcrypt runs
+    await db.close()
+    valid, _ = await verify_and_update(password_data.current_password, db_user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password",
         )
     
-    hashed_password = get_password_hash(password_data.new_password)
-    current_user.hashed_password = hashed_password
-    db.add(current_user)
-    db.commit()
+    # Update password and revoke the tokens issued before the change
+    db_user.hashed_password = await hash_password(password_data.new_password)
+    db_user.token_version = (db_user.token_version or 0) + 1
+    db.add(db_user)
+    await db.commit()
+    user_cache.invalidate(current_user.email)
     
     return None
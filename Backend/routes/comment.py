@@ -1,14 +1,44 @@
-from typing import List
+from typing import List, Optional, Union
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
 
 import models, schemas
 from database import get_db
 from security import get_current_active_user
+from services.pagination import MAX_PAGE_SIZE, InvalidCursor, keyset_paginate
+from services.event_counters import adjust_event_counters
+from services.recommendation_model import recommendation_model
+from services import response_cache
+from services.response_cache import author_tag, cached_response, comments_tag, event_stats_tag
 
 router = APIRouter(prefix="/api/comments", tags=["Comments"])
 
+def _comments_validators(params):
+    # The thread shows its authors' names, so a rename changes it too. No Last-Modified: deleting a
+    # comment leaves both maxima unchanged, only the count in the ETag moves.
+    row = (
+        params["db"].query(
+            func.count(models.Comment.id),
+            func.max(models.Comment.updated_at),
+            func.max(models.User.updated_at),
+        )
+        .select_from(models.Event)
+        .outerjoin(models.Comment, models.Comment.event_id == models.Event.id)
+        .outerjoin(models.User, models.User.id == models.Comment.author_id)
+        .filter(models.Event.id == params["event_id"])
+        .group_by(models.Event.id)
+        .first()
+    )
+    # Unknown event: no validators, so the handler answers 404
+    return (tuple(row), None) if row else None
+
+def _comments_tags(params, result):
+    comments = result["items"] if isinstance(result, dict) else result
+    authors = {comment.author_id for comment in comments}
+    return [comments_tag(params["event_id"])] + [author_tag(author_id) for author_id in authors]
+
 @router.post("/", response_model=schemas.Comment, status_code=status.HTTP_201_CREATED)
 def create_comment(
     comment: schemas.CommentCreate,
@@ -46,27 +76,52 @@ def create_comment(
     )
     
     db.add(db_comment)
+    adjust_event_counters(db, event.id, comments_count=1, rating_sum=db_comment.rating or 0)
     db.commit()
     db.refresh(db_comment)
+    response_cache.invalidate(comments_tag(event.id), event_stats_tag(event.id))
+    recommendation_model.invalidate_user(current_user.id)
     return db_comment
 
-@router.get("/event/{event_id}", response_model=List[schemas.CommentWithAuthor])
+@router.get("/event/{event_id}", response_model=Union[List[schemas.CommentWithAuthor], schemas.CommentPage])
+@cached_response(Union[List[schemas.CommentWithAuthor], schemas.CommentPage],
+                 _comments_tags,
+                 _comments_validators)
 def get_event_comments(
     event_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
 ):
-    """Get all comments for an event."""
+    """
+    Get all comments for an event, newest first.
+    
+    Pass `cursor` (empty for the first page) to use keyset pagination instead of skip/limit.
+    """
     # Check if event exists
     event = db.query(models.Event).filter(models.Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    return (
+    query = (
         db.query(models.Comment)
+        .options(joinedload(models.Comment.author))
         .filter(models.Comment.event_id == event_id)
-        .order_by(models.Comment.created_at.desc())
+    )
+    
+    if cursor is not None:
+        keys = [(models.Comment.created_at, True), (models.Comment.id, True)]
+        try:
+            items, next_cursor = keyset_paginate(query, keys, cursor, limit)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": items, "next_cursor": next_cursor}
+    
+    return (
+        query
+        .order_by(models.Comment.created_at.desc(), models.Comment.id.desc())
         .offset(skip)
         .limit(limit)
         .all()
@@ -90,13 +145,18 @@ def update_comment(
             detail="Not authorized to update this comment",
         )
     
+    old_rating = db_comment.rating or 0
+    
     # Update only the fields that were provided
     for field, value in comment_update.dict(exclude_unset=True).items():
         setattr(db_comment, field, value)
     
     db.add(db_comment)
+    adjust_event_counters(db, db_comment.event_id, rating_sum=(db_comment.rating or 0) - old_rating)
     db.commit()
     db.refresh(db_comment)
+    response_cache.invalidate(comments_tag(db_comment.event_id), event_stats_tag(db_comment.event_id))
+    recommendation_model.invalidate_user(db_comment.author_id)
     return db_comment
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -116,6 +176,10 @@ def delete_comment(
             detail="Not authorized to delete this comment",
         )
     
+    event_id, author_id = db_comment.event_id, db_comment.author_id
+    adjust_event_counters(db, event_id, comments_count=-1, rating_sum=-(db_comment.rating or 0))
     db.delete(db_comment)
     db.commit()
+    response_cache.invalidate(comments_tag(event_id), event_stats_tag(event_id))
+    recommendation_model.invalidate_user(author_id)
     return None
@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from database import get_db
+from database import get_async_db
 import models, schemas
+from services import user_cache
 from services.email import send_verification_email
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 @router.post("/verify-email/send", response_model=schemas.email_verification.EmailVerificationResponse)
-async def send_verification_email_route(request: schemas.email_verification.EmailVerificationRequest, db: Session = Depends(get_db)):
+async def send_verification_email_route(request: schemas.email_verification.EmailVerificationRequest, db: AsyncSession = Depends(get_async_db)):
     """Send a verification email to the user"""
     # Find the user by email
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == request.email))
     
     if not user:
         raise HTTPException(
@@ -24,12 +26,12 @@ async def send_verification_email_route(request: schemas.email_verification.Emai
         return {"message": "Email already verified"}
     
     # Delete any existing verification tokens for this user
-    db.query(models.EmailVerification).filter(models.EmailVerification.user_id == user.id).delete()
+    await db.execute(delete(models.EmailVerification).where(models.EmailVerification.user_id == user.id))
     
     # Create a new verification token
     verification_token = models.EmailVerification.create_token(user.id, user.email)
     db.add(verification_token)
-    db.commit()
+    await db.commit()
     
     # Send verification email
     await send_verification_email(user.email, user.full_name, verification_token.token)
@@ -37,9 +39,9 @@ async def send_verification_email_route(request: schemas.email_verification.Emai
     return {"message": "Verification email sent successfully"}
 
 @router.get("/verify-email/{token}", response_model=schemas.email_verification.EmailVerificationResponse)
-async def verify_email(token: str, db: Session = Depends(get_db)):
+async def verify_email(token: str, db: AsyncSession = Depends(get_async_db)):
     """Verify a user's email using the verification token"""
-    verification = db.query(models.EmailVerification).filter(models.EmailVerification.token == token).first()
+    verification = await db.scalar(select(models.EmailVerification).where(models.EmailVerification.token == token))
     
     if not verification or not verification.is_valid():
         raise HTTPException(
@@ -51,7 +53,7 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
         return {"message": "Email already verified"}
     
     # Get the user
-    user = db.query(models.User).filter(models.User.id == verification.user_id).first()
+    user = await db.get(models.User, verification.user_id)
     
     if not user:
         raise HTTPException(
@@ -65,6 +67,8 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
     
     db.add(user)
     db.add(verification)
-    db.commit()
+    email = user.email
+    await db.commit()
+    user_cache.invalidate(email)
     
     return {"message": "Email verified successfully"}
@@ -1,64 +1,230 @@
 from datetime import datetime
-import os
-import shutil
+import functools
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Union
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
 
 import models, schemas
 from database import get_db
 from security import get_current_active_user, get_current_admin
-from services.notification_service import send_event_notification_email
+from services.notification_service import queue_event_notification, queue_waitlist_promotion
+from services.registration_service import fill_from_waitlist
+from services.export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, export_registrations
+from services.fast_json import RowEncoder, UnknownField, dumps, parse_fields
+from services.image_gc import image_collector
+from services.images import ImageTooLarge, InvalidImage, StoredImage, image_pipeline, save_upload
+from services.pagination import MAX_PAGE_SIZE, InvalidCursor, keyset_paginate
+from services.search import SearchNotSupported, event_search_query, render_snippet, search_terms
+from services.recommendation_model import recommendation_model
+from services.suggest import suggest_index
+from services import response_cache
+from services.response_cache import (
+    EVENT_LISTS, cached_response, category_tag, comments_tag, event_stats_tag, event_tag,
+)
 
 router = APIRouter(prefix="/api/events", tags=["Events"])
 
-@router.get("/", response_model=List[schemas.Event])
+def _events_query(db: Session, category: Optional[str], upcoming_only: bool):
+    query = db.query(models.Event)
+    if category:
+        # Gunakan filter case-insensitive untuk kategori
+        query = query.filter(models.Event.category.ilike(f"%{category}%"))
+    if upcoming_only:
+        query = query.filter(models.Event.start_datetime >= datetime.utcnow())
+    return query
+
+def _event_list_validators(params):
+    # Any insert, update or delete in the filtered set changes the count or max(updated_at), so the ETag
+    # follows it. No Last-Modified: max(updated_at) stays put when an event is deleted or has started.
+    count, last_modified = (
+        _events_query(params["db"], params["category"], params["upcoming_only"])
+        .with_entities(func.count(models.Event.id), func.max(models.Event.updated_at))
+        .one()
+    )
+    return (count, last_modified), None
+
+def _event_detail_validators(params):
+    # Counter updates keep updated_at, so they are part of the ETag. No Last-Modified for the same reason.
+    row = (
+        params["db"].query(
+            models.Event.updated_at,
+            models.Event.registrations_count,
+            models.Event.comments_count,
+            models.Event.waitlist_count,
+        )
+        .filter(models.Event.id == params["event_id"])
+        .first()
+    )
+    return (tuple(row), None) if row else None
+
+def _event_list_tags(params, result):
+    items = result["items"] if isinstance(result, dict) else result
+    tags = [EVENT_LISTS] + [event_tag(event.id) for event in items]
+    if params.get("category"):
+        tags.append(category_tag(params["category"]))
+    return tags
+
+# Named sparse fieldsets for `GET /api/events/?fields=`; None means every field
+EVENT_VIEWS = {
+    "card": ("title", "category", "location", "start_datetime", "image_url", "image_variants"),
+    "full": None,
+}
+
+@functools.lru_cache(maxsize=64)
+def _event_encoder(fields: Optional[Tuple[str, ...]]) -> RowEncoder:
+    # The list selects only the encoder's columns and skips the per-row schemas.Event models
+    return RowEncoder(models.Event, schemas.Event, fields)
+
+def _encode_event_list(params, result):
+    return _event_encoder(parse_fields(params["fields"], schemas.Event, EVENT_VIEWS)).encode(result)
+
+@router.get("/", response_model=Union[List[schemas.Event], schemas.EventPage])
+@cached_response(Union[List[schemas.Event], schemas.EventPage], _event_list_tags, _event_list_validators,
+                 encoder=_encode_event_list)
 def list_events(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     category: Optional[str] = None,
     upcoming_only: bool = True,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
 ):
-    """List all events with optional filtering."""
+    """
+    List all events with optional filtering.
+    
+    Passing `cursor` (empty for the first page) switches to keyset pagination
+    ordered by (start_datetime, id): the response becomes `{"items": [...], "next_cursor": ...}`
+    and `skip` is ignored. Without `cursor` the plain skip/limit list is returned.
+    
+    `fields` is a comma-separated list of event fields and views, e.g. `card`
+    (title, category, location, start_datetime, image_url) or `card,description`.
+    It limits both the selected columns and the returned keys; `id` is always
+    included. Without it, or with `full`, every field is returned.
+    """
+    keys = [(models.Event.start_datetime, False), (models.Event.id, False)]
     try:
-        logger.debug("Starting list_events function")
-        logger.debug(f"Parameters: skip={skip}, limit={limit}, category={category}, upcoming_only={upcoming_only}")
-        
-        query = db.query(models.Event)
-        logger.debug("Created base query")
-        
-        if category:
-            logger.debug(f"Filtering by category: {category}")
-            # Gunakan filter case-insensitive untuk kategori
-            query = query.filter(models.Event.category.ilike(f"%{category}%"))
-        
-        if upcoming_only:
-            logger.debug("Filtering by upcoming events")
-            query = query.filter(models.Event.start_datetime >= datetime.utcnow())
+        encoder = _event_encoder(parse_fields(fields, schemas.Event, EVENT_VIEWS))
+    except UnknownField as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Pagination and cache tags read the keys from each row, after the encoded columns
+    selected = {column.key for column in encoder.columns}
+    columns = encoder.columns + [column for column, _ in keys if column.key not in selected]
+    
+    try:
+        query = _events_query(db, category, upcoming_only).with_entities(*columns)
         
-        logger.debug("Ordering by start_datetime")
-        query = query.order_by(models.Event.start_datetime.asc())
+        if cursor is not None:
+            items, next_cursor = keyset_paginate(query, keys, cursor, limit)
+            logger.debug("Listed %d events (cursor=%r, next_cursor=%r)", len(items), cursor, next_cursor)
+            return {"items": items, "next_cursor": next_cursor}
         
-        logger.debug(f"Applying offset {skip} and limit {limit}")
+        query = query.order_by(models.Event.start_datetime.asc(), models.Event.id.asc())
         result = query.offset(skip).limit(limit).all()
-        logger.debug(f"Found {len(result)} events")
+        logger.debug("Listed %d events (skip=%d, limit=%d, category=%r)", len(result), skip, limit, category)
         
         return result
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error in list_events: {str(e)}", exc_info=True)
+        logger.error("Error in list_events: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _search_hit(row) -> models.Event:
+    # Serialized through EventSearchHit, which reads these two extra attributes
+    event, rank, snippet = row
+    event.rank = rank
+    event.snippet = render_snippet(snippet)
+    return event
+
+@router.get("/search", response_model=Union[List[schemas.EventSearchHit], schemas.EventSearchPage])
+def search_events(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    upcoming_only: bool = False,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text search over event title, location and description, most relevant first.
+    
+    Every word of `q` must match (as a word prefix). Each hit carries its `rank`
+    and an HTML-escaped `snippet` with the matches wrapped in `<mark>`. Passing
+    `cursor` (empty for the first page) switches to keyset pagination ordered
+    by (rank, id), as in `list_events`.
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="The search query contains no words")
+    
+    try:
+        search = event_search_query(db, terms)
+    except SearchNotSupported as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    
+    query = search.query
+    if upcoming_only:
+        query = query.filter(models.Event.start_datetime >= datetime.utcnow())
+    
+    if cursor is not None:
+        keys = [(search.rank, True), (models.Event.id, False)]
+        try:
+            rows, next_cursor = keyset_paginate(query, keys, cursor, limit, key_getter=lambda row: [row[1], row[0].id])
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": [_search_hit(row) for row in rows], "next_cursor": next_cursor}
+    
+    rows = query.order_by(search.rank.desc(), models.Event.id.asc()).offset(skip).limit(limit).all()
+    return [_search_hit(row) for row in rows]
+
+@router.get("/suggest", response_model=List[schemas.EventSuggestion])
+async def suggest_events(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+):
+    """
+    Autocomplete upcoming events by title or location as the user types.
+    
+    Served from the in-memory index in `services/suggest.py` without a
+    database query. Small typos are tolerated.
+    """
+    return [suggestion._asdict() for suggestion in suggest_index.suggest(prefix, limit)]
+
+@router.post("/batch", response_model=schemas.EventBatch)
+def get_events_batch(batch: schemas.EventBatchRequest, db: Session = Depends(get_db)):
+    """
+    Get up to 100 events by id in one query, e.g. the events behind a page of
+    registrations or recommendations.
+    
+    `items` follow the order of `ids` (repeated ids once); ids that do not
+    exist are listed in `missing`. `fields` selects a sparse fieldset, as on
+    `GET /api/events/`.
+    """
+    try:
+        encoder = _event_encoder(parse_fields(batch.fields, schemas.Event, EVENT_VIEWS))
+    except UnknownField as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    ids = list(dict.fromkeys(batch.ids))
+    # Every fieldset includes id
+    found = {row.id: row for row in db.query(*encoder.columns).filter(models.Event.id.in_(ids))}
+    body = {
+        "items": encoder.rows([found[event_id] for event_id in ids if event_id in found]),
+        "missing": [event_id for event_id in ids if event_id not in found],
+    }
+    return Response(content=dumps(body), media_type="application/json")
+
 @router.post("/", response_model=schemas.Event, status_code=status.HTTP_201_CREATED)
-async def create_event(
+def create_event(
     event: schemas.EventCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
@@ -83,12 +249,6 @@ async def create_event(
             detail="Only admin users can create events",
         )
     
-    # Log the event data for debugging
-    logger.debug(f"Creating event with data: {event.dict()}")
-    logger.debug(f"Registration link: {event.registration_link}")
-    logger.debug(f"Max participants: {event.max_participants}")
-    logger.debug(f"Registration deadline: {event.registration_deadline}")
-    
     # Create event object
     event_data = event.dict()
     db_event = models.Event(
@@ -97,31 +257,22 @@ async def create_event(
     )
     
     db.add(db_event)
+    db.flush()
+    
+    # Notify all active users through the outbox, in the same transaction as the event
+    queue_event_notification(db, db_event)
     db.commit()
     db.refresh(db_event)
+    response_cache.invalidate(EVENT_LISTS, category_tag(db_event.category))
+    suggest_index.add(db_event)
+    recommendation_model.add_event(db_event)
     
-    # Log the created event for verification
-    logger.debug(f"Created event: {db_event.id}, registration_link: {db_event.registration_link}, "
-                f"max_participants: {db_event.max_participants}, "
-                f"registration_deadline: {db_event.registration_deadline}")
-    
-    # Get all active users to notify them about the new event
-    active_users = db.query(models.User).filter(models.User.is_active == True).all()
-    recipient_emails = [user.email for user in active_users]
-    
-    # Send email notifications
-    try:
-        await send_event_notification_email(background_tasks, db_event, recipient_emails)
-        print(f"Event notification emails queued for {len(recipient_emails)} recipients")
-    except Exception as e:
-        # Log the error but don't fail the request
-        print(f"Error sending event notification emails: {e}")
+    logger.info("Event %d created by user %d", db_event.id, current_user.id)
     
     return db_event
 
 @router.post("/form", response_model=schemas.Event, status_code=status.HTTP_201_CREATED)
-async def create_event_form(
-    background_tasks: BackgroundTasks,
+def create_event_form(
     title: str = Form(...),
     description: str = Form(...),
     category: str = Form(...),
@@ -156,19 +307,6 @@ async def create_event_form(
             detail="Only admin users can create events",
         )
     
-    # Log received form data for debugging
-    logger.debug(f"Received form data for event creation:")
-    logger.debug(f"title: {title}")
-    logger.debug(f"description: {description}")
-    logger.debug(f"category: {category}")
-    logger.debug(f"location: {location}")
-    logger.debug(f"start_datetime: {start_datetime}")
-    logger.debug(f"end_datetime: {end_datetime}")
-    logger.debug(f"max_participants: {max_participants}")
-    logger.debug(f"registration_deadline: {registration_deadline}")
-    logger.debug(f"registration_link: {registration_link}")
-    logger.debug(f"image: {image.filename if image else None}")
-    
     # Parse datetime strings
     try:
         # Handle different datetime formats
@@ -179,9 +317,8 @@ async def create_event_form(
         reg_deadline = None
         if registration_deadline and registration_deadline.strip():
             reg_deadline = datetime.fromisoformat(registration_deadline.replace('Z', '+00:00') if registration_deadline.endswith('Z') else registration_deadline)
-            logger.debug(f"Parsed registration_deadline: {reg_deadline}")
     except ValueError as e:
-        logger.error(f"Error parsing datetime: {e}")
+        logger.info("Rejected event form with an invalid datetime: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid datetime format: {str(e)}. Use ISO format (YYYY-MM-DDTHH:MM:SS)",
@@ -201,67 +338,73 @@ async def create_event_form(
         "organizer_id": current_user.id,
     }
     
-    logger.debug(f"Event data prepared for database: {event_data}")
-    
     # Handle image upload if provided
+    stored_image = None
     if image and image.filename:
-        # Create directory if it doesn't exist
-        os.makedirs("static/event_images", exist_ok=True)
-        
-        # Generate unique filename
-        file_extension = os.path.splitext(image.filename)[1]
-        image_name = f"event_{datetime.now().strftime('%Y%m%d%H%M%S')}{file_extension}"
-        image_path = f"static/event_images/{image_name}"
-        
-        # Save the file
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        # Add image URL to event data
-        event_data["image_url"] = f"/static/event_images/{image_name}"
+        stored_image = _store_event_image(image)
+        event_data["image_url"] = stored_image.url
     
     # Create and save the event
     db_event = models.Event(**event_data)
     db.add(db_event)
+    db.flush()
+    
+    # Notify all active users through the outbox, in the same transaction as the event
+    queue_event_notification(db, db_event)
     db.commit()
     db.refresh(db_event)
-    
-    # Get all active users to notify them about the new event
-    active_users = db.query(models.User).filter(models.User.is_active == True).all()
-    recipient_emails = [user.email for user in active_users]
-    
-    # Send email notifications
-    try:
-        await send_event_notification_email(background_tasks, db_event, recipient_emails)
-        print(f"Event notification emails queued for {len(recipient_emails)} recipients")
-    except Exception as e:
-        # Log the error but don't fail the request
-        print(f"Error sending event notification emails: {e}")
+    response_cache.invalidate(EVENT_LISTS, category_tag(db_event.category))
+    suggest_index.add(db_event)
+    recommendation_model.add_event(db_event)
+    if stored_image:
+        _render_event_image(db, db_event.id, stored_image)
     
     return db_event
 
+def _store_event_image(image: UploadFile) -> StoredImage:
+    try:
+        return save_upload(image.file)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except InvalidImage as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+
+def _render_event_image(db: Session, event_id: int, stored_image: StoredImage) -> None:
+    """Render the variants in the background and record them on the event once they exist."""
+    engine = db.get_bind()
+
+    def on_done(variants):
+        # Runs on a pool thread after the request has finished: use a session of its own
+        with Session(bind=engine) as session:
+            updated = (
+                session.query(models.Event)
+                # The image may have been replaced while its variants were rendered
+                .filter(models.Event.id == event_id, models.Event.image_url == stored_image.url)
+                .update({models.Event.image_variants: variants}, synchronize_session=False)
+            )
+            session.commit()
+        if updated:
+            response_cache.invalidate(event_tag(event_id), EVENT_LISTS)
+
+    image_pipeline.submit(stored_image, on_done)
+
 @router.get("/{event_id}", response_model=schemas.EventDetail)
-def get_event(event_id: int, db: Session = Depends(get_db)):
+@cached_response(
+    schemas.EventDetail,
+    lambda params, result: [event_tag(result["id"]), event_stats_tag(result["id"])],
+    _event_detail_validators,
+)
+def get_event(event_id: int, request: Request, db: Session = Depends(get_db)):
     """Get a specific event by ID."""
     try:
-        # Log untuk debugging
-        logger.debug(f"Getting event with ID: {event_id}")
-        
         # Ambil event dari database
         event = db.query(models.Event).filter(models.Event.id == event_id).first()
         if not event:
-            logger.debug(f"Event with ID {event_id} not found")
             raise HTTPException(status_code=404, detail="Event not found")
         
-        # Log event data for debugging
-        logger.debug(f"Event found: {event.title}")
-        logger.debug(f"Event registration_link: {event.registration_link}")
-        logger.debug(f"Event max_participants: {event.max_participants}")
-        logger.debug(f"Event registration_deadline: {event.registration_deadline}")
-        
-        # Hitung jumlah komentar dan registrasi
-        comments_count = len(event.comments)
-        registrations_count = len(event.registrations)
+        # Jumlah komentar dan registrasi diambil dari kolom counter (tanpa memuat relasi)
+        comments_count = event.comments_count
+        registrations_count = event.registrations_count
         
         # Karena tidak ada current_user, selalu set is_registered ke False
         is_registered = False
@@ -278,19 +421,22 @@ def get_event(event_id: int, db: Session = Depends(get_db)):
             "max_attendees": event.max_participants,  # Sesuaikan dengan nama field di model
             "is_public": True,  # Default ke True jika tidak ada di model
             "image_url": event.image_url,
+            "image_variants": event.image_variants,
             "organizer_id": event.organizer_id,
             "created_at": event.created_at,
             "updated_at": event.updated_at,
             "is_cancelled": event.status == "cancelled",  # Sesuaikan dengan logika status
             "comments_count": comments_count,
             "registrations_count": registrations_count,
+            "waitlist_count": event.waitlist_count,
             "is_registered": is_registered
         }
         
-        logger.debug(f"Successfully retrieved event: {event.title}")
         return event_dict
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in get_event: {str(e)}", exc_info=True)
+        logger.error("Error in get_event: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.put("/{event_id}", response_model=schemas.Event)
@@ -301,9 +447,6 @@ def update_event(
     current_user: models.User = Depends(get_current_active_user),
 ):
     """Update an event. Only admins or the event organizer can update."""
-    # Log the update data for debugging
-    logger.debug(f"Updating event {event_id} with data: {event_update.dict()}")
-    
     db_event = db.query(models.Event).filter(models.Event.id == event_id).first()
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
@@ -314,35 +457,43 @@ def update_event(
             detail="Not authorized to update this event",
         )
     
+    old_category, old_start, old_image_url = db_event.category, db_event.start_datetime, db_event.image_url
+    
     # Get the update data, ensuring we don't exclude any fields
     update_data = event_update.dict(exclude_unset=False)
-    logger.debug(f"Update data after dict conversion: {update_data}")
-    
-    # Explicitly handle special fields
-    if 'registration_deadline' in update_data:
-        logger.debug(f"Setting registration_deadline to {update_data['registration_deadline']}")
-    if 'registration_link' in update_data:
-        logger.debug(f"Setting registration_link to {update_data['registration_link']}")
-    if 'max_participants' in update_data:
-        logger.debug(f"Setting max_participants to {update_data['max_participants']}")
     
     # Update all fields
     for field, value in update_data.items():
-        logger.debug(f"Setting {field} to {value}")
         # Skip field is_public karena kolom belum tersedia di database
         if field == 'is_public':
-            logger.debug(f"Skipping field is_public because the column is not available in the database")
             continue
         setattr(db_event, field, value)
+    if db_event.image_url != old_image_url:
+        db_event.image_variants = None  # They belong to the old image
     
     db.add(db_event)
     db.commit()
+    
+    # Raising the capacity hands the new seats to the waitlist
+    if db_event.waitlist_count:
+        promoted = fill_from_waitlist(db, event_id)
+        for registration in promoted:
+            queue_waitlist_promotion(db, registration)
+        db.commit()
+    
     db.refresh(db_event)
     
-    # Log the updated event for verification
-    logger.debug(f"Updated event: {db_event.id}, registration_link: {db_event.registration_link}, "
-                f"max_participants: {db_event.max_participants}, "
-                f"registration_deadline: {db_event.registration_deadline}")
+    # Listings that did not contain the event can only change if it moved in or out of them
+    tags = [event_tag(event_id), event_stats_tag(event_id), category_tag(old_category), category_tag(db_event.category)]
+    if db_event.category != old_category or db_event.start_datetime != old_start:
+        tags.append(EVENT_LISTS)
+    response_cache.invalidate(*tags)
+    suggest_index.add(db_event)
+    recommendation_model.add_event(db_event)
+    if db_event.image_url != old_image_url:
+        image_collector.release(old_image_url)
+    
+    logger.info("Event %d updated by user %d (fields: %s)", event_id, current_user.id, ", ".join(update_data))
     
     return db_event
 
@@ -358,7 +509,7 @@ def update_event_image(
     
     This endpoint accepts a multipart/form-data request with an image file.
     The image will be stored on the server and the event's image_url will be updated.
-    Any previous image associated with this event will be deleted.
+    The previous image is deleted in the background unless another event uses it.
     """
     # Check if event exists
     db_event = db.query(models.Event).filter(models.Event.id == event_id).first()
@@ -372,32 +523,20 @@ def update_event_image(
             detail="Not authorized to update this event",
         )
     
-    # Delete old image if exists
-    if db_event.image_url:
-        old_image_path = os.path.join(".", db_event.image_url.lstrip("/"))
-        if os.path.exists(old_image_path):
-            try:
-                os.remove(old_image_path)
-            except Exception as e:
-                print(f"Error removing old image: {e}")
-    
-    # Create directory if it doesn't exist
-    os.makedirs("static/event_images", exist_ok=True)
-    
-    # Generate unique filename
-    file_extension = os.path.splitext(image.filename)[1]
-    image_name = f"event_{event_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}{file_extension}"
-    image_path = f"static/event_images/{image_name}"
-    
-    # Save the file
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    stored_image = _store_event_image(image)
+    old_image_url = db_event.image_url
     
     # Update image URL in database
-    db_event.image_url = f"/static/event_images/{image_name}"
+    db_event.image_url = stored_image.url
+    db_event.image_variants = None
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
+    response_cache.invalidate(event_tag(event_id), EVENT_LISTS)
+    _render_event_image(db, event_id, stored_image)
+    
+    if old_image_url != stored_image.url:
+        image_collector.release(old_image_url)
     
     return db_event
 
@@ -418,17 +557,19 @@ def delete_event(
             detail="Not authorized to delete this event",
         )
     
+    image_url, category = db_event.image_url, db_event.category
     db.delete(db_event)
     db.commit()
+    response_cache.invalidate(
+        event_tag(event_id), event_stats_tag(event_id), comments_tag(event_id),
+        EVENT_LISTS, category_tag(category),
+    )
+    suggest_index.remove(event_id)
+    recommendation_model.remove_event(event_id)
+    image_collector.release(image_url)
     return None
 
-@router.get("/{event_id}/registrations", response_model=List[schemas.Registration])
-def get_event_registrations(
-    event_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
-):
-    """Get all registrations for an event. Only accessible by admin or event organizer."""
+def _event_for_organizer(db: Session, event_id: int, current_user) -> models.Event:
     event = db.query(models.Event).filter(models.Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
@@ -438,5 +579,48 @@ def get_event_registrations(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view registrations for this event",
         )
+    return event
+
+@router.get("/{event_id}/registrations", response_model=List[schemas.Registration])
+def get_event_registrations(
+    event_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Get all registrations for an event. Only accessible by admin or event organizer."""
+    _event_for_organizer(db, event_id, current_user)
+    
+    # The waitlist positions read registration.event: load it with the rows
+    return (
+        db.query(models.Registration)
+        .options(joinedload(models.Registration.event))
+        .filter(models.Registration.event_id == event_id)
+        .order_by(models.Registration.registration_date, models.Registration.id)
+        .all()
+    )
+
+@router.get(
+    "/{event_id}/registrations/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}},
+)
+def export_event_registrations(
+    event_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """
+    Download the registrations of an event with the registrants' names and
+    emails, as CSV or NDJSON (one JSON object per line). Only accessible by
+    admin or event organizer.
     
-    return event.registrations
+    Rows are streamed from a database cursor, so the download starts at once
+    and memory use does not depend on the number of registrations.
+    """
+    event = _event_for_organizer(db, event_id, current_user)
+    return StreamingResponse(
+        export_registrations(db, event_id, event.waitlist_served, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="event-{event_id}-registrations.{format}"'},
+    )
@@ -0,0 +1,31 @@
+import logging
+
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+
+from database import engine, get_db
+from services.metrics import CONTENT_TYPE, Exposition, cache_families, http_metrics, pool_metrics
+from services.outbox import outbox_depth
+from services.response_cache import response_cache
+from services.user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics(db: Session = Depends(get_db)):
+    """Metrics of this process in the Prometheus text exposition format."""
+    out = Exposition()
+    http_metrics.collect(out)
+    pool_metrics.collect(out, engine.pool)
+    cache_families(out, {"response": response_cache.stats(), "user": user_cache.stats()})
+    try:
+        depth = outbox_depth(db)
+    except Exception as e:
+        # A scrape must not fail because of the database; the pool metrics show the problem
+        logger.warning("Could not read the email outbox depth: %s", e)
+    else:
+        out.gauge("eventnow_email_outbox_depth", "Email outbox rows by status.",
+                  {(("status", str(status)),): count for status, count in depth.items()})
+    return Response(out.render(), media_type=CONTENT_TYPE)
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from database import get_db
+from database import get_async_db
 import models, schemas
-from security import get_password_hash
+from services import user_cache
+from services.hashing import hash_password
 from services.email import send_password_reset_email
 from schemas.password_reset import ForgotPassword
 from schemas.password_reset import ResetPassword
@@ -12,20 +14,20 @@ from schemas.password_reset import ResetPassword
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 @router.post("/forgot-password", status_code=status.HTTP_204_NO_CONTENT)
-async def forgot_password(request: schemas.password_reset.ForgotPassword, db: Session = Depends(get_db)):
+async def forgot_password(request: schemas.password_reset.ForgotPassword, db: AsyncSession = Depends(get_async_db)):
     """Request a password reset link"""
     # Find the user by email
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == request.email))
     
     # If user exists and is active, create a password reset token
     if user and user.is_active:
         # Delete any existing tokens for this user
-        db.query(models.PasswordReset).filter(models.PasswordReset.user_id == user.id).delete()
+        await db.execute(delete(models.PasswordReset).where(models.PasswordReset.user_id == user.id))
         
         # Create a new token
         reset_token = models.PasswordReset.create_token(user.id)
         db.add(reset_token)
-        db.commit()
+        await db.commit()
         
         # Send email with reset link
         await send_password_reset_email(user.email, user.full_name, reset_token.token)
@@ -34,9 +36,9 @@ async def forgot_password(request: schemas.password_reset.ForgotPassword, db: Se
     return None
 
 @router.get("/reset-password/validate/{token}", status_code=status.HTTP_200_OK)
-async def validate_reset_token(token: str, db: Session = Depends(get_db)):
+async def validate_reset_token(token: str, db: AsyncSession = Depends(get_async_db)):
     """Validate a password reset token"""
-    reset_token = db.query(models.PasswordReset).filter(models.PasswordReset.token == token).first()
+    reset_token = await db.scalar(select(models.PasswordReset).where(models.PasswordReset.token == token))
     
     if not reset_token or not reset_token.is_valid():
         raise HTTPException(
@@ -47,9 +49,9 @@ async def validate_reset_token(token: str, db: Session = Depends(get_db)):
     return {"valid": True}
 
 @router.post("/reset-password/{token}", status_code=status.HTTP_200_OK)
-async def reset_password(token: str, request: schemas.password_reset.ResetPassword, db: Session = Depends(get_db)):
+async def reset_password(token: str, request: schemas.password_reset.ResetPassword, db: AsyncSession = Depends(get_async_db)):
     """Reset password using a valid token"""
-    reset_token = db.query(models.PasswordReset).filter(models.PasswordReset.token == token).first()
+    reset_token = await db.scalar(select(models.PasswordReset).where(models.PasswordReset.token == token))
     
     if not reset_token or not reset_token.is_valid():
         raise HTTPException(
@@ -58,7 +60,7 @@ async def reset_password(token: str, request: schemas.password_reset.ResetPasswo
         )
     
     # Get the user
-    user = db.query(models.User).filter(models.User.id == reset_token.user_id).first()
+    user = await db.get(models.User, reset_token.user_id)
     
     if not user or not user.is_active:
         raise HTTPException(
@@ -66,11 +68,14 @@ async def reset_password(token: str, request: schemas.password_reset.ResetPasswo
             detail="User not found or inactive"
         )
     
-    # Update password
-    user.hashed_password = get_password_hash(request.new_password)
+    # Update password and revoke the tokens issued before the reset
+    user.hashed_password = await hash_password(request.new_password)
+    user.token_version = (user.token_version or 0) + 1
     
     # Delete the token
-    db.delete(reset_token)
-    db.commit()
+    await db.delete(reset_token)
+    email = user.email
+    await db.commit()
+    user_cache.invalidate(email)
     
     return {"message": "Password reset successful"}
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -5,7 +6,8 @@ from sqlalchemy.orm import Session
 import models, schemas
 from database import get_db
 from security import get_current_active_user
-from services.recommendation_service import get_recommended_events
+from services.recommendation_service import recommend_events
+from services.response_cache import cached_response, category_tag, event_tag
 
 router = APIRouter(prefix="/api/recommendations", tags=["Recommendations"])
 
@@ -15,11 +17,22 @@ def get_recommendations(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    """Get recommended events based on user's registration history."""
-    recommended_events = get_recommended_events(db, current_user.id, limit)
-    return recommended_events
+    """
+    Get recommended events based on user's registration history.
+    
+    Ranked by the precomputed model in services/recommendation_model.py:
+    categories of the user's registrations, attendance and ratings (recent
+    ones weigh more), then popularity.
+    """
+    return recommend_events(db, current_user.id, limit)
+
+def _similar_events_tags(params, result):
+    # The source event is still in the session's identity map: no query
+    source = params["db"].get(models.Event, params["event_id"])
+    return [event_tag(source.id), category_tag(source.category)] + [event_tag(event.id) for event in result]
 
 @router.get("/similar-events/{event_id}", response_model=List[schemas.Event])
+@cached_response(List[schemas.Event], _similar_events_tags)
 def get_similar_events(
     event_id: int,
     limit: int = 5,
@@ -1,25 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Union
 from datetime import datetime
 
 import models, schemas
-from database import get_db
+from database import get_async_db, get_db
 from security import get_current_active_user
-from services.notification_service import send_registration_notification_email
+from services.notification_service import queue_registration_notification
+from services.recommendation_model import recommendation_model
+from services.pagination import MAX_PAGE_SIZE, InvalidCursor, keyset_paginate
+from services import registration_service, response_cache
+from services.response_cache import event_stats_tag
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/registrations", tags=["Registrations"])
 
+MAX_STATUS_EVENTS = 100
+
+def _reserve_and_notify(db: Session, event_id: int, user_id: int, waitlist: bool) -> models.Registration:
+    """Sync part of `register_for_event`, run with `run_sync` so it never blocks the event loop."""
+    db_registration = registration_service.reserve_registration(db, event_id, user_id, waitlist=waitlist)
+    
+    # The email reads the registrant, the event and its organizer: load them in one query
+    db_registration = (
+        db.query(models.Registration)
+        .options(
+            joinedload(models.Registration.user),
+            joinedload(models.Registration.event).joinedload(models.Event.organizer),
+        )
+        .filter(models.Registration.id == db_registration.id)
+        .one()
+    )
+    
+    # Queue the email notification to the event organizer
+    try:
+        queue_registration_notification(db, db_registration)
+        db.commit()
+    except Exception as e:
+        # Log the error but don't fail the request
+        db.rollback()
+        logger.error("Error queueing registration notification email: %s", e, exc_info=True)
+    
+    # Reload everything the response reads (the waitlist position needs the event) in one query
+    return (
+        db.query(models.Registration)
+        .options(joinedload(models.Registration.event))
+        .filter(models.Registration.id == db_registration.id)
+        .one()
+    )
+
 @router.post("/", response_model=schemas.Registration, status_code=status.HTTP_201_CREATED)
 async def register_for_event(
     registration: schemas.RegistrationCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    """Register the current user for an event."""
+    """
+    Register the current user for an event.
+    
+    When the event is full the registration is queued on the waitlist with
+    status `pending` (unless `join_waitlist` is false, which returns 409).
+    """
     # Check if event exists
-    event = db.query(models.Event).filter(models.Event.id == registration.event_id).first()
+    event = await db.get(models.Event, registration.event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
@@ -27,60 +74,127 @@ async def register_for_event(
     if not event.is_registration_open:
         raise HTTPException(status_code=400, detail="Registration for this event is closed")
     
-    # Check if there are available slots
-    if event.available_slots <= 0:
-        raise HTTPException(status_code=400, detail="No available slots for this event")
+    # Claim a slot (or a waitlist ticket) and insert the registration atomically
+    # (and queue the organizer notification)
+    try:
+        db_registration = await db.run_sync(
+            _reserve_and_notify, event.id, current_user.id, registration.join_waitlist
+        )
+    except registration_service.RegistrationError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    response_cache.invalidate(event_stats_tag(registration.event_id))
+    recommendation_model.invalidate_user(current_user.id)
+    return db_registration
+
+@router.get("/my-registrations", response_model=Union[List[schemas.RegistrationWithEvent], schemas.RegistrationPage])
+def get_my_registrations(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """
+    Get all registrations for the current user, most recent first.
     
-    # Check if user is already registered
-    existing_registration = (
+    Pass `cursor` (empty for the first page) to use keyset pagination instead of skip/limit.
+    """
+    query = (
         db.query(models.Registration)
-        .filter(
-            models.Registration.user_id == current_user.id,
-            models.Registration.event_id == registration.event_id,
-        )
-        .first()
+        .options(joinedload(models.Registration.event))
+        .filter(models.Registration.user_id == current_user.id)
     )
     
-    if existing_registration:
-        raise HTTPException(status_code=400, detail="Already registered for this event")
+    if cursor is not None:
+        keys = [(models.Registration.registration_date, True), (models.Registration.id, True)]
+        try:
+            items, next_cursor = keyset_paginate(query, keys, cursor, limit)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"items": items, "next_cursor": next_cursor}
     
-    # Create new registration
-    db_registration = models.Registration(
-        user_id=current_user.id,
-        event_id=registration.event_id,
-        status=models.RegistrationStatus.CONFIRMED,
+    return (
+        query
+        .order_by(models.Registration.registration_date.desc(), models.Registration.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
     )
+
+@router.get("/status", response_model=List[schemas.EventRegistrationStatus])
+def get_registration_status(
+    event_ids: List[str] = Query(..., description="Event ids, comma-separated (`?event_ids=1,2,3`) or repeated"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """
+    The current user's registration status for up to 100 events, in one query.
     
-    db.add(db_registration)
-    db.commit()
-    db.refresh(db_registration)
-    
-    # Send email notification to event organizer
+    Returns one entry per requested event, in request order. `status` is
+    null when the user is not registered (or the event does not exist), and
+    `waitlist_position` is set while the registration is on the waitlist.
+    """
     try:
-        await send_registration_notification_email(background_tasks, db_registration)
-        print(f"Registration notification email sent to event organizer")
-    except Exception as e:
-        # Log the error but don't fail the request
-        print(f"Error sending registration notification email: {e}")
+        ids = list(dict.fromkeys(int(part) for value in event_ids for part in value.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="event_ids must be integers")
+    if not ids or len(ids) > MAX_STATUS_EVENTS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_STATUS_EVENTS} event_ids")
     
-    return db_registration
+    # Served by the unique (user_id, event_id) index
+    rows = (
+        db.query(
+            models.Registration.id,
+            models.Registration.event_id,
+            models.Registration.status,
+            models.Registration.waitlist_ticket,
+            models.Event.waitlist_served,
+        )
+        .join(models.Event, models.Event.id == models.Registration.event_id)
+        .filter(models.Registration.user_id == current_user.id, models.Registration.event_id.in_(ids))
+        .all()
+    )
+    registrations = {row.event_id: row for row in rows}
+    
+    statuses = []
+    for event_id in ids:
+        row = registrations.get(event_id)
+        if row is None:
+            statuses.append({"event_id": event_id})
+            continue
+        statuses.append({
+            "event_id": event_id,
+            "registration_id": row.id,
+            "status": row.status.value,
+            # Same arithmetic as Registration.waitlist_position
+            "waitlist_position": row.waitlist_ticket - row.waitlist_served if row.waitlist_ticket is not None else None,
+        })
+    return statuses
 
-@router.get("/my-registrations", response_model=List[schemas.RegistrationWithEvent])
-def get_my_registrations(
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/event/{event_id}/waitlist", response_model=schemas.WaitlistPosition)
+def get_waitlist_position(
+    event_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    """Get all registrations for the current user."""
-    return (
+    """Get the current user's position on the waitlist of an event."""
+    registration = (
         db.query(models.Registration)
-        .filter(models.Registration.user_id == current_user.id)
-        .order_by(models.Registration.registration_date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .filter(
+            models.Registration.user_id == current_user.id,
+            models.Registration.event_id == event_id,
+        )
+        .first()
     )
+    if not registration or registration.waitlist_ticket is None:
+        raise HTTPException(status_code=404, detail="Not on the waitlist for this event")
+    
+    return {
+        "registration_id": registration.id,
+        "event_id": event_id,
+        "position": registration.waitlist_position,
+        "waitlist_length": registration.event.waitlist_count,
+    }
 
 @router.delete("/{registration_id}", status_code=status.HTTP_204_NO_CONTENT)
 def cancel_registration(
@@ -88,7 +202,12 @@ def cancel_registration(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    """Cancel a registration. Only the registrant or an admin can cancel."""
+    """
+    Cancel a registration. Only the registrant or an admin can cancel.
+    
+    A freed seat goes to the head of the waitlist in the same transaction,
+    together with the promotion email queued for the promoted user.
+    """
     registration = db.query(models.Registration).filter(models.Registration.id == registration_id).first()
     if not registration:
         raise HTTPException(status_code=404, detail="Registration not found")
@@ -107,6 +226,9 @@ def cancel_registration(
             detail="Cannot cancel registration for an event that has already started",
         )
     
-    db.delete(registration)
-    db.commit()
+    event_id, user_id = registration.event_id, registration.user_id
+    registration_service.cancel_registration(db, registration)
+    response_cache.invalidate(event_stats_tag(event_id))
+    recommendation_model.invalidate_user(user_id)
+    
     return None
@@ -1,31 +1,41 @@
 from fastapi import APIRouter, HTTPException
-import os
-from typing import List
+from typing import Optional
+
+from services.pagination import InvalidCursor, decode_cursor, encode_cursor
+from services.static_manifest import static_manifest
 
 router = APIRouter(prefix="/api/static-test", tags=["Static Files Test"])
 
-@router.get("/", response_model=List[dict])
-def list_static_files():
-    """List all static files in the static directory to help debug static file serving."""
+def _manifest():
+    if not static_manifest.ready:  # Built at startup; not when the router is used on its own
+        static_manifest.build()
+    return static_manifest
+
+@router.get("/")
+def list_static_files(skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """
+    List the static files, sorted by path, to help debug static file serving.
+
+    Answered from the in-memory manifest (services/static_manifest.py), with
+    each file's size, mtime, content digest and variants. Passing `cursor`
+    (empty for the first page) switches to keyset pagination: the response
+    becomes `{"items": [...], "next_cursor": ...}` and `skip` is ignored.
+    """
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
     try:
-        result = []
-        static_dir = "static"
-        
-        if not os.path.exists(static_dir):
-            return [{"error": f"Static directory '{static_dir}' does not exist"}]
-        
-        # Walk through the static directory and list all files
-        for root, dirs, files in os.walk(static_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, start=static_dir)
-                result.append({
-                    "path": f"/{static_dir}/{rel_path}",
-                    "size": os.path.getsize(file_path),
-                    "exists": True
-                })
-        
-        return result
+        manifest = _manifest()
+        if cursor is not None:
+            try:
+                after = decode_cursor(cursor, [(None, False)])[0] if cursor else ""
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            entries = manifest.list(after=after, limit=limit + 1)
+            next_cursor = encode_cursor([entries[limit - 1].path]) if len(entries) > limit else None
+            return {"items": [manifest.describe(entry) for entry in entries[:limit]], "next_cursor": next_cursor}
+        return [manifest.describe(entry) for entry in manifest.list(skip=skip, limit=limit)]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing static files: {str(e)}")
 
@@ -33,14 +43,10 @@ def list_static_files():
 def check_static_file(path: str):
     """Check if a specific static file exists."""
     try:
-        full_path = f"static/{path}"
-        
-        if os.path.exists(full_path):
-            return {
-                "path": f"/static/{path}",
-                "size": os.path.getsize(full_path),
-                "exists": True
-            }
+        manifest = _manifest()
+        entry = manifest.get(path.strip("/"))
+        if entry is not None:
+            return manifest.describe(entry)
         else:
             return {
                 "path": f"/static/{path}",
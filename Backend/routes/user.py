@@ -1,42 +1,46 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 
 import models
 from schemas import user_schema, registration_schema
-from database import get_db
-from security import get_current_active_user, get_password_hash
+from database import get_async_db
+from security import get_current_active_user, get_current_user_profile
+from services import response_cache, user_cache
+from services.hashing import hash_password
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
 @router.get("/me", response_model=user_schema.UserResponse)
-async def read_users_me(current_user: models.User = Depends(get_current_active_user)):
+async def read_users_me(current_user: models.User = Depends(get_current_user_profile)):
     """Get current user information."""
     return current_user
 
 @router.get("/me/registrations", response_model=List[registration_schema.Registration])
 async def get_user_registrations(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
     """Get all registrations for the current user."""
-    # Query registrations for the current user
-    registrations = (
-        db.query(models.Registration)
-        .filter(models.Registration.user_id == current_user.id)
-        .all()
+    # Query registrations for the current user (the event is needed for waitlist positions)
+    registrations = await db.scalars(
+        select(models.Registration)
+        .options(selectinload(models.Registration.event))
+        .where(models.Registration.user_id == current_user.id)
     )
-    return registrations
+    return registrations.all()
 
 @router.put("/me", response_model=user_schema.UserResponse)
 async def update_user_profile(
     user_update: user_schema.UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
     """Update current user profile."""
     # Get the current user from database to ensure we have the latest data
-    db_user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    db_user = await db.get(models.User, current_user.id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -45,19 +49,26 @@ async def update_user_profile(
         db_user.name = user_update.name
     if user_update.email is not None:
         # Check if email is already used by another user
-        existing_user = db.query(models.User).filter(models.User.email == user_update.email).first()
+        existing_user = await db.scalar(select(models.User).where(models.User.email == user_update.email))
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(status_code=400, detail="Email already registered")
         db_user.email = user_update.email
-    if user_update.password is not None and user_update.password != "":
-        db_user.hashed_password = get_password_hash(user_update.password)
     if user_update.bio is not None:
         db_user.bio = user_update.bio
     if user_update.profile_image is not None:
         db_user.profile_image = user_update.profile_image
+    if user_update.password is not None and user_update.password != "":
+        # Hand the DB connection back to the pool while bcrypt runs
+        await db.close()
+        db_user.hashed_password = await hash_password(user_update.password)
+        # Tokens issued before the change stop working, as with /api/auth/change-password
+        db_user.token_version = (db_user.token_version or 0) + 1
+        db.add(db_user)
     
     # Commit changes to database
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    user_cache.invalidate(current_user.email, db_user.email)
+    response_cache.invalidate(response_cache.author_tag(db_user.id))
     
     return db_user
@@ -18,6 +18,7 @@ from .user_schema import (
     UserUpdate,
     UserInDB,
     UserResponse,
+    UserSummary,
     UserWithEvents
 )
 
@@ -28,7 +29,13 @@ from .event_schema import (
     EventUpdate,
     Event,
     EventWithOrganizer,
-    EventDetail
+    EventDetail,
+    EventPage,
+    EventBatchRequest,
+    EventBatch,
+    EventSearchHit,
+    EventSearchPage,
+    EventSuggestion
 )
 
 from .comment_schema import (
@@ -37,7 +44,8 @@ from .comment_schema import (
     CommentUpdate,
     Comment,
     CommentWithAuthor,
-    CommentWithEvent
+    CommentWithEvent,
+    CommentPage
 )
 
 from .registration_schema import (
@@ -47,9 +55,14 @@ from .registration_schema import (
     RegistrationUpdate,
     Registration,
     RegistrationWithEvent,
-    RegistrationWithUser
+    RegistrationWithUser,
+    RegistrationPage,
+    EventRegistrationStatus,
+    WaitlistPosition
 )
 
+from .pagination_schema import CursorPage
+
 from .email_verification import (
     EmailVerificationRequest,
     EmailVerificationResponse
@@ -87,6 +100,7 @@ __all__ = [
     'UserUpdate',
     'UserInDB',
     'UserResponse',
+    'UserSummary',
     'UserWithEvents',
     
     # Event schemas
@@ -97,6 +111,12 @@ __all__ = [
     'Event',
     'EventWithOrganizer',
     'EventDetail',
+    'EventPage',
+    'EventBatchRequest',
+    'EventBatch',
+    'EventSearchHit',
+    'EventSearchPage',
+    'EventSuggestion',
     
     # Comment schemas
     'CommentBase',
@@ -105,6 +125,7 @@ __all__ = [
     'Comment',
     'CommentWithAuthor',
     'CommentWithEvent',
+    'CommentPage',
     
     # Registration schemas
     'RegistrationStatus',
@@ -113,5 +134,11 @@ __all__ = [
     'RegistrationUpdate',
     'Registration',
     'RegistrationWithEvent',
-    'RegistrationWithUser'
+    'RegistrationWithUser',
+    'RegistrationPage',
+    'EventRegistrationStatus',
+    'WaitlistPosition',
+    
+    # Pagination
+    'CursorPage'
 ]
\ No newline at end of file
@@ -1,7 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
+from .pagination_schema import CursorPage
+from .user_schema import UserSummary
+
 class CommentBase(BaseModel):
     content: str = Field(..., min_length=1)
     rating: Optional[int] = Field(None, ge=1, le=5)  # 1-5 star rating, optional
@@ -24,7 +27,10 @@ class Comment(CommentBase):
         orm_mode = True
 
 class CommentWithAuthor(Comment):
-    author: dict
+    author: UserSummary
 
 class CommentWithEvent(Comment):
-    event: dict
\ No newline at end of file
+    event: dict
+
+class CommentPage(CursorPage):
+    items: List[CommentWithAuthor]
\ No newline at end of file
@@ -1,8 +1,10 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
+from .pagination_schema import CursorPage
+
 class EventCategory(str, Enum):
     ACADEMIC = "academic"
     CULTURE = "culture"
@@ -66,10 +68,40 @@ class Event(EventBase):
     created_at: datetime
     updated_at: datetime
     is_cancelled: bool = False
+    # {"card": {"webp": url, "jpeg": url}, "detail": {...}, "original": {...}}; null until rendered
+    image_variants: Optional[Dict[str, Dict[str, str]]] = None
     
     class Config:
         orm_mode = True
 
+class EventPage(CursorPage):
+    items: List[Event]
+
+class EventBatchRequest(BaseModel):
+    """Body of `POST /api/events/batch`"""
+    ids: List[int] = Field(..., min_length=1, max_length=100)
+    fields: Optional[str] = None  # Sparse fieldset, as `?fields=` on the event list
+
+class EventBatch(BaseModel):
+    """Events found by id, in request order, and the ids that do not exist"""
+    items: List[Event]
+    missing: List[int] = []
+
+class EventSearchHit(Event):
+    """An event matching a full-text search, with its relevance and a highlighted excerpt"""
+    rank: float = 0.0
+    snippet: str = ""  # HTML-escaped, matches wrapped in <mark>
+
+class EventSearchPage(CursorPage):
+    items: List[EventSearchHit]
+
+class EventSuggestion(BaseModel):
+    """An autocomplete entry for the search box"""
+    id: int
+    title: str
+    location: Optional[str] = None
+    start_datetime: datetime
+
 class EventWithOrganizer(Event):
     organizer: dict
 
@@ -77,6 +109,7 @@ class EventDetail(Event):
     """Detailed event information including comments and registrations count"""
     comments_count: int = 0
     registrations_count: int = 0
+    waitlist_count: int = 0
     is_registered: bool = False
     registration_link: Optional[str] = None
     registration_deadline: Optional[datetime] = None
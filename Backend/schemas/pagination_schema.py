@@ -0,0 +1,6 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class CursorPage(BaseModel):
+    """Envelope returned by list endpoints when `?cursor=` is used"""
+    next_cursor: Optional[str] = None
@@ -1,10 +1,13 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 from enum import Enum
 
+from .event_schema import Event
+from .pagination_schema import CursorPage
+
 class RegistrationStatus(str, Enum):
-    PENDING = "pending"
+    PENDING = "pending"  # Waitlisted
     CONFIRMED = "confirmed"
     CANCELLED = "cancelled"
     ATTENDED = "attended"
@@ -15,6 +18,7 @@ class RegistrationBase(BaseModel):
 
 class RegistrationCreate(RegistrationBase):
     event_id: int
+    join_waitlist: bool = True  # Queue as pending instead of failing when the event is full
 
 class RegistrationUpdate(RegistrationBase):
     pass
@@ -24,12 +28,29 @@ class Registration(RegistrationBase):
     user_id: int
     event_id: int
     registration_date: datetime
+    waitlist_position: Optional[int] = None
     
     class Config:
         orm_mode = True
 
 class RegistrationWithEvent(Registration):
-    event: dict
+    event: Event
     
 class RegistrationWithUser(Registration):
-    user: dict
\ No newline at end of file
+    user: dict
+
+class EventRegistrationStatus(BaseModel):
+    """The current user's registration for one event; `status` is None when not registered"""
+    event_id: int
+    registration_id: Optional[int] = None
+    status: Optional[RegistrationStatus] = None
+    waitlist_position: Optional[int] = None
+
+class WaitlistPosition(BaseModel):
+    registration_id: int
+    event_id: int
+    position: int
+    waitlist_length: int
+
+class RegistrationPage(CursorPage):
+    items: List[RegistrationWithEvent]
\ No newline at end of file
@@ -37,6 +37,14 @@ class UserInDB(UserBase):
 class UserResponse(UserInDB):
     pass
 
+class UserSummary(BaseModel):
+    """Public name of a user, embedded in comments and other resources"""
+    id: int
+    full_name: str
+
+    class Config:
+        orm_mode = True
+
 class UserWithEvents(UserResponse):
     organized_events: List[dict] = []
     registered_events: List[dict] = []
\ No newline at end of file
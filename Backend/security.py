@@ -1,18 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
 import models
-from database import get_db
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from database import get_async_db
+from services.hashing import pwd_context
+from services.user_cache import UserPrincipal, user_cache
 
+# Password hashing (blocking; request handlers use the async helpers in services.hashing)
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -32,7 +32,52 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_user_token(user: models.User, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Access token for `user`. Besides the subject it carries the claims
+    `get_current_user` checks: the user id, role, active flag and token version.
+    """
+    role = user.role.value if isinstance(user.role, models.UserRole) else user.role
+    return create_access_token(
+        data={
+            "sub": user.email,
+            "uid": user.id,
+            "role": role,
+            "active": bool(user.is_active),
+            "ver": user.token_version or 0,
+        },
+        expires_delta=expires_delta,
+    )
+
+def _principal_from_claims(payload: dict) -> Optional[UserPrincipal]:
+    """Build a principal from signed claims alone; None if the token predates them."""
+    try:
+        return UserPrincipal(
+            id=int(payload["uid"]),
+            email=payload["sub"],
+            full_name=None,
+            role=models.UserRole(payload["role"]),
+            is_active=bool(payload["active"]),
+            email_verified=None,
+            created_at=None,
+            updated_at=None,
+            token_version=int(payload["ver"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+async def _load_principal(db: AsyncSession, email: str) -> Optional[UserPrincipal]:
+    principal = user_cache.get(email)
+    if principal is None:
+        generation = user_cache.generation
+        user = await db.scalar(select(models.User).where(models.User.email == email))
+        if user is None:
+            return None
+        principal = UserPrincipal.from_user(user)
+        user_cache.set(email, principal, generation)
+    return principal
+
+async def _authenticate(token: str, db: AsyncSession, trust_claims: bool) -> UserPrincipal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -45,11 +90,34 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+
+    principal = _principal_from_claims(payload) if trust_claims else None
+    if principal is None:
+        principal = await _load_principal(db, email)
+        # Tokens issued before the last password reset are revoked
+        if principal is None or payload.get("ver", 0) != principal.token_version:
+            raise credentials_exception
+    return principal
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """
+    The authenticated user as a read-only `UserPrincipal`.
+
+    Served from `services.user_cache` when possible. With
+    `AUTH_TRUST_TOKEN_CLAIMS` the signed claims are used as-is and the
+    database is not consulted at all; the principal then has no profile
+    fields (`full_name` etc. are None) and revocation by token version only
+    takes effect when the token expires. Handlers that modify the user must
+    load the row themselves.
+    """
+    return await _authenticate(token, db, settings.AUTH_TRUST_TOKEN_CLAIMS)
+
+async def get_current_user_profile(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Like `get_current_active_user`, but always with the profile fields filled in."""
+    principal = await _authenticate(token, db, trust_claims=False)
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
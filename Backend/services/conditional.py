@@ -0,0 +1,66 @@
+"""
+HTTP validators (ETag / Last-Modified) and conditional GET handling.
+
+The validators of a response are derived from a cheap aggregate over the
+rows it is built from, typically `COUNT(*)` and `MAX(updated_at)`, plus the
+request parameters. They can be checked before any ORM object is loaded.
+When the client's `If-None-Match` (or, without it, `If-Modified-Since`)
+still matches, the endpoint answers `304 Not Modified` with an empty body.
+
+The ETag is strong: the same validators always come with byte-identical
+JSON. Responses also carry `Cache-Control: no-cache`, so browsers revalidate
+on every use rather than serving a heuristic-fresh copy.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[str]
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime (as stored by the models) as an HTTP date."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def make_validators(key: str, parts: Iterable[Any], last_modified: Optional[datetime]) -> Validators:
+    """
+    Validators for the response identified by `key` (route and parameters)
+    whose underlying rows are summarised by `parts`, e.g. (count, max(updated_at)).
+    """
+    digest = hashlib.sha1("|".join([key] + [str(part) for part in parts]).encode()).hexdigest()
+    return Validators(f'"{digest}"', http_date(last_modified) if last_modified else None)
+
+def is_not_modified(request: Optional[Request], validators: Validators) -> bool:
+    if request is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110, 13.2.2)
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or validators.etag in candidates or f"W/{validators.etag}" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return parsedate_to_datetime(validators.last_modified) <= since
+    return False
+
+def not_modified_response(validators: Validators) -> Response:
+    return Response(status_code=304, headers=validators.headers())
@@ -6,8 +6,6 @@ from typing import List, Dict, Any
 
 from config import settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configure FastMail
@@ -41,10 +39,10 @@ async def send_email(
         
         fm = FastMail(mail_config)
         await fm.send_message(message, template_name=template_name)
-        logger.info(f"Email sent successfully to {email_to}")
+        logger.info("Email sent successfully to %s", email_to)
         return True
     except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}")
+        logger.error("Failed to send email: %s", e)
         return False
 
 async def send_password_reset_email(email: EmailStr, name: str, token: str):
@@ -60,7 +58,7 @@ async def send_password_reset_email(email: EmailStr, name: str, token: str):
     }
     
     # Always log the reset URL for debugging purposes
-    logger.info(f"Password reset URL for {email}: {reset_url}")
+    logger.info("Password reset URL for %s: %s", email, reset_url)
     
     # Send the actual email regardless of environment
     return await send_email(
@@ -83,7 +81,7 @@ async def send_verification_email(email: EmailStr, name: str, token: str):
     }
     
     # Always log the verification URL for debugging purposes
-    logger.info(f"Email verification URL for {email}: {verify_url}")
+    logger.info("Email verification URL for %s: %s", email, verify_url)
     
     # Send the actual email regardless of environment
     return await send_email(
@@ -105,7 +103,7 @@ async def send_welcome_email(email: EmailStr, name: str):
     }
     
     # Always log the welcome email for debugging purposes
-    logger.info(f"Sending welcome email to {email}")
+    logger.info("Sending welcome email to %s", email)
     
     # Send the actual email regardless of environment
     return await send_email(
@@ -0,0 +1,132 @@
+from typing import Iterable, List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import models
+
+# Registration statuses that occupy one of the event's max_participants slots
+SEAT_HOLDING_STATUSES = (
+    models.RegistrationStatus.CONFIRMED,
+    models.RegistrationStatus.ATTENDED,
+)
+
+COUNTER_COLUMNS = ("registrations_count", "confirmed_count", "comments_count", "rating_sum")
+
+def holds_seat(registration: models.Registration) -> bool:
+    """Whether a registration counts against the event capacity."""
+    return registration.status in SEAT_HOLDING_STATUSES
+
+def adjust_event_counters(db: Session, event_id: int, **deltas: int) -> None:
+    """
+    Add the given deltas to the counter columns of one event.
+    
+    The change is issued as a single `UPDATE events SET x = x + :delta` so
+    concurrent writers never lose increments. It is not committed here: the
+    caller commits it together with the registration/comment write it
+    belongs to, so counters and source rows always move in one transaction.
+    """
+    values = {}
+    for name, delta in deltas.items():
+        if name not in COUNTER_COLUMNS:
+            raise ValueError(f"Unknown event counter: {name}")
+        if delta:
+            column = getattr(models.Event, name)
+            values[column] = column + delta
+    
+    if not values:
+        return
+    
+    # Counter changes are not edits of the event itself
+    values[models.Event.updated_at] = models.Event.updated_at
+    
+    (
+        db.query(models.Event)
+        .filter(models.Event.id == event_id)
+        .update(values, synchronize_session=False)
+    )
+
+def _renumber_waitlists(db: Session, event_ids: Optional[List[int]]) -> None:
+    """
+    Renumber the queued tickets of each event 1..n in their current order
+    (ties by registration id), closing gaps and splitting duplicates, so they
+    match `waitlist_served = 0`. Only the tickets that change are written.
+    """
+    query = (
+        db.query(models.Registration.id, models.Registration.event_id, models.Registration.waitlist_ticket)
+        .filter(models.Registration.waitlist_ticket.isnot(None))
+    )
+    if event_ids is not None:
+        query = query.filter(models.Registration.event_id.in_(event_ids))
+    
+    queued, changes = {}, []
+    for registration_id, event_id, ticket in query.order_by(
+        models.Registration.event_id, models.Registration.waitlist_ticket, models.Registration.id
+    ):
+        queued[event_id] = queued.get(event_id, 0) + 1
+        if ticket != queued[event_id]:
+            changes.append({"id": registration_id, "waitlist_ticket": queued[event_id]})
+    if changes:
+        db.execute(update(models.Registration), changes)
+
+def reconcile_event_counters(db: Session, event_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rebuild the counter columns and the waitlist from the registrations and
+    comments tables: queued tickets are renumbered 1..n per event and
+    `waitlist_served` reset to 0, so positions are dense again.
+    
+    Returns the number of events updated. Commits the transaction.
+    """
+    if event_ids is not None:
+        event_ids = list(event_ids)
+    _renumber_waitlists(db, event_ids)
+    
+    registrations = (
+        select(func.count(models.Registration.id))
+        .where(models.Registration.event_id == models.Event.id)
+        .scalar_subquery()
+    )
+    confirmed = (
+        select(func.count(models.Registration.id))
+        .where(
+            models.Registration.event_id == models.Event.id,
+            models.Registration.status.in_(SEAT_HOLDING_STATUSES),
+        )
+        .scalar_subquery()
+    )
+    waitlisted = (
+        select(func.count(models.Registration.id))
+        .where(
+            models.Registration.event_id == models.Event.id,
+            models.Registration.waitlist_ticket.isnot(None),
+        )
+        .scalar_subquery()
+    )
+    comments = (
+        select(func.count(models.Comment.id))
+        .where(models.Comment.event_id == models.Event.id)
+        .scalar_subquery()
+    )
+    rating_sum = (
+        select(func.coalesce(func.sum(models.Comment.rating), 0))
+        .where(models.Comment.event_id == models.Event.id)
+        .scalar_subquery()
+    )
+    
+    query = db.query(models.Event)
+    if event_ids is not None:
+        query = query.filter(models.Event.id.in_(event_ids))
+    
+    updated = query.update(
+        {
+            models.Event.registrations_count: registrations,
+            models.Event.confirmed_count: confirmed,
+            models.Event.waitlist_count: waitlisted,
+            models.Event.waitlist_served: 0,
+            models.Event.comments_count: comments,
+            models.Event.rating_sum: rating_sum,
+            models.Event.updated_at: models.Event.updated_at,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return updated
@@ -0,0 +1,115 @@
+"""
+JSON encoding of large list responses without a Pydantic model per row.
+
+A list endpoint declared with `response_model=List[schemas.Event]` loads
+full ORM objects. FastAPI (or `cached_response`) then validates each one
+into a model, and serializes the model again. For a page of a thousand
+events, that is most of the request time.
+
+`RowEncoder(models.Event, schemas.Event)` derives, once, the columns that
+the schema exposes. The handler selects only those columns as plain rows
+(`query.with_entities(*encoder.columns)`). The encoder turns the rows into
+dicts in schema field order, fills in schema defaults for fields that have
+no column, and encodes the result with orjson. The output is the same JSON
+the response model would produce. The route keeps its `response_model`, so
+the OpenAPI schema does not change.
+
+`parse_fields` resolves a `fields=` query parameter (field names and named
+views such as "card") for sparse fieldsets. `RowEncoder(..., fields=...)`
+then selects and encodes only those columns, so large text columns are
+neither read from the database nor sent.
+
+orjson is optional. Without it the standard library encoder is used, which
+is slower but gives the same output.
+"""
+import json
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic_core import PydanticUndefined
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, date, time)):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, with datetimes as ISO 8601 like Pydantic writes them."""
+    if orjson is not None:
+        # OPT_UTC_Z: Pydantic writes UTC offsets as "Z"
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class UnknownField(ValueError):
+    """Raised when a sparse fieldset names a field the schema does not have."""
+
+def parse_fields(spec: Optional[str], schema, views: Dict[str, Optional[Sequence[str]]],
+                 always: Sequence[str] = ("id",)) -> Optional[Tuple[str, ...]]:
+    """
+    Resolve a `fields=` query value into field names in schema order.
+
+    `spec` is a comma-separated mix of field names and view names, e.g.
+    "card" or "card,description". A view maps to its fields, or to None for
+    every field. The result is None when every field is wanted, so the full
+    encoder is used. `always` fields are included in any subset.
+    """
+    if spec is None or not spec.strip():
+        return None
+    wanted = set(always)
+    for name in (part.strip() for part in spec.split(",")):
+        if not name:
+            continue
+        if name in views:
+            if views[name] is None:
+                return None
+            wanted.update(views[name])
+        elif name in schema.model_fields:
+            wanted.add(name)
+        else:
+            choices = ", ".join(sorted(views) + list(schema.model_fields))
+            raise UnknownField(f"Unknown field '{name}'. Use one of: {choices}")
+    if wanted >= set(schema.model_fields):
+        return None
+    return tuple(name for name in schema.model_fields if name in wanted)
+
+class RowEncoder:
+    """
+    Encodes rows selected with `columns` as the JSON of `schema`, or of the
+    `fields` subset of it. The encoder only reads the first
+    `len(columns)` values of a row, so a query can select more columns after
+    them (e.g. pagination keys).
+    """
+
+    def __init__(self, model, schema, fields: Optional[Sequence[str]] = None):
+        table_columns = model.__table__.columns
+        self.columns = []
+        self._fields = []  # (name, index into the row or None, default)
+        for name, field in schema.model_fields.items():
+            if fields is not None and name not in fields:
+                continue
+            if name in table_columns:
+                self._fields.append((name, len(self.columns), None))
+                self.columns.append(getattr(model, name))
+            elif field.default is not PydanticUndefined:
+                self._fields.append((name, None, field.default))
+            else:
+                raise TypeError(f"{schema.__name__}.{name} has neither a {model.__name__} column nor a default")
+
+    def row(self, row: Sequence[Any]) -> Dict[str, Any]:
+        return {name: row[index] if index is not None else default for name, index, default in self._fields}
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+        return [self.row(row) for row in rows]
+
+    def encode(self, result: Any) -> bytes:
+        """Encode a list of rows, or a `{"items": rows, "next_cursor": ...}` page."""
+        if isinstance(result, dict):
+            # Field order of schemas.CursorPage subclasses: next_cursor, then items
+            return dumps({"next_cursor": result.get("next_cursor"), "items": self.rows(result["items"])})
+        return dumps(self.rows(result))
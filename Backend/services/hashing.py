@@ -0,0 +1,105 @@
+"""
+Password hashing off the event loop.
+
+bcrypt is deliberately slow (~200 ms per hash or verify). Calling it from an
+`async def` handler blocks the event loop for that long and stalls every other
+request on the worker. The functions below run it in a small process pool
+instead, and shed load once too many calls are waiting: beyond
+`PASSWORD_HASH_MAX_PENDING` queued calls `HashingOverloaded` is raised, which
+the API answers with 503 and `Retry-After` rather than letting a login storm
+grow an unbounded backlog.
+
+This module is imported by the pool's child processes, so it must stay free
+of database and application imports.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class HashingOverloaded(Exception):
+    """Too many password hashing calls are already waiting."""
+
+# Functions executed in the pool (must be importable top-level functions)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+class PasswordHasher:
+    """A bounded executor for password hashing with a queue-depth limit."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        """The process pool, created on first use. None when running in-process."""
+        if self._executor is None and self.workers > 0:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: children must not inherit the parent's DB connections or locks
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def start(self) -> None:
+        """Start the worker processes now instead of on the first login."""
+        if self.executor is not None:
+            for future in [self.executor.submit(_hash, "warm-up") for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingOverloaded("Password hashing queue is full")
+            self.pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn: Callable, *args):
+        """Run `fn(*args)` in the pool without blocking the event loop."""
+        self._acquire()
+        try:
+            if self.executor is None:
+                return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+            return await asyncio.wrap_future(self.executor.submit(fn, *args))
+        finally:
+            self._release()
+
+hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+async def hash_password(password: str) -> str:
+    return await hasher.run(_hash, password)
+
+async def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password. Returns `(valid, new_hash)`; `new_hash` is set when the
+    stored hash uses deprecated settings and should be replaced.
+    """
+    return await hasher.run(_verify_and_update, password, hashed_password)
@@ -0,0 +1,172 @@
+"""
+Garbage collection of event images nothing refers to any more.
+
+Blobs in the image store (services/image_store.py) are shared: identical
+uploads map to one key. Replacing an event's image or deleting the event
+therefore never deletes files on the spot. References are counted from
+`Event.image_url` instead, and the collector thread deletes the blobs of
+images no event uses:
+
+- the images passed to `release()`, right after the request that dropped
+  them has committed;
+- everything in the store every `IMAGE_GC_INTERVAL_SECONDS`, which also
+  catches what crashes or direct database edits left behind.
+
+Blobs written or touched in the last `IMAGE_GC_GRACE_SECONDS` are kept even
+when unreferenced. They may belong to an upload whose event is not committed
+yet; `save_upload()` touches a blob it reuses for the same reason. Files
+with other names than content-addressed keys (e.g. uploads from before the
+store) are only deleted when released, never by a full sweep.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from database import SessionLocal
+from services.image_store import ImageStorage, image_store, parse_key
+from services.images import variant_keys
+
+logger = logging.getLogger(__name__)
+
+def image_refcounts(db: Session, urls: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """The number of events using each image URL, for `urls` or for every URL in use."""
+    query = db.query(models.Event.image_url, func.count(models.Event.id)).filter(models.Event.image_url.isnot(None))
+    if urls is not None:
+        query = query.filter(models.Event.image_url.in_(list(urls)))
+    return dict(query.group_by(models.Event.image_url).all())
+
+def _keys_for_url(store: ImageStorage, url: str) -> List[str]:
+    if not url.startswith(store.url_prefix + "/"):
+        return []
+    key = url[len(store.url_prefix) + 1:]
+    match = parse_key(key)
+    if match is None or match["variant"]:
+        return [key]
+    return [key] + [variant for formats in variant_keys(match["digest"]).values() for variant in formats.values()]
+
+def release_unreferenced(db: Session, store: ImageStorage, urls: Iterable[str], grace_seconds: float) -> int:
+    """Delete the blobs of those `urls` no event uses. Returns the number of blobs deleted."""
+    urls = set(urls)
+    in_use = image_refcounts(db, urls)
+    cutoff = time.time() - grace_seconds
+    deleted = 0
+    for url in urls - set(in_use):
+        for key in _keys_for_url(store, url):
+            modified = store.modified(key)
+            if modified is not None and modified < cutoff:
+                store.delete(key)
+                deleted += 1
+    return deleted
+
+def sweep_unreferenced(db: Session, store: ImageStorage, grace_seconds: float) -> int:
+    """Delete every content-addressed blob whose image no event uses. Returns the number deleted."""
+    referenced = {match["digest"] for match in map(parse_key, image_refcounts(db)) if match is not None}
+    cutoff = time.time() - grace_seconds
+    deleted = 0
+    for stored in store.list():
+        match = parse_key(stored.key)
+        if match is None or match["digest"] in referenced or stored.modified >= cutoff:
+            continue
+        store.delete(stored.key)
+        deleted += 1
+    return deleted
+
+class ImageCollector:
+    """Runs `release_unreferenced()` and periodic `sweep_unreferenced()` on a daemon thread."""
+
+    def __init__(
+        self,
+        store: ImageStorage,
+        session_factory=SessionLocal,
+        interval_seconds: float = None,
+        grace_seconds: float = None,
+    ):
+        self.store = store
+        self.session_factory = session_factory
+        self.interval_seconds = settings.IMAGE_GC_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.grace_seconds = settings.IMAGE_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        self.deleted = 0
+        self.sweeps = 0
+        self.last_sweep_seconds: Optional[float] = None
+        self._released: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="image-gc", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def release(self, url: Optional[str]) -> None:
+        """Check `url` for deletion soon. Call after committing the change that stopped using it."""
+        if not url or self._thread is None:
+            return
+        with self._lock:
+            self._released.add(url)
+        self._wake.set()
+
+    def collect_released(self) -> int:
+        with self._lock:
+            urls, self._released = self._released, set()
+        if not urls:
+            return 0
+        with self.session_factory() as db:
+            deleted = release_unreferenced(db, self.store, urls, self.grace_seconds)
+        self.deleted += deleted
+        return deleted
+
+    def sweep(self) -> int:
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            deleted = sweep_unreferenced(db, self.store, self.grace_seconds)
+        self.deleted += deleted
+        self.sweeps += 1
+        self.last_sweep_seconds = time.perf_counter() - started
+        if deleted:
+            logger.info("Deleted %d unreferenced image files", deleted)
+        return deleted
+
+    def _run(self) -> None:
+        next_sweep = time.monotonic()
+        while not self._stopping.is_set():
+            self._wake.wait(max(next_sweep - time.monotonic(), 0))
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                self.collect_released()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.interval_seconds
+                    self.sweep()
+            except Exception as e:
+                logger.error("Image garbage collection failed: %s", e, exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None,
+            "interval_seconds": self.interval_seconds,
+            "grace_seconds": self.grace_seconds,
+            "sweeps": self.sweeps,
+            "deleted": self.deleted,
+            "pending": len(self._released),
+            "last_sweep_seconds": round(self.last_sweep_seconds, 3) if self.last_sweep_seconds is not None else None,
+        }
+
+image_collector = ImageCollector(image_store)
@@ -0,0 +1,222 @@
+"""
+Content-addressed storage for event images.
+
+Every stored file is keyed by the sha256 of the original upload:
+
+    ab/cd/abcd…ef.png          the original
+    ab/cd/abcd…ef-card.webp    its variants (see services/images.py)
+
+The first two byte pairs of the hash are used as directories. No directory
+then holds more than a few hundred files, even with millions of images.
+Identical uploads map to the same key and are stored once. Nothing is
+deleted when an event drops an image: `services/image_gc.py` removes blobs
+once no `Event.image_url` refers to them.
+
+Two backends implement `ImageStorage`:
+
+    LocalImageStorage   files under static/event_images, served by the API's /static mount
+    S3ImageStorage      any S3-compatible bucket (AWS, MinIO, R2) through a boto3 client
+
+`IMAGE_STORAGE` chooses one. The S3 backend needs the optional boto3 package.
+
+Like services/images.py, this module is imported by the image pool's child
+processes and must stay free of database and application imports.
+"""
+import mimetypes
+import os
+import re
+import tempfile
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from config import settings
+
+# <digest>.<ext> or <digest>-<variant>.<ext>, optionally below the shard directories
+_KEY = re.compile(r"(?:^|/)(?P<digest>[0-9a-f]{64})(?:-(?P<variant>[a-z]+))?\.(?P<extension>[a-z0-9]+)$")
+
+class StoredObject(NamedTuple):
+    key: str
+    modified: float  # Unix time of the last write (or touch)
+
+def shard_key(digest: str, extension: str, variant: Optional[str] = None) -> str:
+    name = f"{digest}-{variant}" if variant else digest
+    return f"{digest[:2]}/{digest[2:4]}/{name}.{extension}"
+
+def parse_key(key_or_url: str) -> Optional[re.Match]:
+    """The digest, variant and extension of a content-addressed key or URL, or None (e.g. legacy names)."""
+    return _KEY.search(key_or_url)
+
+class ImageStorage:
+    """Where image blobs live. Keys are `shard_key()` paths; objects are never modified once written."""
+
+    url_prefix: str
+
+    @property
+    def staging_dir(self) -> str:
+        """A local directory for temporary files that `put()` will take over."""
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def modified(self, key: str) -> Optional[float]:
+        """When `key` was last written or touched (Unix time), or None if it does not exist."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.modified(key) is not None
+
+    def put(self, key: str, path: str) -> None:
+        """Store the local file at `path` under `key`. The file is moved or removed."""
+        raise NotImplementedError
+
+    def touch(self, key: str) -> None:
+        """Mark `key` as just written, so the garbage collector's grace period starts again."""
+        raise NotImplementedError
+
+    def fetch(self, key: str, directory: str) -> str:
+        """A local path with the content of `key`, in `directory` unless the backend is local."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove `key`; a missing key is not an error."""
+        raise NotImplementedError
+
+    def list(self) -> Iterator[StoredObject]:
+        raise NotImplementedError
+
+class LocalImageStorage(ImageStorage):
+    def __init__(self, root: str = "static/event_images", url_prefix: str = "/static/event_images"):
+        self.root = root
+        self.url_prefix = url_prefix
+        # Called with every key written, touched or deleted (e.g. by services/static_manifest.py)
+        self.listeners: List[Callable[[str], None]] = []
+
+    def _changed(self, key: str) -> None:
+        for listener in self.listeners:
+            listener(key)
+
+    @property
+    def staging_dir(self) -> str:
+        # On the same filesystem as the store, so put() is a rename
+        directory = os.path.join(self.root, ".staging")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def modified(self, key: str) -> Optional[float]:
+        try:
+            return os.stat(self.path(key)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, path: str) -> None:
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(path, 0o644)  # mkstemp creates 0600; a reverse proxy may serve the file
+        os.replace(path, target)
+        self._changed(key)
+
+    def touch(self, key: str) -> None:
+        os.utime(self.path(key))
+        self._changed(key)
+
+    def fetch(self, key: str, directory: str) -> str:
+        return self.path(key)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            return
+        self._changed(key)
+
+    def list(self) -> Iterator[StoredObject]:
+        for directory, subdirectories, files in os.walk(self.root):
+            if directory == self.root:
+                subdirectories[:] = [name for name in subdirectories if name != ".staging"]
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    modified = os.stat(path).st_mtime
+                except FileNotFoundError:
+                    continue  # Deleted while walking
+                yield StoredObject(os.path.relpath(path, self.root).replace(os.sep, "/"), modified)
+
+class S3ImageStorage(ImageStorage):
+    """
+    A bucket of an S3-compatible service. `client` is a boto3 S3 client, or
+    anything with the same methods. `url_prefix` is the public URL of the
+    bucket, e.g. a CDN in front of it.
+    """
+
+    def __init__(self, client, bucket: str, url_prefix: str):
+        self.client = client
+        self.bucket = bucket
+        self.url_prefix = url_prefix.rstrip("/")
+
+    @property
+    def staging_dir(self) -> str:
+        return tempfile.gettempdir()
+
+    def modified(self, key: str) -> Optional[float]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            # botocore's ClientError, without importing botocore
+            if getattr(e, "response", {}).get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["LastModified"].timestamp()
+
+    @staticmethod
+    def _headers(key: str) -> dict:
+        return {
+            "ContentType": mimetypes.guess_type(key)[0] or "application/octet-stream",
+            "CacheControl": "public, max-age=31536000, immutable",  # Keys never change content
+        }
+
+    def put(self, key: str, path: str) -> None:
+        try:
+            self.client.upload_file(path, self.bucket, key, ExtraArgs=self._headers(key))
+        finally:
+            os.remove(path)
+
+    def touch(self, key: str) -> None:
+        # S3 has no utime: copying an object onto itself (with its headers restated) renews LastModified
+        self.client.copy_object(
+            Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": key},
+            MetadataDirective="REPLACE", **self._headers(key),
+        )
+
+    def fetch(self, key: str, directory: str) -> str:
+        fd, path = tempfile.mkstemp(dir=directory, suffix=os.path.splitext(key)[1])
+        os.close(fd)
+        self.client.download_file(self.bucket, key, path)
+        return path
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def list(self) -> Iterator[StoredObject]:
+        request = {"Bucket": self.bucket}
+        while True:
+            page = self.client.list_objects_v2(**request)
+            for item in page.get("Contents", ()):
+                yield StoredObject(item["Key"], item["LastModified"].timestamp())
+            if not page.get("IsTruncated"):
+                return
+            request["ContinuationToken"] = page["NextContinuationToken"]
+
+def storage_from_settings() -> ImageStorage:
+    if settings.IMAGE_STORAGE == "s3":
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("IMAGE_STORAGE=s3 needs the boto3 package (pip install boto3)")
+        client = boto3.client("s3", endpoint_url=settings.IMAGE_S3_ENDPOINT_URL or None)
+        return S3ImageStorage(client, settings.IMAGE_S3_BUCKET, settings.IMAGE_S3_PUBLIC_URL)
+    return LocalImageStorage()
+
+image_store = storage_from_settings()
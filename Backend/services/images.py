@@ -0,0 +1,249 @@
+"""
+Event image uploads and their resized variants.
+
+`save_upload()` copies an uploaded file to a temporary file in chunks. While
+copying it enforces `IMAGE_MAX_BYTES`, checks from the first bytes that the
+content really is a JPEG, PNG, GIF or WebP image (the filename and the
+client's content type are ignored), and hashes the content. The file is
+then handed to the content-addressed store (services/image_store.py) under
+its sha256. Uploading the same image again reuses the stored blob.
+
+`image_pipeline.submit()` renders the `card` (list thumbnails) and `detail`
+sizes as WebP and JPEG in a process pool and stores them next to the
+original. The variant map is given to a callback when it is done. The
+request does not wait: `Event.image_variants` is null until the variants
+exist, and clients fall back to `image_url`.
+
+    {"card":     {"webp": "/static/event_images/ab/cd/<sha256>-card.webp", "jpeg": ".../<sha256>-card.jpg"},
+     "detail":   {"webp": ..., "jpeg": ...},
+     "original": {"png": "/static/event_images/ab/cd/<sha256>.png"}}
+
+Resizing needs the optional Pillow package (`pip install Pillow`). Without
+it, uploads still work, but no variants are produced.
+
+This module is imported by the pool's child processes, so it must stay free
+of database and application imports.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional
+
+from config import settings
+from services.image_store import ImageStorage, image_store, shard_key
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Longest side of each variant, in pixels. Smaller images are not enlarged.
+VARIANT_SIZES = {"card": 480, "detail": 1280}
+# Variant formats: name in the variant map, file extension
+VARIANT_FORMATS = {"webp": "webp", "jpeg": "jpg"}
+# Refuse to decode larger images ("decompression bombs")
+MAX_PIXELS = 50_000_000
+
+class InvalidImage(ValueError):
+    """The upload is not a JPEG, PNG, GIF or WebP image."""
+
+class ImageTooLarge(ValueError):
+    """The upload exceeds `IMAGE_MAX_BYTES`."""
+
+class StoredImage(NamedTuple):
+    digest: str     # sha256 of the content
+    extension: str  # from the sniffed format, e.g. "jpg"
+    key: str        # in the image store
+    url: str
+    size: int
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """The file extension for the image format of `head`, or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def save_upload(source: BinaryIO, store: Optional[ImageStorage] = None, max_bytes: Optional[int] = None) -> StoredImage:
+    """Stream `source` into the image store under its sha256. Raises InvalidImage or ImageTooLarge."""
+    store = store or image_store
+    max_bytes = settings.IMAGE_MAX_BYTES if max_bytes is None else max_bytes
+    digest, size, extension = hashlib.sha256(), 0, None
+    fd, temp_path = tempfile.mkstemp(dir=store.staging_dir, prefix="upload-")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if extension is None:
+                    extension = sniff_format(chunk)
+                    if extension is None:
+                        raise InvalidImage("Upload a JPEG, PNG, GIF or WebP image")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageTooLarge(f"Images are limited to {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                target.write(chunk)
+        if extension is None:
+            raise InvalidImage("The uploaded file is empty")
+
+        key = shard_key(digest.hexdigest(), extension)
+        if store.exists(key):
+            # Same content already stored. Touching it keeps the garbage
+            # collector off it until this upload's event is committed.
+            os.remove(temp_path)
+            store.touch(key)
+        else:
+            store.put(key, temp_path)
+        return StoredImage(digest.hexdigest(), extension, key, store.url(key), size)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def variant_keys(digest: str) -> Dict[str, Dict[str, str]]:
+    return {
+        name: {fmt: shard_key(digest, extension, name) for fmt, extension in VARIANT_FORMATS.items()}
+        for name in VARIANT_SIZES
+    }
+
+def variant_map(digest: str, extension: str, store: Optional[ImageStorage] = None) -> Dict[str, Dict[str, str]]:
+    store = store or image_store
+    variants = {
+        name: {fmt: store.url(key) for fmt, key in keys.items()}
+        for name, keys in variant_keys(digest).items()
+    }
+    variants["original"] = {"jpeg" if extension == "jpg" else extension: store.url(shard_key(digest, extension))}
+    return variants
+
+# Runs in the pool (must be an importable top-level function)
+
+def render_variants(path: str, digest: str, directory: str) -> List[str]:
+    """Write the resized variants of the image at `path` to `directory` and return their file names."""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    names = []
+    with Image.open(path) as image:
+        # Pillow only warns up to twice MAX_IMAGE_PIXELS; refuse before anything is decoded
+        if image.width * image.height > MAX_PIXELS:
+            raise Image.DecompressionBombError(
+                f"Image size ({image.width * image.height} pixels) exceeds limit of {MAX_PIXELS} pixels"
+            )
+        image = ImageOps.exif_transpose(image)  # Phone photos store their rotation in EXIF
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        for name, longest_side in VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((longest_side, longest_side), Image.LANCZOS)
+            resized.save(os.path.join(directory, f"{digest}-{name}.webp"), "WEBP", quality=80, method=4)
+            if has_alpha:
+                # JPEG has no alpha channel: flatten onto white
+                flat = Image.new("RGB", resized.size, (255, 255, 255))
+                flat.paste(resized, mask=resized.getchannel("A"))
+                resized = flat
+            resized.save(os.path.join(directory, f"{digest}-{name}.jpg"), "JPEG",
+                         quality=82, optimize=True, progressive=True)
+            names += [f"{digest}-{name}.webp", f"{digest}-{name}.jpg"]
+    return names
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class ImagePipeline:
+    """
+    Renders image variants in a process pool and reports the result through a callback.
+
+    A job thread per worker fetches the original from the store, waits for
+    the pool to render it and stores the variants. With `workers=0` the job
+    thread renders itself.
+    """
+
+    def __init__(self, workers: int, store: ImageStorage):
+        self.workers = workers
+        self.store = store
+        self.available = pillow_available()
+        self.rendered = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._jobs: Optional[ThreadPoolExecutor] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if not self.available:
+            logger.warning("Pillow is not installed: event images are stored without resized variants")
+
+    @property
+    def jobs(self) -> ThreadPoolExecutor:
+        if self._jobs is None:
+            with self._lock:
+                if self._jobs is None:
+                    if self.workers > 0:
+                        # spawn: children must not inherit the parent's DB connections or locks
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    self._jobs = ThreadPoolExecutor(max_workers=max(self.workers, 1),
+                                                    thread_name_prefix="image-variants")
+        return self._jobs
+
+    def _process(self, image: StoredImage) -> Dict[str, Dict[str, str]]:
+        keys = [key for formats in variant_keys(image.digest).values() for key in formats.values()]
+        if all(self.store.exists(key) for key in keys):
+            for key in keys:
+                self.store.touch(key)  # Rendered for an earlier upload of the same image
+            return variant_map(image.digest, image.extension, self.store)
+
+        work = tempfile.mkdtemp(dir=self.store.staging_dir, prefix="render-")
+        try:
+            source = self.store.fetch(image.key, work)
+            if self._pool is not None:
+                self._pool.submit(render_variants, source, image.digest, work).result()
+            else:
+                render_variants(source, image.digest, work)
+            for key in keys:
+                self.store.put(key, os.path.join(work, key.rsplit("/", 1)[1]))
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return variant_map(image.digest, image.extension, self.store)
+
+    def submit(self, image: StoredImage, on_done: Callable[[Dict[str, Dict[str, str]]], None]) -> Optional[Future]:
+        """Render the variants of `image` in the background, then call `on_done(variants)`."""
+        if not self.available:
+            return None
+        future = self.jobs.submit(self._process, image)
+
+        def finished(done: Future) -> None:
+            try:
+                on_done(done.result())
+                self.rendered += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Could not render the variants of %s: %s", image.url, e, exc_info=True)
+
+        future.add_done_callback(finished)
+        return future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._jobs is not None:
+                self._jobs.shutdown(wait=True)
+                self._jobs = None
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+image_pipeline = ImagePipeline(settings.IMAGE_WORKERS, image_store)
@@ -0,0 +1,178 @@
+"""
+Central logging setup: a queue in front of the handlers, JSON records with
+request ids, and sampling of high-volume debug output.
+
+`configure_logging()` is called once at startup (main.py, mail_worker.py).
+It installs a single `QueueHandler` on the root logger. A `QueueListener`
+thread takes the records off the queue, serializes them and writes them to
+stderr, so request threads never block on I/O. The message itself is still
+rendered on the calling thread when the record is enqueued. Arguments can be
+ORM objects whose `__repr__` lazy-loads, and they must not reach another
+thread.
+
+Write log calls with %-style arguments (`logger.debug("Found %d events", n)`),
+not f-strings. A record below `LOG_LEVEL`, or dropped by sampling, then
+costs a level check and nothing else.
+
+    LOG_LEVEL          root level (default INFO)
+    LOG_FORMAT         json (one object per line) or text
+    LOG_SAMPLE_RATES   "routes.event=0.01,sqlalchemy.engine=0.1": keep that fraction
+                       of the DEBUG records from a logger and its children
+
+JSON records carry `ts`, `level`, `logger`, `msg`, the `request_id` of the
+HTTP request being served (`RequestIdMiddleware`, echoed as `X-Request-ID`),
+`exc` when there is a traceback, and any fields passed with `extra=`.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra=` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """ "a.b=0.1, c=0.5" -> {"a.b": 0.1, "c": 0.5} """
+    rates = {}
+    for part in spec.split(","):
+        if part.strip():
+            name, _, rate = part.partition("=")
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id, on the thread that created them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records at or below `max_level` from the configured loggers."""
+
+    def __init__(self, rates: Dict[str, float], max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rates = rates
+        self.max_level = max_level
+        self._resolved: Dict[str, float] = {}
+
+    def rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            # The closest configured ancestor wins: "routes" covers "routes.event"
+            rate, probe = 1.0, name
+            while probe:
+                if probe in self.rates:
+                    rate = self.rates[probe]
+                    break
+                probe = probe.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback here, but leave the JSON encoding to the listener
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging(level: str = "INFO", fmt: str = "json", sample_rates: str = "", stream=None) -> None:
+    """Route all logging through one queue and a background writer thread. Safe to call again."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(
+        JsonFormatter() if fmt == "json"
+        else logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s]: %(message)s")
+    )
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging() -> None:
+    """Flush the queue and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each HTTP request an id for its log records (`X-Request-ID`)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = next((value for name, value in scope["headers"] if name == b"x-request-id"), None)
+        # Accept the proxy's id if it looks sane, otherwise make one up
+        current = incoming.decode("latin-1") if incoming and len(incoming) <= 128 else uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", current.encode("latin-1"))]
+            await send(message)
+
+        token = request_id.set(current)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,180 @@
+import logging
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound, select_autoescape
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+_templates = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+)
+_missing_templates = set()  # Names already looked up and not found on disk
+
+def render_email(template_name: Optional[str], body: Dict[str, Any]) -> str:
+    """
+    Render the HTML of an outbox email.
+
+    Notifications that ship prebuilt HTML in `body["content"]` and have no
+    template file on disk are sent as-is.
+    """
+    if template_name and template_name not in _missing_templates:
+        try:
+            return _templates.get_template(template_name).render(**body)
+        except TemplateNotFound:
+            _missing_templates.add(template_name)
+    return body.get("content", "")
+
+def build_message(recipient: str, subject: str, html: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content("This email requires an HTML capable client.")
+    message.add_alternative(html, subtype="html")
+    return message
+
+class RateLimiter:
+    """Thread-safe token bucket allowing `per_minute` sends per minute (0 = unlimited)."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.per_minute <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.per_minute, self.tokens + (now - self.updated) * self.per_minute / 60.0)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * 60.0 / self.per_minute
+            time.sleep(wait)
+
+class SMTPConnection:
+    """One SMTP session that is opened lazily and reused for many messages."""
+
+    def __init__(self, host, port, username=None, password=None, starttls=False,
+                 ssl_tls=False, validate_certs=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.ssl_tls = ssl_tls
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+        self.client: Optional[smtplib.SMTP] = None
+        self.opened = 0  # Number of times a TCP session was established
+
+    def _context(self):
+        context = ssl.create_default_context()
+        if not self.validate_certs:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def connect(self) -> smtplib.SMTP:
+        if self.ssl_tls:
+            client = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=self._context())
+        else:
+            client = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                client.starttls(context=self._context())
+        if self.username:
+            client.login(self.username, self.password)
+        self.opened += 1
+        return client
+
+    def send(self, message: EmailMessage) -> None:
+        if self.client is None:
+            self.client = self.connect()
+        try:
+            self.client.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed an idle session: reconnect once and retry
+            self.client = self.connect()
+            self.client.send_message(message)
+
+    def close(self) -> None:
+        if self.client is not None:
+            try:
+                self.client.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.client = None
+
+class SMTPPool:
+    """A fixed number of reusable SMTP connections shared by sender threads."""
+
+    def __init__(self, size: int, **connection_kwargs):
+        self.connections = [SMTPConnection(**connection_kwargs) for _ in range(max(1, size))]
+        self.idle = queue.Queue()
+        for connection in self.connections:
+            self.idle.put(connection)
+
+    @classmethod
+    def from_settings(cls, size: Optional[int] = None) -> "SMTPPool":
+        return cls(
+            size or settings.MAIL_POOL_SIZE,
+            host=settings.MAIL_SERVER,
+            port=settings.MAIL_PORT,
+            username=settings.MAIL_USERNAME if settings.MAIL_USE_CREDENTIALS else None,
+            password=settings.MAIL_PASSWORD if settings.MAIL_USE_CREDENTIALS else None,
+            starttls=settings.MAIL_STARTTLS,
+            ssl_tls=settings.MAIL_SSL_TLS,
+            validate_certs=settings.MAIL_VALIDATE_CERTS,
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.connections)
+
+    @property
+    def connections_opened(self) -> int:
+        return sum(connection.opened for connection in self.connections)
+
+    @contextmanager
+    def connection(self):
+        connection = self.idle.get()
+        try:
+            yield connection
+        except smtplib.SMTPResponseException:
+            # The server rejected this message; smtplib has already reset the session
+            raise
+        except Exception:
+            # Do not hand a session in an unknown state to the next sender
+            connection.close()
+            raise
+        finally:
+            self.idle.put(connection)
+
+    def close(self) -> None:
+        for connection in self.connections:
+            connection.close()
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx replies (bad recipient, rejected content) will not succeed on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    code = getattr(error, "smtp_code", None)
+    return code is not None and 500 <= code < 600
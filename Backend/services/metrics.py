@@ -0,0 +1,225 @@
+"""
+Process metrics in the Prometheus text exposition format (`GET /api/metrics`).
+
+Recorded continuously:
+
+    eventnow_http_requests_total            requests by method, route template and status
+    eventnow_http_request_duration_seconds  latency histogram by method and route template
+    eventnow_http_requests_in_flight        requests being served right now
+    eventnow_db_pool_*                      checkouts, checkout wait histogram and timeouts
+                                            of the `database.engine` pool (MeteredQueuePool)
+
+Read when scraped (see routes/metrics.py): the pool's current size,
+checked-out connections and overflow, the email outbox depth and the hit
+counters of the response and user caches.
+
+`MetricsMiddleware` is plain ASGI rather than `BaseHTTPMiddleware`, which
+would start an extra task per request. It runs on the event loop thread
+only, so HTTP samples are plain dict and list updates without locks.
+Recording a request costs a few microseconds; an empty BaseHTTPMiddleware
+costs about 300 (benchmarks/bench_metrics.py).
+Routes are labelled by their template (`/api/events/{event_id}`), never by
+the raw path, so label cardinality stays bounded. Values are per process:
+with several uvicorn workers, each worker is scraped on its own.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends "; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Exposition:
+    """Builds a text exposition, one metric family at a time."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, Labels, float]]) -> None:
+        """`samples` are (name suffix, labels, value), e.g. ("_bucket", (("le", "0.1"),), 3)."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            self.lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+    def gauge(self, name: str, help_text: str, values: Dict[Labels, float]) -> None:
+        self.family(name, "gauge", help_text, [("", labels, value) for labels, value in values.items()])
+
+    def counter(self, name: str, help_text: str, values: Dict[Labels, float]) -> None:
+        self.family(name, "counter", help_text, [("_total", labels, value) for labels, value in values.items()])
+
+    def histogram(self, name: str, help_text: str, histograms: Dict[Labels, "Histogram"]) -> None:
+        samples = []
+        for labels, histogram in histograms.items():
+            samples.extend(histogram.samples(labels))
+        self.family(name, "histogram", help_text, samples)
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+class Histogram:
+    """Cumulative-on-read histogram: `observe` increments a single bucket."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, labels: Labels):
+        cumulative = 0
+        for bound, count in zip(list(self.bounds) + [float("inf")], self.counts):
+            cumulative += count
+            yield "_bucket", labels + (("le", _format_value(float(bound))),), cumulative
+        yield "_sum", labels, self.sum
+        yield "_count", labels, cumulative
+
+class HttpMetrics:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def collect(self, out: Exposition) -> None:
+        out.counter(
+            "eventnow_http_requests", "HTTP requests by method, route and status code.",
+            {(("method", m), ("route", r), ("status", str(s))): n for (m, r, s), n in list(self.requests.items())},
+        )
+        out.histogram(
+            "eventnow_http_request_duration_seconds", "HTTP request latency by method and route.",
+            {(("method", m), ("route", r)): h for (m, r), h in list(self.latency.items())},
+        )
+        out.gauge("eventnow_http_requests_in_flight", "HTTP requests being served.", {(): self.in_flight})
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "app_root_path" in scope:
+        # A mounted app such as /static: one label for everything below it
+        return scope["root_path"] + "/{path}"
+    return "<unmatched>"
+
+class MetricsMiddleware:
+    """ASGI middleware recording every HTTP request into `http_metrics`."""
+
+    def __init__(self, app, metrics: Optional[HttpMetrics] = None):
+        self.app = app
+        self.metrics = metrics or http_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = self.metrics
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight -= 1
+            metrics.observe(scope["method"], _route_template(scope), status, time.perf_counter() - started)
+
+class PoolMetrics:
+    """Counters fed by `MeteredQueuePool` from whichever thread checks out a connection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait = Histogram(POOL_WAIT_BUCKETS)
+
+    def record(self, seconds: float, timed_out: bool) -> None:
+        with self.lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait.observe(seconds)
+
+    def collect(self, out: Exposition, pool) -> None:
+        with self.lock:
+            checkouts, timeouts = self.checkouts, self.timeouts
+            wait = Histogram(POOL_WAIT_BUCKETS)
+            wait.counts, wait.sum = list(self.wait.counts), self.wait.sum
+        out.counter("eventnow_db_pool_checkouts", "Connections handed out by the pool.", {(): checkouts})
+        out.counter(
+            "eventnow_db_pool_timeouts", "Checkouts that gave up after the pool timeout.", {(): timeouts},
+        )
+        out.histogram(
+            "eventnow_db_pool_wait_seconds", "Time to obtain a connection, including opening new ones.", {(): wait},
+        )
+        if isinstance(pool, QueuePool):
+            out.gauge("eventnow_db_pool_size", "Configured number of pooled connections.", {(): pool.size()})
+            out.gauge("eventnow_db_pool_checked_out", "Connections currently in use.", {(): pool.checkedout()})
+            out.gauge("eventnow_db_pool_checked_in", "Idle connections in the pool.", {(): pool.checkedin()})
+            out.gauge(
+                "eventnow_db_pool_overflow", "Connections open beyond the pool size.", {(): max(0, pool.overflow())},
+            )
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that reports checkout wait times and timeouts to `pool_metrics`."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_metrics.record(time.perf_counter() - started, timed_out)
+
+def cache_families(out: Exposition, caches: Dict[str, dict]) -> None:
+    """Hit/miss counters and hit ratios from the caches' `stats()`."""
+    out.counter("eventnow_cache_hits", "Cache lookups answered from the cache.",
+                {(("cache", name),): stats["hits"] for name, stats in caches.items()})
+    out.counter("eventnow_cache_misses", "Cache lookups that missed.",
+                {(("cache", name),): stats["misses"] for name, stats in caches.items()})
+    out.gauge("eventnow_cache_hit_ratio", "Hits over lookups since the process started.",
+              {(("cache", name),): stats["hit_ratio"] for name, stats in caches.items()})
+
+http_metrics = HttpMetrics()
+pool_metrics = PoolMetrics()
@@ -1,67 +1,66 @@
 import logging
-from fastapi import BackgroundTasks
-from services.email import send_email
+from sqlalchemy.orm import Session
+from services.outbox import enqueue_email, enqueue_email_to_active_users
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def send_event_notification_email(background_tasks: BackgroundTasks, event, recipients):
+# Notifications are written to the `email_outbox` table in the caller's
+# transaction and delivered by `mail_worker.py`. None of these functions
+# commit: the emails are queued if and only if the caller's change is.
+
+def queue_event_notification(db: Session, event) -> int:
     """
-    Send an email notification about a new event
-    
+    Queue an email about a new event for every active user
+
     Args:
-        background_tasks: FastAPI BackgroundTasks for async processing
-        event: The event object
-        recipients: List of email addresses to notify
+        db: Database session the event was created in
+        event: The event object (must have been flushed so it has an id)
+
+    Returns:
+        Number of emails queued
     """
     subject = f"New Event: {event.title}"
-    
+
     # Create HTML content
     html_content = f"""
     <h2>New Event: {event.title}</h2>
     <p><strong>Description:</strong> {event.description}</p>
     <p>
-        <strong>When:</strong> {event.start_datetime.strftime('%Y-%m-%d %H:%M')} - 
+        <strong>When:</strong> {event.start_datetime.strftime('%Y-%m-%d %H:%M')} -
         {event.end_datetime.strftime('%Y-%m-%d %H:%M')}
     </p>
     <p><strong>Where:</strong> {event.location}</p>
     <p><strong>Category:</strong> {event.category}</p>
     <a href="http://localhost:3000/events/{event.id}">View Event Details</a>
     """
-    
-    # Send to each recipient
-    for recipient in recipients:
-        try:
-            background_tasks.add_task(
-                send_email,
-                [recipient],
-                subject,
-                {"content": html_content},
-                "event_notification.html"
-            )
-            logger.info(f"Event notification email queued for {recipient}")
-        except Exception as e:
-            logger.error(f"Failed to queue event notification email for {recipient}: {str(e)}")
-
-async def send_registration_notification_email(background_tasks: BackgroundTasks, registration):
+
+    queued = enqueue_email_to_active_users(
+        db, subject, {"content": html_content}, "event_notification.html"
+    )
+    logger.info("Event notification queued for %d recipients", queued)
+    return queued
+
+def queue_registration_notification(db: Session, registration) -> int:
     """
-    Send an email notification about a new registration
-    
+    Queue an email to the organizer about a new registration
+
     Args:
-        background_tasks: FastAPI BackgroundTasks for async processing
+        db: Database session the registration was created in
         registration: The registration object
+
+    Returns:
+        Number of emails queued
     """
     event = registration.event
     user = registration.user
     organizer_email = event.organizer.email if event.organizer else None
-    
+
     if not organizer_email:
-        logger.warning(f"No organizer email found for event {event.id}")
-        return
-    
+        logger.warning("No organizer email found for event %d", event.id)
+        return 0
+
     subject = f"New Registration: {event.title}"
-    
+
     # Create HTML content
     html_content = f"""
     <h2>New Registration for {event.title}</h2>
@@ -70,15 +69,39 @@ async def send_registration_notification_email(background_tasks: BackgroundTasks
     <p><strong>Status:</strong> {registration.status}</p>
     <a href="http://localhost:3000/events/{event.id}/registrations">View All Registrations</a>
     """
-    
-    try:
-        background_tasks.add_task(
-            send_email,
-            [organizer_email],
-            subject,
-            {"content": html_content},
-            "registration_notification.html"
-        )
-        logger.info(f"Registration notification email queued for {organizer_email}")
-    except Exception as e:
-        logger.error(f"Failed to queue registration notification email: {str(e)}")
+
+    return enqueue_email(
+        db, [organizer_email], subject, {"content": html_content}, "registration_notification.html"
+    )
+
+def queue_waitlist_promotion(db: Session, registration) -> int:
+    """
+    Queue an email telling a user that they moved from the waitlist into a confirmed seat
+
+    Args:
+        db: Database session the promotion happened in
+        registration: The promoted registration
+
+    Returns:
+        Number of emails queued
+    """
+    event = registration.event
+    user = registration.user
+
+    subject = f"You're in: {event.title}"
+
+    # Create HTML content
+    html_content = f"""
+    <h2>A seat opened up for {event.title}</h2>
+    <p>Hi {user.full_name}, your spot on the waitlist has been confirmed.</p>
+    <p>
+        <strong>When:</strong> {event.start_datetime.strftime('%Y-%m-%d %H:%M')} -
+        {event.end_datetime.strftime('%Y-%m-%d %H:%M')}
+    </p>
+    <p><strong>Where:</strong> {event.location}</p>
+    <a href="http://localhost:3000/events/{event.id}">View Event Details</a>
+    """
+
+    return enqueue_email(
+        db, [user.email], subject, {"content": html_content}, "waitlist_promotion.html"
+    )
@@ -0,0 +1,180 @@
+import json
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+import models
+from models import OutboxStatus
+
+# Snapshot of a claimed row, safe to hand to sender threads after the claim is committed
+ClaimedEmail = namedtuple("ClaimedEmail", "id recipient subject template_name body attempts")
+
+def enqueue_email(
+    db: Session,
+    recipients: Iterable[str],
+    subject: str,
+    body: Dict[str, Any],
+    template_name: Optional[str] = None,
+) -> int:
+    """
+    Queue one email per recipient in the outbox.
+
+    The rows are written with a single multi-row INSERT and are not
+    committed here: they become visible to the worker together with the
+    caller's own changes, so a notification is never sent for a write that
+    was rolled back, nor lost once it was committed.
+    """
+    encoded = json.dumps(body)
+    rows = [
+        {
+            "recipient": recipient,
+            "subject": subject,
+            "template_name": template_name,
+            "body": encoded,
+            "status": OutboxStatus.PENDING,
+            "attempts": 0,
+            "next_attempt_at": datetime.utcnow(),
+            "created_at": datetime.utcnow(),
+        }
+        for recipient in recipients
+    ]
+    if rows:
+        db.execute(insert(models.EmailOutbox), rows)
+    return len(rows)
+
+def enqueue_email_to_active_users(
+    db: Session,
+    subject: str,
+    body: Dict[str, Any],
+    template_name: Optional[str] = None,
+) -> int:
+    """
+    Queue one email for every active user with `INSERT ... SELECT`.
+
+    Recipients are copied inside the database, so fanning out to tens of
+    thousands of users does not load a single User row into Python.
+    Not committed here.
+    """
+    now = datetime.utcnow()
+    recipients = select(
+        models.User.email,
+        literal(subject),
+        literal(template_name),
+        literal(json.dumps(body)),
+        literal(OutboxStatus.PENDING),
+        literal(0),
+        literal(now),
+        literal(now),
+    ).where(models.User.is_active == True)
+
+    result = db.execute(
+        insert(models.EmailOutbox).from_select(
+            ["recipient", "subject", "template_name", "body", "status",
+             "attempts", "next_attempt_at", "created_at"],
+            recipients,
+        )
+    )
+    return result.rowcount
+
+def claim_batch(db: Session, limit: int, lease_seconds: int) -> List[ClaimedEmail]:
+    """
+    Claim up to `limit` due emails for this worker and commit the claim.
+
+    Rows stuck in `sending` for longer than `lease_seconds` (a worker died
+    mid-batch) are claimable again. On PostgreSQL `SKIP LOCKED` lets several
+    workers drain the outbox in parallel without blocking each other.
+    """
+    now = datetime.utcnow()
+    due = or_(
+        and_(
+            models.EmailOutbox.status == OutboxStatus.PENDING,
+            models.EmailOutbox.next_attempt_at <= now,
+        ),
+        and_(
+            models.EmailOutbox.status == OutboxStatus.SENDING,
+            models.EmailOutbox.locked_at < now - timedelta(seconds=lease_seconds),
+        ),
+    )
+    batch = (
+        db.query(models.EmailOutbox)
+        .filter(due)
+        .order_by(models.EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = []
+    for item in batch:
+        item.status = OutboxStatus.SENDING
+        item.locked_at = now
+        item.attempts += 1
+        claimed.append(ClaimedEmail(
+            item.id, item.recipient, item.subject, item.template_name, item.body, item.attempts,
+        ))
+    db.commit()
+    return claimed
+
+def mark_sent(db: Session, ids: List[int]) -> None:
+    """Mark delivered emails as sent. Not committed here."""
+    if not ids:
+        return
+    (
+        db.query(models.EmailOutbox)
+        .filter(models.EmailOutbox.id.in_(ids))
+        .update(
+            {
+                models.EmailOutbox.status: OutboxStatus.SENT,
+                models.EmailOutbox.sent_at: datetime.utcnow(),
+                models.EmailOutbox.locked_at: None,
+                models.EmailOutbox.last_error: None,
+            },
+            synchronize_session=False,
+        )
+    )
+
+def mark_failed(
+    db: Session,
+    email: ClaimedEmail,
+    error: str,
+    max_attempts: int,
+    retry_base_seconds: int,
+    permanent: bool = False,
+) -> None:
+    """
+    Record a failed delivery attempt. Not committed here.
+
+    The email is retried with exponential backoff (plus jitter so a burst of
+    failures does not retry in lockstep) until `max_attempts` is reached or
+    the error is permanent, then it is left in `failed`.
+    """
+    values = {
+        models.EmailOutbox.last_error: error[:2000],
+        models.EmailOutbox.locked_at: None,
+    }
+    if permanent or email.attempts >= max_attempts:
+        values[models.EmailOutbox.status] = OutboxStatus.FAILED
+    else:
+        delay = min(retry_base_seconds * 2 ** (email.attempts - 1), 3600)
+        values[models.EmailOutbox.status] = OutboxStatus.PENDING
+        values[models.EmailOutbox.next_attempt_at] = (
+            datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+        )
+
+    (
+        db.query(models.EmailOutbox)
+        .filter(models.EmailOutbox.id == email.id)
+        .update(values, synchronize_session=False)
+    )
+
+def outbox_depth(db: Session) -> Dict[str, int]:
+    """Number of outbox rows per status."""
+    rows = (
+        db.query(models.EmailOutbox.status, func.count(models.EmailOutbox.id))
+        .group_by(models.EmailOutbox.status)
+        .all()
+    )
+    return {status: count for status, count in rows}
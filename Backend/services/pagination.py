@@ -0,0 +1,105 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, and_, or_, tuple_
+from sqlalchemy.orm import Query
+
+
+# Upper bound for the `limit` of paginated endpoints
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[Tuple[Any, bool]]) -> List[Any]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Values are converted back to the python type of the matching key column,
+    so datetimes survive the round trip.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise InvalidCursor("Cursor does not match the ordering of this endpoint")
+
+    result = []
+    for value, (column, _) in zip(values, keys):
+        if value is not None and isinstance(getattr(column, "type", None), DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise InvalidCursor("Cursor contains an invalid datetime")
+        result.append(value)
+    return result
+
+
+def _after(keys: Sequence[Tuple[Any, bool]], values: Sequence[Any]):
+    """Build the WHERE clause selecting rows strictly after `values`."""
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        # Row-value comparison lets the database seek a composite index directly
+        columns = tuple_(*[column for column, _ in keys])
+        if directions.pop():
+            return columns < tuple_(*values)
+        return columns > tuple_(*values)
+
+    # Mixed directions: (a > x) OR (a = x AND b < y) ...
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+def keyset_paginate(
+    query: Query,
+    keys: Sequence[Tuple[Any, bool]],
+    cursor: Optional[str],
+    limit: int,
+    key_getter: Optional[Callable[[Any], Sequence[Any]]] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    Return one page of `query` ordered by `keys` plus the cursor of the next page.
+
+    `keys` is a list of `(column, descending)` pairs; the last one must be
+    unique (usually the primary key) so the ordering is total and rows
+    inserted while a client is scrolling are never skipped or repeated.
+    An empty or missing `cursor` starts from the first row. `next_cursor`
+    is None once the last page has been reached. `limit` must be at least 1.
+    """
+    if limit < 1:
+        raise ValueError(f"limit must be at least 1, got {limit}")
+
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys)))
+
+    query = query.order_by(
+        *[column.desc() if descending else column.asc() for column, descending in keys]
+    )
+
+    # Fetch one extra row to find out whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if key_getter is None:
+        key_getter = lambda row: [getattr(row, column.key) for column, _ in keys]
+    return rows, encode_cursor(key_getter(rows[-1]))
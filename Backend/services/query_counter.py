@@ -0,0 +1,106 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+Engine-wide `before_cursor_execute` / `after_cursor_execute` listeners
+report every statement to the `QueryLog` of the current context, if there
+is one. `track_queries()` opens a log for a block of code. Handlers run in
+the threadpool and async sessions in greenlets, and both inherit the
+request's context, so concurrent requests never see each other's
+statements.
+
+A `QueryLog` counts statements and the time spent executing them, grouped
+by shape. The shape is the SQL text with whitespace and IN-list lengths
+normalized. Bound values are placeholders in the text already, so loading
+a relationship row by row shows up as one SELECT shape executed once per
+row. `repeated()` reports those shapes.
+
+The log is used in two places:
+
+    test_query_budgets.py    per-endpoint statement budgets, with no repeated shapes
+    QUERY_STATS_HEADERS      adds X-DB-Queries / X-DB-Time to every response and logs
+                             repeated shapes (development only)
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# A SELECT shape executed this many times in one request is reported as N+1
+REPEAT_THRESHOLD = 3
+
+_WHITESPACE = re.compile(r"\s+")
+# "IN (?, ?, ?)", "IN (%(p_1)s, %(p_2)s)" and "IN ($1, $2)" differ only by the number of values
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*\)")
+
+_current: ContextVar[Optional["QueryLog"]] = ContextVar("query_log", default=None)
+
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+class QueryLog:
+    """Statements executed while the log was current."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> Dict[str, int]:
+        """SELECT shapes executed at least `threshold` times: row-by-row loading."""
+        return {
+            shape: count for shape, count in self.shapes.items()
+            if count >= threshold and shape[:6].upper() == "SELECT"
+        }
+
+    def headers(self) -> Dict[str, str]:
+        return {"X-DB-Queries": str(self.count), "X-DB-Time": f"{self.seconds * 1000:.1f}ms"}
+
+@contextmanager
+def track_queries() -> Iterator[QueryLog]:
+    """Collect the statements executed in this context (and the threads/tasks it starts) into a new log."""
+    log = QueryLog()
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _current.get()
+    if log is not None and conn.info.get("query_started"):
+        log.record(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def install() -> None:
+    """Listen on every engine (sync, and the sync core of async engines). Safe to call more than once."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+def report(log: QueryLog, label: str) -> None:
+    """Log the repeated statement shapes of a request."""
+    for shape, count in log.repeated().items():
+        logger.warning("Possible N+1 in %s: %dx %s", label, count, shape[:300])
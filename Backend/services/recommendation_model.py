@@ -0,0 +1,399 @@
+"""
+Precomputed event recommendations: a user x category affinity matrix.
+
+`get_recommended_events` (services/recommendation_service.py) runs three
+queries per request: the user's categories, the upcoming events in them,
+and a GROUP BY over all upcoming events for the popular ones. The model kept
+here answers `/api/recommendations/events` from memory instead:
+
+    affinity    float32 matrix, a row per user with history and a column per
+                category. A registration adds REGISTERED to its event's
+                category, plus ATTENDED once attended; a rated comment adds
+                RATING_WEIGHT * (rating - 3) / 2. Older interactions count
+                less: their weight halves every RECOMMENDATION_HALF_LIFE_DAYS
+    features    one-hot category matrix of the upcoming events, next to their
+                start times and popularity (log of registrations_count)
+
+A user's scores are `features @ (row / sum(|row|)) + POPULARITY_WEIGHT *
+popularity`: one vectorized product over all upcoming events. Users without
+history get the most popular events. Ties go to the soonest event. The top
+K are cached until one of them starts, the user's row changes or an event
+is written.
+
+Decay is applied by scaling each weight by 2 ** ((t - epoch) / half-life)
+rather than by shrinking old ones. Rows are normalized when scoring, so only
+their ratios matter and nothing has to be rewritten as time passes.
+
+The model is built at startup from the last RECOMMENDATION_HISTORY_DAYS of
+history, and rebuilt in the background every RECOMMENDATION_REFRESH_SECONDS.
+Between rebuilds it is updated incrementally. The event write handlers in
+routes/event.py add and remove events. Registration and comment writes mark
+their user, whose row is recomputed from the database on their next
+request. Popularity only changes with rebuilds. Like the suggest index, the
+model is per process.
+
+NumPy is optional: without it the endpoint keeps using the queries.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from database import SessionLocal
+
+try:
+    import numpy as np
+except ImportError:  # Optional: recommendations are then queried per request
+    np = None
+
+logger = logging.getLogger(__name__)
+
+REGISTERED = 1.0
+ATTENDED = 1.0
+RATING_WEIGHT = 1.0
+# A popular event's edge over an unpopular one, next to category shares (which sum to 1)
+POPULARITY_WEIGHT = 0.1
+
+class Interaction(NamedTuple):
+    user_id: int
+    category: str
+    when: datetime
+    weight: float
+
+class UpcomingEvent(NamedTuple):
+    id: int
+    category: str
+    start_datetime: datetime
+    registrations_count: int
+
+def _timestamp(when: datetime) -> float:
+    # Naive datetimes are UTC throughout the models
+    return when.replace(tzinfo=timezone.utc).timestamp()
+
+def interactions(db: Session, since: datetime, user_id: Optional[int] = None) -> Iterator[Interaction]:
+    """The weighted registrations and rated comments since `since`, of one user or of everyone."""
+    registrations = (
+        db.query(models.Registration.user_id, models.Event.category, models.Registration.registration_date,
+                 models.Registration.attended, models.Registration.status)
+        .join(models.Event, models.Registration.event_id == models.Event.id)
+        .filter(
+            models.Registration.status != models.RegistrationStatus.CANCELLED,
+            # Rows from before registration_date existed have none
+            or_(models.Registration.registration_date >= since, models.Registration.registration_date.is_(None)),
+        )
+    )
+    comments = (
+        db.query(models.Comment.author_id, models.Event.category, models.Comment.created_at, models.Comment.rating)
+        .join(models.Event, models.Comment.event_id == models.Event.id)
+        .filter(models.Comment.rating.isnot(None), models.Comment.created_at >= since)
+    )
+    if user_id is not None:
+        registrations = registrations.filter(models.Registration.user_id == user_id)
+        comments = comments.filter(models.Comment.author_id == user_id)
+
+    for user, category, when, attended, status in registrations.yield_per(10000):
+        weight = REGISTERED + (ATTENDED if attended or status == models.RegistrationStatus.ATTENDED else 0.0)
+        yield Interaction(user, category, when or since, weight)
+    for user, category, when, rating in comments.yield_per(10000):
+        if rating != 3:
+            yield Interaction(user, category, when, RATING_WEIGHT * (rating - 3) / 2)
+
+def upcoming_events(db: Session) -> List[UpcomingEvent]:
+    rows = (
+        db.query(models.Event.id, models.Event.category, models.Event.start_datetime, models.Event.registrations_count)
+        .filter(models.Event.start_datetime > datetime.utcnow())
+        .all()
+    )
+    return [UpcomingEvent(*row) for row in rows]
+
+def _grow(array, rows: int, fill: float = 0.0):
+    """`array` with room for at least `rows` rows, doubling its capacity."""
+    if rows <= len(array):
+        return array
+    grown = np.full((max(rows, 2 * len(array), 16),) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class _Model:
+    """The matrices. Not thread-safe: `RecommendationModel` serializes access."""
+
+    def __init__(self, epoch: float, half_life_seconds: float):
+        self.epoch = epoch
+        self.half_life_seconds = half_life_seconds
+        self.categories: Dict[str, int] = {}
+        self.users: Dict[int, int] = {}
+        self.affinity = np.zeros((0, 0), dtype=np.float32)
+        # Event rows; free rows (never used, or of removed events) start at -inf and never score
+        self.events: Dict[int, int] = {}
+        self.free: List[int] = []
+        self.event_ids = np.zeros(0, dtype=np.int64)
+        self.starts = np.zeros(0, dtype=np.float64)
+        self.popularity = np.zeros(0, dtype=np.float32)
+        self.popularity_scale = 1.0
+        self.features = np.zeros((0, 0), dtype=np.float32)
+
+    def category(self, name: str) -> int:
+        column = self.categories.get(name)
+        if column is None:
+            column = self.categories[name] = len(self.categories)
+            self.affinity = np.pad(self.affinity, ((0, 0), (0, 1)))
+            self.features = np.pad(self.features, ((0, 0), (0, 1)))
+        return column
+
+    def _decayed(self, items: List[Interaction]):
+        """Category columns and decay-scaled weights of `items`."""
+        columns = np.fromiter((self.category(item.category) for item in items), dtype=np.int64, count=len(items))
+        times = np.fromiter((_timestamp(item.when) for item in items), dtype=np.float64, count=len(items))
+        weights = np.fromiter((item.weight for item in items), dtype=np.float64, count=len(items))
+        return columns, weights * np.exp2((times - self.epoch) / self.half_life_seconds)
+
+    def load_interactions(self, items: Iterable[Interaction]) -> None:
+        items = list(items)
+        columns, weights = self._decayed(items)
+        user_ids = np.fromiter((item.user_id for item in items), dtype=np.int64, count=len(items))
+        users, rows = np.unique(user_ids, return_inverse=True)
+        width = len(self.categories)
+        # One bincount over (row, column) cells instead of a Python loop
+        cells = np.bincount(rows * width + columns, weights=weights, minlength=len(users) * width)
+        self.affinity = cells.reshape(len(users), width).astype(np.float32)
+        self.users = dict(zip(users.tolist(), range(len(users))))
+
+    def set_user(self, user_id: int, items: List[Interaction]) -> None:
+        columns, weights = self._decayed(items)
+        row = self.users.get(user_id)
+        if row is None:
+            if not items:
+                return
+            row = self.users[user_id] = len(self.users)
+            self.affinity = _grow(self.affinity, row + 1)
+        self.affinity[row] = np.bincount(columns, weights=weights, minlength=len(self.categories))
+
+    def set_event(self, event: UpcomingEvent) -> None:
+        row = self.events.get(event.id)
+        if row is None:
+            row = self.free.pop() if self.free else len(self.events)
+            self.events[event.id] = row
+            if row >= len(self.event_ids):
+                self.event_ids = _grow(self.event_ids, row + 1)
+                self.starts = _grow(self.starts, row + 1, -math.inf)
+                self.popularity = _grow(self.popularity, row + 1)
+                self.features = _grow(self.features, row + 1)
+        column = self.category(event.category)
+        self.event_ids[row] = event.id
+        self.starts[row] = _timestamp(event.start_datetime)
+        self.popularity[row] = math.log1p(event.registrations_count or 0) / self.popularity_scale
+        self.features[row] = 0.0
+        self.features[row, column] = 1.0
+
+    def load_events(self, events: Iterable[UpcomingEvent]) -> None:
+        for event in events:
+            self.set_event(event)
+        peak = float(self.popularity.max(initial=0.0))
+        if peak > 0:
+            # To [0, 1]; events added later may exceed 1 until the next build
+            self.popularity /= peak
+            self.popularity_scale = peak
+
+    def remove_event(self, event_id: int) -> None:
+        row = self.events.pop(event_id, None)
+        if row is not None:
+            self.starts[row] = -math.inf
+            self.free.append(row)
+
+    def top(self, user_id: int, limit: int, now: float) -> Tuple[List[int], float]:
+        """The ids of the best `limit` events for `user_id` and when the first of them starts."""
+        scores = POPULARITY_WEIGHT * self.popularity
+        row = self.users.get(user_id)
+        if row is not None:
+            total = np.abs(self.affinity[row]).sum()
+            if total > 0:
+                scores = self.features @ (self.affinity[row] / total) + scores
+        scores = np.where(self.starts > now, scores, -np.inf)
+        count = min(limit, int(np.count_nonzero(self.starts > now)))
+        if count <= 0:
+            return [], math.inf
+        # Everything above the count-th best score, then the ties at it: soonest first, then by id
+        threshold = np.partition(scores, len(scores) - count)[len(scores) - count]
+        candidates = np.concatenate([np.flatnonzero(scores > threshold), np.flatnonzero(scores == threshold)])
+        order = np.lexsort((self.event_ids[candidates], self.starts[candidates], -scores[candidates]))
+        chosen = candidates[order[:count]]
+        return self.event_ids[chosen].tolist(), float(self.starts[chosen].min())
+
+    def memory(self) -> int:
+        arrays = (self.affinity, self.event_ids, self.starts, self.popularity, self.features)
+        return sum(array.nbytes for array in arrays)
+
+class RecommendationModel:
+    """Thread-safe holder of the model, its incremental updates and the top-K cache; see the module docstring."""
+
+    def __init__(self, refresh_seconds: float, half_life_days: float, history_days: int, cache_size: int):
+        self.refresh_seconds = refresh_seconds
+        self.half_life_seconds = half_life_days * 86400
+        self.history_days = history_days
+        self.cache_size = cache_size
+        self.built_at: Optional[float] = None
+        self.build_seconds = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._model: Optional[_Model] = None
+        self._lock = threading.Lock()
+        # Users whose history changed since their row was computed
+        self._stale_users: Set[int] = set()
+        # Event writes made while a rebuild is loading rows; replayed onto the new model
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+        # user id (None: users without history) -> (limit, event ids, when the first of them starts)
+        self._top: "OrderedDict[Optional[int], Tuple[int, List[int], float]]" = OrderedDict()
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def rebuild(self, db: Session) -> None:
+        """Replace the model with the upcoming events and the recent history in the database."""
+        if np is None:
+            return
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending = []
+        try:
+            since = datetime.utcnow() - timedelta(days=self.history_days)
+            self.load(upcoming_events(db), interactions(db, since))
+        finally:
+            self._pending = None
+        stats = self.stats()
+        logger.info("Built the recommendation model: %d users, %d events in %.3f s",
+                    stats["users"], stats["events"], self.build_seconds)
+
+    def load(self, events: Iterable[UpcomingEvent], history: Iterable[Interaction]) -> None:
+        """Replace the model with `events` and `history`."""
+        started = time.perf_counter()
+        model = _Model(time.time(), self.half_life_seconds)
+        model.load_events(events)
+        model.load_interactions(history)
+        with self._lock:
+            for operation, argument in self._pending or ():
+                if operation == "add":
+                    model.set_event(argument)
+                else:
+                    model.remove_event(argument)
+            self._model = model
+            self._pending = None
+            self._top.clear()
+            self.built_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - started
+
+    def add_event(self, event: models.Event) -> None:
+        """Score a created or updated event. Call after committing."""
+        if self._model is None:
+            return
+        upcoming = UpcomingEvent(event.id, event.category, event.start_datetime, event.registrations_count or 0)
+        with self._lock:
+            self._model.set_event(upcoming)
+            self._top.clear()
+            if self._pending is not None:
+                self._pending.append(("add", upcoming))
+
+    def remove_event(self, event_id: int) -> None:
+        """Drop a deleted event. Call after committing."""
+        if self._model is None:
+            return
+        with self._lock:
+            self._model.remove_event(event_id)
+            self._top.clear()
+            if self._pending is not None:
+                self._pending.append(("remove", event_id))
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Recompute the user's row on their next request. Call after committing a registration or comment change."""
+        if np is None:
+            return
+        with self._lock:
+            self._stale_users.add(user_id)
+            self._top.pop(user_id, None)
+
+    def _refresh_user(self, db: Session, user_id: int) -> None:
+        # Unmarked first: a write committed while querying marks the user again
+        with self._lock:
+            self._stale_users.discard(user_id)
+        since = datetime.utcnow() - timedelta(days=self.history_days)
+        history = list(interactions(db, since, user_id))
+        with self._lock:
+            self._model.set_user(user_id, history)
+            self._top.pop(user_id, None)
+
+    def recommend(self, db: Session, user_id: int, limit: int) -> Optional[List[int]]:
+        """The ids of the events to recommend to `user_id`, best first. None until the model is built."""
+        if self._model is None:
+            return None
+        if user_id in self._stale_users:
+            self._refresh_user(db, user_id)
+        now = time.time()
+        with self._lock:
+            model = self._model
+            key = user_id if user_id in model.users else None
+            cached = self._top.get(key)
+            if cached is not None and cached[0] == limit and cached[2] > now:
+                self._top.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            ids, first_start = model.top(user_id, limit, now)
+            if self.cache_size > 0:
+                self._top[key] = (limit, ids, first_start)
+                if len(self._top) > self.cache_size:
+                    self._top.popitem(last=False)
+        self._refresh_if_stale()
+        return ids
+
+    def _refresh_if_stale(self) -> None:
+        if (self.refresh_seconds <= 0 or self.built_at is None or self._pending is not None
+                or time.monotonic() - self.built_at < self.refresh_seconds):
+            return
+        # Claim the refresh so concurrent requests do not start one each
+        self.built_at = time.monotonic()
+        threading.Thread(target=refresh, name="recommendation-model-refresh", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            model = self._model
+            return {
+                "available": np is not None,
+                "users": len(model.users) if model else 0,
+                "categories": len(model.categories) if model else 0,
+                "events": len(model.events) if model else 0,
+                "memory_bytes": model.memory() if model else 0,
+                "cached": len(self._top),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_users": len(self._stale_users),
+                "build_seconds": round(self.build_seconds, 4),
+                "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at is not None else None,
+            }
+
+recommendation_model = RecommendationModel(
+    settings.RECOMMENDATION_REFRESH_SECONDS,
+    settings.RECOMMENDATION_HALF_LIFE_DAYS,
+    settings.RECOMMENDATION_HISTORY_DAYS,
+    settings.RECOMMENDATION_CACHE_SIZE,
+)
+
+def refresh() -> None:
+    """Rebuild `recommendation_model` from the database with a session of its own."""
+    if np is None:
+        return
+    db = SessionLocal()
+    try:
+        recommendation_model.rebuild(db)
+    except Exception:
+        logger.exception("Failed to build the recommendation model")
+    finally:
+        db.close()
@@ -4,6 +4,21 @@ from sqlalchemy import func
 from datetime import datetime, timedelta
 
 import models
+from services.recommendation_model import recommendation_model
+
+def recommend_events(db: Session, user_id: int, limit: int = 10) -> List[models.Event]:
+    """
+    Recommended events for a user, best first.
+
+    Ranked in memory by the precomputed model (services/recommendation_model.py),
+    which leaves one primary key lookup. Without NumPy, or before the model is
+    built, falls back to `get_recommended_events`.
+    """
+    ids = recommendation_model.recommend(db, user_id, limit)
+    if ids is None:
+        return get_recommended_events(db, user_id, limit)
+    events = {event.id: event for event in db.query(models.Event).filter(models.Event.id.in_(ids))}
+    return [events[event_id] for event_id in ids if event_id in events]
 
 def get_recommended_events(
     db: Session,
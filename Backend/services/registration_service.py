@@ -0,0 +1,239 @@
+from typing import List, Optional
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+import models
+from services.event_counters import adjust_event_counters, holds_seat
+from services.notification_service import queue_waitlist_promotion
+
+class RegistrationError(Exception):
+    """Base class for registration failures the API reports as 409 Conflict."""
+
+class AlreadyRegistered(RegistrationError):
+    pass
+
+class EventFull(RegistrationError):
+    pass
+
+DUPLICATE_REGISTRATION = "uq_registrations_user_event"
+
+def _is_duplicate_registration(error: IntegrityError) -> bool:
+    """Whether `error` is the unique (user_id, event_id) constraint of registrations."""
+    diag = getattr(error.orig, "diag", None)  # psycopg2 names the violated constraint
+    if diag is not None and diag.constraint_name:
+        return diag.constraint_name == DUPLICATE_REGISTRATION
+    # SQLite only lists the columns
+    message = str(error.orig)
+    return (DUPLICATE_REGISTRATION in message
+            or "registrations.user_id, registrations.event_id" in message)
+
+def claim_slot(db: Session, event_id: int) -> bool:
+    """
+    Atomically take one seat of an event.
+    
+    A single conditional `UPDATE events ... WHERE confirmed_count < max_participants`
+    both checks and consumes capacity, so two concurrent requests can never
+    claim the last seat twice. Returns False when the event is full.
+    """
+    updated = (
+        db.query(models.Event)
+        .filter(
+            models.Event.id == event_id,
+            or_(
+                models.Event.max_participants.is_(None),
+                models.Event.confirmed_count < models.Event.max_participants,
+            ),
+        )
+        .update(
+            {
+                models.Event.confirmed_count: models.Event.confirmed_count + 1,
+                models.Event.registrations_count: models.Event.registrations_count + 1,
+                models.Event.updated_at: models.Event.updated_at,
+            },
+            synchronize_session=False,
+        )
+    )
+    return updated == 1
+
+def join_waitlist(db: Session, event_id: int) -> int:
+    """
+    Append one entry to the event waitlist and return its ticket number.
+    
+    Tickets are dense: the queue always holds tickets
+    `waitlist_served + 1 .. waitlist_served + waitlist_count`, so a position
+    is `ticket - waitlist_served` and never needs a scan. The counter update
+    locks the event row until commit, which serializes ticket allocation.
+    """
+    (
+        db.query(models.Event)
+        .filter(models.Event.id == event_id)
+        .update(
+            {
+                models.Event.waitlist_count: models.Event.waitlist_count + 1,
+                models.Event.registrations_count: models.Event.registrations_count + 1,
+                models.Event.updated_at: models.Event.updated_at,
+            },
+            synchronize_session=False,
+        )
+    )
+    served, count = (
+        db.query(models.Event.waitlist_served, models.Event.waitlist_count)
+        .filter(models.Event.id == event_id)
+        .one()
+    )
+    return served + count
+
+def leave_waitlist(db: Session, registration: models.Registration) -> None:
+    """Remove a waitlisted registration from the queue, closing the gap behind it."""
+    (
+        db.query(models.Event)
+        .filter(models.Event.id == registration.event_id)
+        .update(
+            {
+                models.Event.waitlist_count: models.Event.waitlist_count - 1,
+                models.Event.registrations_count: models.Event.registrations_count - 1,
+                models.Event.updated_at: models.Event.updated_at,
+            },
+            synchronize_session=False,
+        )
+    )
+    (
+        db.query(models.Registration)
+        .filter(
+            models.Registration.event_id == registration.event_id,
+            models.Registration.waitlist_ticket > registration.waitlist_ticket,
+        )
+        .update(
+            {models.Registration.waitlist_ticket: models.Registration.waitlist_ticket - 1},
+            synchronize_session=False,
+        )
+    )
+    registration.waitlist_ticket = None
+
+def promote_from_waitlist(db: Session, event_id: int) -> Optional[models.Registration]:
+    """
+    Move the head of the waitlist into a free seat, if there is one.
+    
+    The seat is claimed and the queue advanced in one conditional UPDATE, so
+    concurrent cancellations each promote a different registration. Returns
+    the promoted registration (not committed) or None.
+    """
+    updated = (
+        db.query(models.Event)
+        .filter(
+            models.Event.id == event_id,
+            models.Event.waitlist_count > 0,
+            or_(
+                models.Event.max_participants.is_(None),
+                models.Event.confirmed_count < models.Event.max_participants,
+            ),
+        )
+        .update(
+            {
+                models.Event.waitlist_served: models.Event.waitlist_served + 1,
+                models.Event.waitlist_count: models.Event.waitlist_count - 1,
+                models.Event.confirmed_count: models.Event.confirmed_count + 1,
+                models.Event.updated_at: models.Event.updated_at,
+            },
+            synchronize_session=False,
+        )
+    )
+    if updated != 1:
+        return None
+    
+    served = db.query(models.Event.waitlist_served).filter(models.Event.id == event_id).scalar()
+    # With the user, whom the caller usually emails (queue_waitlist_promotion)
+    head = (
+        db.query(models.Registration)
+        .options(joinedload(models.Registration.user))
+        .filter(
+            models.Registration.event_id == event_id,
+            models.Registration.waitlist_ticket == served,
+        )
+        .one()
+    )
+    head.status = models.RegistrationStatus.CONFIRMED
+    head.waitlist_ticket = None
+    return head
+
+def fill_from_waitlist(db: Session, event_id: int) -> List[models.Registration]:
+    """Promote waitlisted registrations until the event is full or the queue is empty."""
+    promoted = []
+    while True:
+        registration = promote_from_waitlist(db, event_id)
+        if registration is None:
+            return promoted
+        promoted.append(registration)
+
+def cancel_registration(db: Session, registration: models.Registration) -> Optional[models.Registration]:
+    """
+    Delete a registration and hand its seat to the head of the waitlist.
+    
+    Everything happens in one transaction, which is committed here, including
+    the promotion email queued in the outbox. Returns the registration
+    promoted from the waitlist, if any.
+    """
+    event_id = registration.event_id
+    promoted = None
+    
+    if registration.waitlist_ticket is not None:
+        leave_waitlist(db, registration)
+    else:
+        seat_freed = holds_seat(registration)
+        adjust_event_counters(
+            db,
+            event_id,
+            registrations_count=-1,
+            confirmed_count=-1 if seat_freed else 0,
+        )
+        if seat_freed:
+            promoted = promote_from_waitlist(db, event_id)
+            if promoted is not None:
+                queue_waitlist_promotion(db, promoted)
+    
+    db.delete(registration)
+    db.commit()
+    return promoted
+
+def reserve_registration(
+    db: Session,
+    event_id: int,
+    user_id: int,
+    waitlist: bool = False,
+) -> models.Registration:
+    """
+    Register a user for an event in one transaction without check-then-insert reads.
+    
+    The registration row is inserted first: the unique (user_id, event_id)
+    constraint rejects duplicates. The seat is then claimed with `claim_slot`.
+    If the event is full the registration joins the waitlist as PENDING when
+    `waitlist` is set, otherwise the whole transaction is rolled back.
+    Raises `AlreadyRegistered` or `EventFull`, otherwise commits and returns
+    the new registration. Other integrity errors (an unknown user or event)
+    are re-raised as they are.
+    """
+    registration = models.Registration(
+        user_id=user_id,
+        event_id=event_id,
+        status=models.RegistrationStatus.CONFIRMED,
+    )
+    db.add(registration)
+    
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        if not _is_duplicate_registration(e):
+            raise
+        raise AlreadyRegistered("Already registered for this event") from e
+    
+    if not claim_slot(db, event_id):
+        if not waitlist:
+            db.rollback()
+            raise EventFull("No available slots for this event")
+        registration.status = models.RegistrationStatus.PENDING
+        registration.waitlist_ticket = join_waitlist(db, event_id)
+    
+    db.commit()
+    return registration
@@ -0,0 +1,314 @@
+"""
+Server-side cache of encoded JSON responses for the public event reads.
+
+`GET /api/events/`, `GET /api/events/{id}`, `/api/recommendations/similar-events/{id}`
+and `/api/comments/event/{id}` are unauthenticated and read far more often
+than the data changes. Their handlers are wrapped with `cached_response`,
+which stores the final JSON bytes. The key is built from the handler name
+plus its resolved query/path parameters, so `?limit=100` and no parameter
+share an entry. A hit skips the database and Pydantic entirely.
+
+Every entry is tagged with what it was built from. Write handlers
+invalidate the matching tags after committing:
+
+    event:{id}        the event row itself (lists, detail, similar-events)
+    event-stats:{id}  its counters: registrations, waitlist, comments (detail only)
+    comments:{id}     the event's comment thread
+    author:{id}       comment threads showing this user's name
+    category:{name}   similar-events pages for a category
+    event-lists       every event listing (an event was added or moved)
+
+Entries also expire after `RESPONSE_CACHE_TTL_SECONDS`, which bounds time-based
+drift ("upcoming" filters). The default backend is per process. With several
+uvicorn workers set `RESPONSE_CACHE_BACKEND=redis`, so that an invalidation in one
+worker reaches all of them.
+"""
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from config import settings
+from services.conditional import Validators, is_not_modified, make_validators, not_modified_response
+
+EVENT_LISTS = "event-lists"
+
+def event_tag(event_id: int) -> str:
+    return f"event:{event_id}"
+
+def event_stats_tag(event_id: int) -> str:
+    return f"event-stats:{event_id}"
+
+def comments_tag(event_id: int) -> str:
+    return f"comments:{event_id}"
+
+def author_tag(user_id: int) -> str:
+    return f"author:{user_id}"
+
+def category_tag(category: Optional[str]) -> str:
+    return f"category:{(category or '').strip().lower()}"
+
+class MemoryBackend:
+    """Per-process LRU store with a tag index."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, body, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: str, body: bytes, tags: Iterable[str], ttl: float, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._remove(key)
+            tags = tuple(set(tags))
+            self._entries[key] = (time.monotonic() + ttl, body, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    removed += self._remove(key)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return 1
+
+class RedisBackend:
+    """
+    Store shared by all workers. Tags are Redis sets of cache keys.
+    Needs the optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "eventnow:response-cache:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package (pip install redis)") from e
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def generation(self) -> int:
+        return int(self._redis.get(self._prefix + "generation") or 0)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(self._prefix + key)
+
+    def set(self, key: str, body: bytes, tags: Iterable[str], ttl: float, generation: int) -> None:
+        if generation != self.generation():
+            return
+        ttl = max(1, int(ttl))
+        pipe = self._redis.pipeline()
+        pipe.set(self._prefix + key, body, ex=ttl)
+        for tag in set(tags):
+            pipe.sadd(self._prefix + "tag:" + tag, self._prefix + key)
+            pipe.expire(self._prefix + "tag:" + tag, ttl)
+        pipe.execute()
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        self._redis.incr(self._prefix + "generation")
+        removed = 0
+        for tag in tags:
+            tag_key = self._prefix + "tag:" + tag
+            keys = self._redis.smembers(tag_key)
+            if keys:
+                removed += self._redis.delete(*keys)
+            self._redis.delete(tag_key)
+        return removed
+
+    def clear(self) -> None:
+        self._redis.incr(self._prefix + "generation")
+        keys = list(self._redis.scan_iter(match=self._prefix + "*"))
+        if keys:
+            self._redis.delete(*keys)
+
+    def size(self) -> int:
+        internal = (self._prefix + "tag:", self._prefix + "generation")
+        return sum(1 for key in self._redis.scan_iter(match=self._prefix + "*")
+                   if not key.decode().startswith(internal))
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl > 0
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Optional[Validators]]]:
+        """The cached body of `key` and the validators it was stored with."""
+        packed = self.backend.get(key)
+        if packed is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        header, _, body = packed.partition(b"\n")
+        validators = json.loads(header)
+        return body, Validators(*validators) if validators else None
+
+    def set(self, key: str, body: bytes, validators: Optional[Validators], tags: Iterable[str], generation: int) -> None:
+        # One bytes value per entry, so any backend can store it: a JSON header line, then the body
+        header = json.dumps(list(validators) if validators else None).encode()
+        self.backend.set(key, header + b"\n" + body, tags, self.ttl, generation)
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying one of `tags`. Call after the write is committed."""
+        if self.enabled and tags:
+            self.invalidations += self.backend.invalidate(tags)
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "entries": self.backend.size() if self.backend is not None else 0,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidated_entries": self.invalidations,
+        }
+
+def _create_backend():
+    if settings.RESPONSE_CACHE_TTL_SECONDS <= 0:
+        return None
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(settings.RESPONSE_CACHE_REDIS_URL)
+    return MemoryBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+response_cache = ResponseCache(_create_backend(), settings.RESPONSE_CACHE_TTL_SECONDS)
+
+def invalidate(*tags: str) -> None:
+    response_cache.invalidate(*tags)
+
+def _cache_key(name: str, kwargs: Dict[str, Any]) -> str:
+    params = sorted(
+        (name_, str(value)) for name_, value in kwargs.items()
+        if value is not None and isinstance(value, (str, int, float, bool))
+    )
+    return f"{name}?{urlencode(params)}"
+
+def cached_response(
+    response_model: Any,
+    tags: Callable[[Dict[str, Any], Any], Iterable[str]],
+    validators: Optional[Callable[[Dict[str, Any]], Optional[Tuple[Iterable[Any], Optional[datetime]]]]] = None,
+    encoder: Optional[Callable[[Dict[str, Any], Any], bytes]] = None,
+):
+    """
+    Cache the JSON encoding of a sync GET handler's result.
+
+    `response_model` must match the route's. `tags(params, result)` returns
+    the tags of a fresh result; `params` are the handler's keyword arguments.
+    Exceptions (404s etc.) and `Response` results pass through uncached.
+
+    `validators(params)`, if given, returns `(parts, last_modified)` from a
+    cheap aggregate query, or None if there is nothing to validate. The
+    response then carries ETag/Last-Modified (see `services.conditional`).
+    When the handler declares a `request` parameter, a matching conditional
+    request gets a 304 before the handler runs. Cached entries keep their
+    validators, so a revalidation on a hit costs no query at all.
+
+    `encoder(params, result)`, if given, replaces the Pydantic encoding, for
+    handlers that return plain rows (see `services.fast_json.RowEncoder`).
+    It must produce the JSON of `response_model`.
+    """
+    adapter = TypeAdapter(response_model)
+
+    def decorator(fn: Callable) -> Callable:
+        name = f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            request = kwargs.get("request")
+            key = _cache_key(name, kwargs)
+
+            if response_cache.enabled:
+                entry = response_cache.get(key)
+                if entry is not None:
+                    body, current = entry
+                    if current is not None and is_not_modified(request, current):
+                        return not_modified_response(current)
+                    headers = current.headers() if current else {}
+                    return Response(content=body, media_type="application/json", headers={**headers, "X-Cache": "HIT"})
+                # Read before the query: an invalidation in between means the result may be stale
+                generation = response_cache.backend.generation()
+
+            current = None
+            if validators is not None:
+                summary = validators(kwargs)
+                if summary is not None:
+                    current = make_validators(key, *summary)
+                    if is_not_modified(request, current):
+                        return not_modified_response(current)
+
+            result = fn(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            if encoder is not None:
+                body = encoder(kwargs, result)
+            else:
+                body = adapter.dump_json(adapter.validate_python(result, from_attributes=True), by_alias=True)
+            headers = current.headers() if current else {}
+            if response_cache.enabled:
+                response_cache.set(key, body, current, tags(kwargs, result), generation)
+                headers["X-Cache"] = "MISS"
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,173 @@
+"""
+Full-text search over event title, location and description.
+
+The index lives in the database and is maintained by triggers, so every
+write path, including bulk inserts and manual SQL, keeps it in sync.
+
+PostgreSQL:
+    `events.search_vector` (tsvector, weighted title A / location B /
+    description C) with a GIN index. Results are ranked by `ts_rank` and
+    snippets come from `ts_headline`.
+SQLite:
+    an external-content FTS5 table `events_fts` over `events`. Results are
+    ranked by `bm25` with the same column weights and snippets come from
+    `snippet()`.
+
+The text search configuration is `simple` (no stemming), because events are
+written in more than one language. Every query term must match, and each
+term also matches as a prefix, so "pyth work" finds "Python workshop".
+
+`install_search_index` creates the index when it is missing (the app
+creates its tables with `create_all`). Alembic revision a9d3c5e7f281 does
+the same for migrated databases.
+"""
+import html
+import logging
+import re
+from typing import Any, List, NamedTuple
+
+from sqlalchemy import Float, cast, column, func, inspect, literal_column, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMS = 10
+SNIPPET_WORDS = 16
+# Column weights (title, location, description)
+WEIGHTS = (10.0, 5.0, 1.0)
+
+_events_fts = table("events_fts", column("rowid"))
+
+# Placeholders around matches; replaced by <mark> once the snippet has been HTML-escaped
+_START, _STOP = "\x02", "\x03"
+
+class SearchNotSupported(Exception):
+    """The database dialect has no full-text index implementation here."""
+
+class SearchQuery(NamedTuple):
+    query: Query            # yields (Event, rank, snippet) rows
+    rank: Any               # relevance expression, higher is better
+    snippet: Any
+
+_POSTGRES_DDL = [
+    "ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION events_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.location, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS events_search_vector_trigger ON events",
+    """
+    CREATE TRIGGER events_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, location, description ON events
+    FOR EACH ROW EXECUTE FUNCTION events_search_vector_update()
+    """,
+    # Fires the trigger once for every existing row
+    "UPDATE events SET title = title",
+    "CREATE INDEX IF NOT EXISTS ix_events_search_vector ON events USING GIN (search_vector)",
+]
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+        title, location, description,
+        content='events', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+        INSERT INTO events_fts(rowid, title, location, description)
+        VALUES (new.id, new.title, new.location, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, title, location, description)
+        VALUES ('delete', old.id, old.title, old.location, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title, location, description ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, title, location, description)
+        VALUES ('delete', old.id, old.title, old.location, old.description);
+        INSERT INTO events_fts(rowid, title, location, description)
+        VALUES (new.id, new.title, new.location, new.description);
+    END
+    """,
+    "INSERT INTO events_fts(events_fts) VALUES ('rebuild')",
+]
+
+def install_search_index(engine: Engine) -> None:
+    """Create the full-text index and its triggers unless they already exist."""
+    dialect = engine.dialect.name
+    inspector = inspect(engine)
+    if dialect == "postgresql":
+        if any(column["name"] == "search_vector" for column in inspector.get_columns("events")):
+            return
+        statements = _POSTGRES_DDL
+    elif dialect == "sqlite":
+        if inspector.has_table("events_fts"):
+            return
+        statements = _SQLITE_DDL
+    else:
+        logger.warning("Full-text search is not available on %s", dialect)
+        return
+
+    logger.info("Building the full-text index for events")
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+
+def search_terms(q: str) -> List[str]:
+    """The words of a user query, lowercased. Punctuation and operators are dropped."""
+    return re.findall(r"\w+", q.lower())[:MAX_TERMS]
+
+def event_search_query(db: Session, terms: List[str]) -> SearchQuery:
+    """
+    A query matching events that contain every term (as a word prefix).
+    Filter, order and page it like any other `Query`.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        vector = literal_column("events.search_vector")
+        # ts_rank weights are ordered {D, C, B, A}
+        weights = literal_column(f"'{{0, {WEIGHTS[2] / WEIGHTS[0]}, {WEIGHTS[1] / WEIGHTS[0]}, 1}}'::float4[]")
+        # ts_rank returns real; as double precision the rank survives the JSON round trip of a
+        # pagination cursor, so the keyset comparison does not repeat the boundary row
+        rank = cast(func.ts_rank(weights, vector, tsquery), Float(53))
+        snippet = func.ts_headline(
+            "simple",
+            func.concat_ws(" - ", models.Event.title, models.Event.location, models.Event.description),
+            tsquery,
+            f"StartSel={_START}, StopSel={_STOP}, MaxWords={SNIPPET_WORDS}, MinWords=5, MaxFragments=1",
+        )
+        query = db.query(models.Event, rank.label("rank"), snippet.label("snippet")).filter(vector.op("@@")(tsquery))
+    elif dialect == "sqlite":
+        fts = literal_column("events_fts")
+        # bm25() is lower-is-better; negate it so both backends sort by rank descending
+        rank = -func.bm25(fts, *WEIGHTS)
+        snippet = func.snippet(fts, -1, _START, _STOP, "…", SNIPPET_WORDS)
+        match = " ".join(f'"{term}"*' for term in terms)
+        query = (
+            db.query(models.Event, rank.label("rank"), snippet.label("snippet"))
+            .select_from(models.Event)
+            .join(_events_fts, _events_fts.c.rowid == models.Event.id)
+            .filter(fts.op("MATCH")(match))
+        )
+    else:
+        raise SearchNotSupported(f"Full-text search is not available on {dialect}")
+    return SearchQuery(query, rank, snippet)
+
+def render_snippet(snippet: str) -> str:
+    """HTML-escape a snippet and wrap the matched words in <mark>."""
+    return html.escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
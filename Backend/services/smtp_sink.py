@@ -0,0 +1,171 @@
+"""
+Local SMTP stand-in for tests and throughput benchmarks.
+
+Accepts mail on a local port, discards it and counts connections and
+messages. It speaks just enough SMTP for `smtplib` (EHLO/HELO, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT). Point the mail worker at it with
+`MAIL_SERVER=127.0.0.1`, `MAIL_PORT=8025`, `MAIL_STARTTLS=False` and
+`MAIL_USE_CREDENTIALS=False`:
+
+    python -m services.smtp_sink --port 8025
+
+Or run it in-process:
+
+    with SMTPSink() as sink:
+        ...  # send to sink.port
+        print(sink.messages, sink.connections)
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from typing import Iterable, Optional
+
+class SMTPSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_rate: float = 0.0, latency: float = 0.0,
+                 reject: Iterable[str] = ()):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port, see `self.port` after `start`)
+            fail_rate: Share of messages answered with a temporary 451 failure
+            latency: Seconds to wait before acknowledging each message
+            reject: Recipients refused with a permanent 550 failure
+        """
+        self.host = host
+        self.port = port
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.reject = set(reject)
+        self.connections = 0
+        self.messages = 0
+        self.rejected = 0
+        self.refused = 0
+        self.recipients = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        recipients = []
+
+        async def reply(line: str) -> None:
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        try:
+            await reply("220 eventnow-sink ESMTP ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command[:4].upper()
+
+                if verb == "EHLO":
+                    await reply("250-eventnow-sink")
+                    await reply("250-SIZE 33554432")
+                    await reply("250 8BITMIME")
+                elif verb == "HELO":
+                    await reply("250 eventnow-sink")
+                elif verb == "MAIL":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipient = command[8:].strip(" <>")
+                    if recipient in self.reject:
+                        self.refused += 1
+                        await reply("550 No such user")
+                    else:
+                        recipients.append(recipient)
+                        await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while True:
+                        data = await reader.readline()
+                        if not data or data in (b".\r\n", b".\n"):
+                            break
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    if self.fail_rate and random.random() < self.fail_rate:
+                        self.rejected += 1
+                        await reply("451 Temporary failure, try again later")
+                    else:
+                        self.messages += 1
+                        self.recipients.extend(recipients)
+                        await reply("250 OK: queued")
+                elif verb == "RSET":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "NOOP":
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the sink is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def start(self) -> "SMTPSink":
+        """Serve in a background thread. Returns once the port is bound."""
+        self._thread = threading.Thread(target=self._run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            for task in asyncio.all_tasks(self._loop):
+                self._loop.call_soon_threadsafe(task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "SMTPSink":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of messages to reject with 451")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before acknowledging a message")
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.fail_rate, args.latency).start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"connections={sink.connections} messages={sink.messages} rejected={sink.rejected}")
+    except KeyboardInterrupt:
+        sink.stop()
+
+if __name__ == "__main__":
+    main()
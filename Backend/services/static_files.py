@@ -0,0 +1,286 @@
+"""
+Static file serving for /static, made for browser and CDN caching.
+
+`StaticFiles` sends no `Cache-Control`, so browsers revalidate every event
+image on every page. Its ETag is also an unquoted hash of mtime and size.
+`CachedStaticFiles` adds on top:
+
+- Content-addressed files (`<sha256>...` names, see services/image_store.py)
+  never change under their URL. They are sent with
+  `Cache-Control: public, max-age=31536000, immutable` and a strong ETag
+  derived from the name. Other files can be overwritten under the same
+  name: they get `public, no-cache` and an mtime/size ETag, so clients
+  revalidate them.
+- Conditional requests: `If-None-Match` and `If-Modified-Since` get 304.
+- A single byte range (`Range: bytes=...`, honouring `If-Range`) gets 206,
+  or 416 when it is out of bounds.
+- Content negotiation:
+  - A `.jpg`/`.jpeg`/`.png` that has a `.webp` sibling with the same base
+    name is answered with the WebP to clients that accept `image/webp`.
+  - Files with precompressed `.br`/`.gz` siblings are answered with those
+    according to `Accept-Encoding`.
+  - `Vary` is set whenever an alternative exists, so shared caches keep the
+    representations apart.
+- Paths with a segment starting with "." (e.g. the image store's
+  `.staging` directory) are not served.
+
+Given a built `StaticManifest` (services/static_manifest.py), sibling
+lookups come from memory instead of a stat per candidate, and other files
+get a strong ETag from their content hash.
+
+`python -m services.static_files static` writes the `.gz` (and, with the
+optional brotli package, `.br`) siblings for compressible files. Images are
+already compressed and are skipped.
+"""
+import argparse
+import calendar
+import gzip
+import mimetypes
+import os
+import re
+import shutil
+import stat
+import typing
+from email.utils import formatdate, parsedate
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from services.image_store import parse_key
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+# Precompressed siblings, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+WEBP_SOURCES = (".jpg", ".jpeg", ".png")
+COMPRESSIBLE = (".css", ".html", ".js", ".json", ".map", ".svg", ".txt", ".xml")
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _accepts(header: str, token: str) -> bool:
+    """Whether an Accept/Accept-Encoding header allows `token` (q > 0, exactly or through a wildcard)."""
+    allowed = None
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == token:
+            return quality > 0  # An exact match overrides wildcards
+        if name in ("*", "*/*", token.split("/")[0] + "/*"):
+            allowed = quality > 0
+    return bool(allowed)
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    """The stat of a regular file at `path`, or None."""
+    try:
+        result = os.stat(path)
+    except OSError:
+        return None
+    return result if stat.S_ISREG(result.st_mode) else None
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    The (first, last) byte of a single-range `Range` header. None when the
+    header should be ignored (malformed, or several ranges); raises
+    ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE.match(header.replace(" ", ""))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:  # bytes=-N: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or last < first:
+        raise ValueError("range not satisfiable")
+    return first, last
+
+class FileRangeResponse(Response):
+    """206 Partial Content with bytes `first`..`last` of a file."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, first: int, last: int, size: int, headers: Dict[str, str], media_type: str,
+                 method: str = "GET"):
+        headers = dict(headers, **{
+            "content-range": f"bytes {first}-{last}/{size}",
+            "content-length": str(last - first + 1),
+        })
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path, self.first, self.last = path, first, last
+        self.send_header_only = method.upper() == "HEAD"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.last - self.first + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.first)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break  # Truncated under us
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+class CachedStaticFiles(StaticFiles):
+    def __init__(self, *, manifest=None, **kwargs):
+        # A services.static_manifest.StaticManifest of `directory`: sibling lookups and ETags come from it once built
+        super().__init__(**kwargs)
+        self.manifest = manifest
+
+    def _manifest_entry(self, path: str):
+        if self.manifest is None or not self.manifest.ready:
+            return None
+        return self.manifest.get(os.path.relpath(path, self.directory).replace(os.sep, "/"))
+
+    def _sibling(self, path: str) -> Optional[os.stat_result]:
+        if self.manifest is None or not self.manifest.ready:
+            return _stat(path)
+        entry = self._manifest_entry(path)
+        return entry.stat_result if entry is not None else None
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        if any(part.startswith(".") for part in path.split(os.sep)):
+            return "", None
+        return super().lookup_path(path)
+
+    def file_response(
+        self,
+        full_path: typing.Union[str, "os.PathLike[str]"],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request = Headers(scope=scope)
+        path = str(full_path)
+        media_type = mimetypes.guess_type(path)[0] or "text/plain"
+        content_addressed = parse_key(path.replace(os.sep, "/")) is not None
+        headers = {"accept-ranges": "bytes", "cache-control": IMMUTABLE if content_addressed else REVALIDATE}
+        vary = []
+        suffix = ""
+
+        if self.manifest is not None and self.manifest.ready:
+            entry = self._manifest_entry(path)
+            if entry is None or (entry.size, entry.mtime_ns) != (stat_result.st_size, stat_result.st_mtime_ns):
+                # Written by another process since the manifest saw it
+                self.manifest.refresh(os.path.relpath(path, self.directory).replace(os.sep, "/"))
+
+        base, extension = os.path.splitext(path)
+        if extension.lower() in WEBP_SOURCES:
+            webp = self._sibling(base + ".webp")
+            if webp is not None:
+                vary.append("Accept")
+                if _accepts(request.get("accept", ""), "image/webp"):
+                    path, stat_result, media_type, suffix = base + ".webp", webp, "image/webp", "+webp"
+
+        wants_range = "range" in request and status_code == 200
+        precompressed = [(encoding, path + ext, self._sibling(path + ext)) for encoding, ext in ENCODINGS]
+        precompressed = [candidate for candidate in precompressed if candidate[2] is not None]
+        if precompressed:
+            vary.append("Accept-Encoding")
+            if not wants_range:  # Ranges are served from the identity encoding only
+                for encoding, file, result in precompressed:
+                    if _accepts(request.get("accept-encoding", ""), encoding):
+                        path, stat_result, suffix = file, result, f"{suffix}+{encoding}"
+                        headers["content-encoding"] = encoding
+                        break
+        if vary:
+            headers["vary"] = ", ".join(vary)
+
+        served = self._manifest_entry(path)
+        if content_addressed:
+            etag = f'"{os.path.basename(str(full_path))}{suffix}"'
+        elif served is not None and served.mtime_ns == stat_result.st_mtime_ns:
+            etag = f'"{served.digest[:32]}"'  # Survives copies and touches, unlike the mtime
+        else:
+            etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}{suffix}"'
+        headers["etag"] = etag
+        headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+
+        if status_code == 200 and self._not_modified(request, etag, stat_result):
+            return Response(status_code=304, headers={
+                name: value for name, value in headers.items() if name in ("cache-control", "etag", "vary")
+            })
+
+        if wants_range and request.get("if-range", etag) in (etag, headers["last-modified"]):
+            size = stat_result.st_size
+            try:
+                byte_range = parse_range(request["range"], size)
+            except ValueError:
+                return Response(status_code=416, headers=dict(headers, **{"content-range": f"bytes */{size}"}))
+            if byte_range is not None:
+                return FileRangeResponse(path, *byte_range, size, headers, media_type, scope["method"])
+
+        return FileResponse(path, status_code=status_code, headers=headers, media_type=media_type,
+                            stat_result=stat_result, method=scope["method"])
+
+    @staticmethod
+    def _not_modified(request: Headers, etag: str, stat_result: os.stat_result) -> bool:
+        if "if-none-match" in request:
+            tags = [tag.strip() for tag in request["if-none-match"].split(",")]
+            # Weak comparison, as RFC 9110 requires for If-None-Match
+            return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+        since = parsedate(request.get("if-modified-since", ""))
+        if since is not None:
+            return int(stat_result.st_mtime) <= calendar.timegm(since)
+        return False
+
+def precompress(directory: str, min_size: int = 1024) -> int:
+    """Write `.gz` (and `.br`) siblings for compressible files under `directory`. Returns the number written."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            source = os.path.join(root, name)
+            if not name.lower().endswith(COMPRESSIBLE) or os.path.getsize(source) < min_size:
+                continue
+            with open(source, "rb") as file:
+                content = file.read()
+            encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                encoders.append((".br", lambda data: brotli.compress(data, quality=11)))
+            for ext, encode in encoders:
+                target = source + ext
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                    continue  # Up to date
+                compressed = encode(content)
+                if len(compressed) >= len(content) * 0.9:
+                    continue  # Not worth a second representation
+                with open(target + ".tmp", "wb") as file:
+                    file.write(compressed)
+                os.replace(target + ".tmp", target)
+                shutil.copystat(source, target)
+                written += 1
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write precompressed siblings for the static directory")
+    parser.add_argument("directory", nargs="?", default="static")
+    parser.add_argument("--min-size", type=int, default=1024, help="Skip smaller files (bytes)")
+    args = parser.parse_args()
+    print(f"Wrote {precompress(args.directory, args.min_size)} precompressed files")
@@ -0,0 +1,250 @@
+"""
+In-memory manifest of the files under static/.
+
+`/api/static-test` used to walk the whole tree and stat every file on each
+call, and `/static` stats up to three siblings (WebP, .br, .gz) of every
+file it serves. Both slow down as `event_images` grows. The manifest is
+built once at startup. It keeps, for every file:
+
+    path      relative to the static directory, "/"-separated
+    size, mtime_ns
+    digest    sha256 of the content. For content-addressed image keys it is
+              the digest in the name: the file never changes under that name
+              (variants are derived from that content)
+
+The image store (services/image_store.py) reports every blob it writes,
+touches or deletes, so uploads, rendered variants and garbage collection
+keep the manifest current. The manifest is per process and does not see
+files written by other workers or processes (e.g. the precompress script).
+`STATIC_MANIFEST_WATCH=true` keeps it current with inotify instead. This
+needs Linux and the optional inotify_simple package, and one watch per
+directory (see fs.inotify.max_user_watches). `/static` also refreshes the
+entry of a requested file whose size or mtime no longer match.
+"""
+import bisect
+import hashlib
+import logging
+import os
+import stat
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from services.image_store import ImageStorage, image_store, parse_key, shard_key
+from services.images import variant_keys
+from services.static_files import ENCODINGS, WEBP_SOURCES
+
+try:
+    import inotify_simple
+except ImportError:  # Optional: only needed for STATIC_MANIFEST_WATCH
+    inotify_simple = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+class ManifestEntry(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    digest: str
+    stat_result: os.stat_result
+
+def _digest(path: str, relative: str) -> str:
+    match = parse_key(relative)
+    if match is not None:
+        return match["digest"]
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def _hidden(relative: str) -> bool:
+    # Not served by /static either, e.g. the image store's .staging directory
+    return any(part.startswith(".") for part in relative.split("/"))
+
+class StaticManifest:
+    def __init__(self, root: str = "static"):
+        self.root = root
+        self.built_seconds: Optional[float] = None
+        self._entries: Dict[str, ManifestEntry] = {}
+        self._paths: List[str] = []  # Sorted, for paging
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.built_seconds is not None
+
+    def _entry(self, relative: str, previous: Optional[ManifestEntry] = None) -> Optional[ManifestEntry]:
+        path = os.path.join(self.root, *relative.split("/"))
+        try:
+            result = os.stat(path)
+            if not stat.S_ISREG(result.st_mode):
+                return None
+            if previous is not None and (previous.size, previous.mtime_ns) == (result.st_size, result.st_mtime_ns):
+                digest = previous.digest  # Unchanged: e.g. an event for a file written by the store
+            else:
+                digest = _digest(path, relative)
+            return ManifestEntry(relative, result.st_size, result.st_mtime_ns, digest, result)
+        except OSError:
+            return None  # Gone (or unreadable) by now
+
+    def build(self) -> None:
+        started = time.perf_counter()
+        entries = {}
+        for directory, subdirectories, files in os.walk(self.root):
+            subdirectories[:] = [name for name in subdirectories if not name.startswith(".")]
+            for name in files:
+                if name.startswith("."):
+                    continue
+                relative = os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+                entry = self._entry(relative)
+                if entry is not None:
+                    entries[relative] = entry
+        with self._lock:
+            self._entries = entries
+            self._paths = sorted(entries)
+        self.built_seconds = time.perf_counter() - started
+        logger.info("Static manifest: %d files in %.3fs", len(entries), self.built_seconds)
+
+    def refresh(self, relative: str) -> Optional[ManifestEntry]:
+        """Re-read `relative` from disk. Returns its new entry, or None if it is gone."""
+        if _hidden(relative):
+            return None
+        entry = self._entry(relative, self._entries.get(relative))
+        with self._lock:
+            if entry is None:
+                if self._entries.pop(relative, None) is not None:
+                    del self._paths[bisect.bisect_left(self._paths, relative)]
+            else:
+                if relative not in self._entries:
+                    bisect.insort(self._paths, relative)
+                self._entries[relative] = entry
+        return entry
+
+    def forget(self, prefix: str) -> None:
+        """Drop the entries of a directory that was removed or moved away."""
+        prefix = prefix.rstrip("/") + "/"
+        with self._lock:
+            first = bisect.bisect_left(self._paths, prefix)
+            last = bisect.bisect_left(self._paths, prefix[:-1] + "0")  # "0" sorts right after "/"
+            for relative in self._paths[first:last]:
+                del self._entries[relative]
+            del self._paths[first:last]
+
+    def follow(self, store: ImageStorage) -> None:
+        """Refresh the blobs `store` changes, if it keeps them below the static directory."""
+        root = getattr(store, "root", None)
+        if root is None:
+            return  # Not a local store
+        prefix = os.path.relpath(root, self.root).replace(os.sep, "/")
+        if prefix == ".." or prefix.startswith("../"):
+            return
+        store.listeners.append(lambda key: self.refresh(f"{prefix}/{key}"))
+
+    def get(self, relative: str) -> Optional[ManifestEntry]:
+        return self._entries.get(relative)
+
+    def list(self, after: str = "", skip: int = 0, limit: int = 100) -> List[ManifestEntry]:
+        """Entries sorted by path: those after `after`, then `skip`ped and `limit`ed."""
+        with self._lock:
+            start = bisect.bisect_right(self._paths, after) + skip if after else skip
+            return [self._entries[relative] for relative in self._paths[start:start + limit]]
+
+    def variants(self, relative: str) -> List[str]:
+        """Other files served for `relative`: its WebP sibling, precompressed siblings and resized variants."""
+        candidates = [relative + extension for _, extension in ENCODINGS]
+        base, extension = os.path.splitext(relative)
+        if extension.lower() in WEBP_SOURCES:
+            candidates.append(base + ".webp")
+        match = parse_key(relative)
+        if match is not None and not match["variant"]:
+            directory = relative[:-len(shard_key(match["digest"], match["extension"]))]
+            candidates += [directory + key for formats in variant_keys(match["digest"]).values()
+                           for key in formats.values()]
+        return [candidate for candidate in candidates if candidate in self._entries]
+
+    def describe(self, entry: ManifestEntry) -> Dict[str, Any]:
+        return {
+            "path": f"/{self.root}/{entry.path}",
+            "size": entry.size,
+            "mtime": entry.mtime_ns / 1e9,
+            "digest": entry.digest,
+            "variants": [f"/{self.root}/{variant}" for variant in self.variants(entry.path)],
+            "exists": True,
+        }
+
+    def watch(self) -> bool:
+        """Keep the manifest current with inotify on a daemon thread. False when that is not available."""
+        if self._watcher is not None:
+            return True
+        if inotify_simple is None:
+            logger.warning("STATIC_MANIFEST_WATCH needs the inotify_simple package (pip install inotify_simple)")
+            return False
+        try:
+            inotify = inotify_simple.INotify()
+        except OSError as e:  # Not Linux, or out of inotify instances
+            logger.warning("Cannot watch the static directory: %s", e)
+            return False
+        self._stopping.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(inotify,), name="static-manifest", daemon=True)
+        self._watcher.start()
+        return True
+
+    def stop(self) -> None:
+        if self._watcher is not None:
+            self._stopping.set()
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self, inotify) -> None:
+        flags = inotify_simple.flags
+        mask = flags.CLOSE_WRITE | flags.ATTRIB | flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO
+        directories: Dict[int, str] = {}  # Watch descriptor -> directory relative to the root ("" for the root)
+
+        def add(relative: str) -> None:
+            # A new directory may already have files in it by the time its watch exists: refresh them too
+            path = os.path.join(self.root, *relative.split("/")) if relative else self.root
+            for directory, subdirectories, files in os.walk(path):
+                subdirectories[:] = [name for name in subdirectories if not name.startswith(".")]
+                directory_relative = os.path.relpath(directory, self.root).replace(os.sep, "/")
+                directory_relative = "" if directory_relative == "." else directory_relative
+                directories[inotify.add_watch(directory, mask)] = directory_relative
+                for name in files:
+                    self.refresh(f"{directory_relative}/{name}" if directory_relative else name)
+
+        try:
+            add("")
+            while not self._stopping.is_set():
+                for event in inotify.read(timeout=1000):
+                    parent = directories.get(event.wd)
+                    if parent is None or not event.name or event.name.startswith("."):
+                        continue
+                    relative = f"{parent}/{event.name}" if parent else event.name
+                    if not event.mask & flags.ISDIR:
+                        self.refresh(relative)
+                    elif event.mask & (flags.CREATE | flags.MOVED_TO):
+                        add(relative)
+                    elif event.mask & (flags.DELETE | flags.MOVED_FROM):
+                        self.forget(relative)  # Its watch is removed by the kernel or follows the move
+                        for wd in [wd for wd, d in directories.items()
+                                   if d == relative or d.startswith(relative + "/")]:
+                            del directories[wd]
+        except OSError as e:  # e.g. ENOSPC: fs.inotify.max_user_watches reached
+            logger.error("Stopped watching the static directory: %s", e)
+        finally:
+            inotify.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._entries),
+            "bytes": sum(entry.size for entry in list(self._entries.values())),
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+            "built_seconds": round(self.built_seconds, 3) if self.built_seconds is not None else None,
+        }
+
+static_manifest = StaticManifest("static")
+static_manifest.follow(image_store)
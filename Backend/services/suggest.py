@@ -0,0 +1,372 @@
+"""
+In-process autocomplete index over the titles and locations of upcoming events.
+
+`GET /api/events/suggest?prefix=` is called on every keystroke of the search
+box, so it never touches the database. It is answered from the structures
+kept here:
+
+    words     sorted list of every distinct word. It doubles as a trie: the
+              words below a prefix are a bisect range
+    postings  word -> ids of the events whose title or location contains it
+    order     (start_datetime, id) of every event, sorted
+
+Each word of the prefix must match a word of the event, the last one as a
+prefix. Hits are the soonest upcoming events. When the exact matches do not
+fill the page, words within an edit distance of 1 (4+ letters) or 2 (7+
+letters) of the typed prefix are accepted too, ranked after exact matches,
+so "pyhton wor" still finds "Python workshop". They are found by walking the
+trie with a Levenshtein row per node, pruning branches that are already too
+far off.
+
+The index is built at startup and updated by the event write handlers in
+`routes/event.py`. It is per process; with several workers each one rebuilds
+from the database every `SUGGEST_REFRESH_SECONDS` (in the background), which
+also drops events that have started.
+"""
+import bisect
+import heapq
+import itertools
+import logging
+import math
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 5
+# Query words whose typo matches are remembered (until the vocabulary changes)
+FUZZY_CACHE_SIZE = 1024
+
+class Suggestion(NamedTuple):
+    id: int
+    title: str
+    location: Optional[str]
+    start_datetime: datetime
+
+def normalize(text: Optional[str]) -> List[str]:
+    """Lowercased words of `text` with accents removed ("Café" -> "cafe")."""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return re.findall(r"\w+", "".join(c for c in decomposed if not unicodedata.combining(c)))
+
+def max_edits(token: str) -> int:
+    return 2 if len(token) >= 7 else 1 if len(token) >= 4 else 0
+
+def _insert(items: list, item: Any, keep_sorted: bool) -> None:
+    if keep_sorted:
+        bisect.insort(items, item)
+    else:
+        items.append(item)
+
+class _Term(NamedTuple):
+    """One word of the query and the misspelt prefixes it may stand for."""
+    token: str
+    whole_word: bool
+    fuzzy: Dict[str, int]       # vocabulary prefix -> edits from `token`
+    lengths: Tuple[int, ...]    # distinct lengths of those prefixes
+
+    @classmethod
+    def create(cls, token: str, whole_word: bool, fuzzy: Dict[str, int]) -> "_Term":
+        return cls(token, whole_word, fuzzy, tuple(sorted({len(prefix) for prefix in fuzzy})))
+
+    def edits(self, words: Iterable[str]) -> Optional[int]:
+        """Fewest edits with which one of an event's `words` matches, or None."""
+        best = None
+        for word in words:
+            if word == self.token or (not self.whole_word and word.startswith(self.token)):
+                return 0
+            for n in self.lengths:
+                if self.whole_word and n != len(word):
+                    continue
+                edits = self.fuzzy.get(word[:n])
+                if edits is not None and (best is None or edits < best):
+                    best = edits
+        return best
+
+class _Index:
+    """The index structures. Not thread-safe; `SuggestIndex` guards them."""
+
+    def __init__(self):
+        self.events: Dict[int, Suggestion] = {}
+        self.event_words: Dict[int, Tuple[str, ...]] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.words: List[str] = []
+        self.order: List[Tuple[datetime, int]] = []
+        self._fuzzy_cache: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def load(self, events: Iterable[Suggestion]) -> None:
+        """Bulk `add`, sorting once at the end."""
+        for event in events:
+            self.add(event, keep_sorted=False)
+        self.words.sort()
+        self.order.sort()
+
+    def add(self, event: Suggestion, keep_sorted: bool = True) -> None:
+        self.remove(event.id)
+        words = tuple(dict.fromkeys(normalize(event.title) + normalize(event.location)))
+        self.events[event.id] = event
+        self.event_words[event.id] = words
+        _insert(self.order, (event.start_datetime, event.id), keep_sorted)
+        for word in words:
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = set()
+                _insert(self.words, word, keep_sorted)
+                self._fuzzy_cache.clear()
+            posting.add(event.id)
+
+    def remove(self, event_id: int) -> None:
+        event = self.events.pop(event_id, None)
+        if event is None:
+            return
+        del self.order[bisect.bisect_left(self.order, (event.start_datetime, event_id))]
+        for word in self.event_words.pop(event_id):
+            posting = self.postings[word]
+            posting.discard(event_id)
+            if not posting:
+                del self.postings[word]
+                del self.words[bisect.bisect_left(self.words, word)]
+                self._fuzzy_cache.clear()
+
+    def prefix_words(self, prefix: str) -> Iterator[str]:
+        i = bisect.bisect_left(self.words, prefix)
+        while i < len(self.words) and self.words[i].startswith(prefix):
+            yield self.words[i]
+            i += 1
+
+    def children(self, prefix: str) -> Iterator[str]:
+        """The distinct letters that follow `prefix` in the vocabulary (the trie node's edges)."""
+        words, n = self.words, len(prefix)
+        i = bisect.bisect_left(words, prefix)
+        if i < len(words) and words[i] == prefix:
+            i += 1
+        while i < len(words) and words[i].startswith(prefix):
+            char = words[i][n]
+            yield char
+            i = bisect.bisect_left(words, prefix + chr(ord(char) + 1), i)
+
+    def fuzzy_prefixes(self, token: str) -> Dict[str, int]:
+        """
+        Vocabulary prefixes within `max_edits(token)` of `token`, with their
+        distance. Swapping two adjacent letters counts as one edit.
+        """
+        cached = self._fuzzy_cache.get(token)
+        if cached is not None:
+            self._fuzzy_cache.move_to_end(token)
+            return cached
+
+        limit, n = max_edits(token), len(token)
+        found: Dict[str, int] = {}
+
+        # row[i] is the distance between token[:i] and the prefix of the current node
+        def visit(prefix: str, before: Optional[List[int]], row: List[int]) -> None:
+            for char in self.children(prefix):
+                current = [row[0] + 1]
+                for i in range(1, n + 1):
+                    cost = min(row[i] + 1, current[i - 1] + 1, row[i - 1] + (token[i - 1] != char))
+                    if before is not None and i > 1 and token[i - 1] == prefix[-1] and token[i - 2] == char:
+                        cost = min(cost, before[i - 2] + 1)
+                    current.append(cost)
+                if min(current) > limit:
+                    continue
+                if current[n] <= limit:
+                    found[prefix + char] = current[n]
+                visit(prefix + char, row, current)
+
+        if limit:
+            visit("", None, list(range(n + 1)))
+        self._fuzzy_cache[token] = found
+        if len(self._fuzzy_cache) > FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.popitem(last=False)
+        return found
+
+    def _candidates(self, term: _Term, cap: int) -> Optional[Set[int]]:
+        """The events matching `term`, or None if there are more than `cap`."""
+        if term.whole_word:
+            words = itertools.chain([term.token], term.fuzzy)
+        else:
+            # Prefixes sort right before their extensions; only the shortest ones need expanding
+            roots: List[str] = []
+            for prefix in sorted(itertools.chain([term.token], term.fuzzy)):
+                if not roots or not prefix.startswith(roots[-1]):
+                    roots.append(prefix)
+            words = itertools.chain.from_iterable(self.prefix_words(root) for root in roots)
+        total, events = 0, set()
+        for word in words:
+            posting = self.postings.get(word, ())
+            total += len(posting)
+            if total > cap:
+                return None
+            events.update(posting)
+        return events
+
+    def search(self, tokens: List[str], limit: int, now: datetime, fuzzy: bool) -> List[Suggestion]:
+        # Every word but the last has been typed completely
+        terms = [
+            _Term.create(token, i < len(tokens) - 1, self.fuzzy_prefixes(token) if fuzzy else {})
+            for i, token in enumerate(tokens)
+        ]
+
+        # Start from the most selective term. When every term matches many
+        # events, walking all events by start time finds `limit` hits sooner.
+        candidates = None
+        cap = int(math.sqrt(limit * len(self.events))) + limit
+        for term in terms:
+            events = self._candidates(term, cap if candidates is None else len(candidates))
+            if events is not None:
+                candidates = events
+        if candidates is not None:
+            pool = sorted((self.events[event_id].start_datetime, event_id) for event_id in candidates)
+        else:
+            pool = self.order
+
+        hits = []
+        for start, event_id in itertools.islice(pool, bisect.bisect_left(pool, (now,)), None):
+            words = self.event_words[event_id]
+            total = 0
+            for term in terms:
+                edits = term.edits(words)
+                if edits is None:
+                    break
+                total += edits
+            else:
+                hits.append((total, start, event_id))
+                # A full scan is cut short; typo hits then rank among the soonest events only
+                if len(hits) == limit and (not fuzzy or candidates is None):
+                    break
+        return [self.events[event_id] for _, _, event_id in heapq.nsmallest(limit, hits)]
+
+    def memory(self) -> int:
+        """Approximate bytes held by the index structures (shared objects counted once)."""
+        seen: Set[int] = set()
+
+        def size(obj: Any) -> int:
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            total = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                total += sum(size(key) + size(value) for key, value in obj.items())
+            elif isinstance(obj, (list, tuple, set)):
+                total += sum(size(item) for item in obj)
+            return total
+
+        return sum(size(structure) for structure in (self.events, self.event_words, self.postings, self.words, self.order))
+
+class SuggestIndex:
+    """Thread-safe autocomplete index; see the module docstring."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.built_at: Optional[float] = None
+        self.build_seconds = 0.0
+        self._index = _Index()
+        self._lock = threading.Lock()
+        # Writes made while a rebuild is loading rows; replayed onto the new index
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+
+    def rebuild(self, db: Session) -> None:
+        """Replace the index with the upcoming events currently in the database."""
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending = []
+        try:
+            rows = (
+                db.query(models.Event.id, models.Event.title, models.Event.location, models.Event.start_datetime)
+                .filter(models.Event.start_datetime >= datetime.utcnow())
+                .all()
+            )
+            self.load(Suggestion(*row) for row in rows)
+        finally:
+            self._pending = None
+        logger.info("Built the suggest index: %d events in %.3f s", len(rows), self.build_seconds)
+
+    def load(self, events: Iterable[Suggestion]) -> None:
+        """Replace the index with `events`."""
+        started = time.perf_counter()
+        index = _Index()
+        index.load(events)
+        with self._lock:
+            for operation, argument in self._pending or ():
+                if operation == "add":
+                    index.add(argument)
+                else:
+                    index.remove(argument)
+            self._index = index
+            self._pending = None
+            self.built_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - started
+
+    def add(self, event: models.Event) -> None:
+        """Index a created or updated event. Call after committing."""
+        suggestion = Suggestion(event.id, event.title, event.location, event.start_datetime)
+        with self._lock:
+            self._index.add(suggestion)
+            if self._pending is not None:
+                self._pending.append(("add", suggestion))
+
+    def remove(self, event_id: int) -> None:
+        """Drop a deleted event. Call after committing."""
+        with self._lock:
+            self._index.remove(event_id)
+            if self._pending is not None:
+                self._pending.append(("remove", event_id))
+
+    def suggest(self, prefix: str, limit: int) -> List[Suggestion]:
+        tokens = normalize(prefix)[:MAX_TOKENS]
+        if not tokens:
+            return []
+        now = datetime.utcnow()
+        with self._lock:
+            # Typo matching only when the exact prefixes leave the page short
+            results = self._index.search(tokens, limit, now, fuzzy=False)
+            if len(results) < limit:
+                results = self._index.search(tokens, limit, now, fuzzy=True)
+        self._refresh_if_stale()
+        return results
+
+    def _refresh_if_stale(self) -> None:
+        if (self.refresh_seconds <= 0 or self.built_at is None or self._pending is not None
+                or time.monotonic() - self.built_at < self.refresh_seconds):
+            return
+        # Claim the refresh so concurrent requests do not start one each
+        self.built_at = time.monotonic()
+        threading.Thread(target=refresh, name="suggest-index-refresh", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._index
+            return {
+                "events": len(index.events),
+                "words": len(index.words),
+                "postings": sum(len(posting) for posting in index.postings.values()),
+                "memory_bytes": index.memory(),
+                "build_seconds": round(self.build_seconds, 4),
+                "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at is not None else None,
+            }
+
+suggest_index = SuggestIndex(settings.SUGGEST_REFRESH_SECONDS)
+
+def refresh() -> None:
+    """Rebuild `suggest_index` from the database with a session of its own."""
+    db = SessionLocal()
+    try:
+        suggest_index.rebuild(db)
+    except Exception:
+        logger.exception("Failed to build the suggest index")
+    finally:
+        db.close()
@@ -0,0 +1,133 @@
+"""
+In-process cache of authenticated user principals.
+
+`security.get_current_user` runs on every authenticated request. Without a
+cache, each call costs a `SELECT ... FROM users WHERE email = ?`. The
+principals cached here are immutable snapshots of the user row, keyed by
+the token subject (the email). An entry lives at most
+`USER_CACHE_TTL_SECONDS`. Once `USER_CACHE_SIZE` entries are held, the
+least recently used one is evicted.
+
+Code that writes a user must call `invalidate` with the user's email after
+committing. The email is the old one too, if it changed. The cache is per
+process, so writes made by another worker or by a maintenance script show
+up here only after the TTL.
+
+The password hash is deliberately not cached. Handlers that need it, or
+that modify the user, load the row themselves.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+import models
+from config import settings
+
+class UserPrincipal(NamedTuple):
+    """Read-only snapshot of the fields request handlers use from `models.User`."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: Any
+    is_active: bool
+    email_verified: Optional[bool]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    token_version: int
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == models.UserRole.ADMIN
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active,
+            email_verified=user.email_verified,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            token_version=user.token_version or 0,
+        )
+
+class UserCache:
+    """A thread-safe TTL + LRU map from token subject to `UserPrincipal`."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by every invalidation; a lookup that started before one must not repopulate the cache
+        self.generation = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[UserPrincipal]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is not None:
+                expires_at, principal = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(subject)
+                    self.hits += 1
+                    return principal
+                del self._entries[subject]
+            self.misses += 1
+            return None
+
+    def set(self, subject: str, principal: UserPrincipal, generation: Optional[int] = None) -> None:
+        """
+        Cache `principal`. Pass the `generation` read before loading it from
+        the database: if an invalidation happened since, the row may be stale
+        and is not cached.
+        """
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[subject] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *subjects: Optional[str]) -> None:
+        """Drop the entries for these subjects (None is ignored)."""
+        with self._lock:
+            self.generation += 1
+            for subject in subjects:
+                if subject is not None and self._entries.pop(subject, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+def invalidate(*emails: Optional[str]) -> None:
+    user_cache.invalidate(*emails)
@@ -0,0 +1,141 @@
+"""
+The principal cache (services/user_cache.py) and token revocation by
+token version (security.py), through the /api/auth endpoints.
+
+Usage:
+    python -m pytest -q test_auth_tokens.py
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from database import get_db
+from routes import auth, user
+from services.user_cache import UserCache, UserPrincipal, user_cache
+
+def _principal(user_id, email, token_version=0):
+    return UserPrincipal(user_id, email, "Name", models.UserRole.GENERAL, True, True, None, None, token_version)
+
+def _client():
+    # One in-memory database shared by the request threads
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    sessions = sessionmaker(bind=engine)
+
+    def get_test_db():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.include_router(user.router)
+    app.dependency_overrides[get_db] = get_test_db
+    return TestClient(app)
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_cache_expiry_eviction_and_generations():
+    cache = UserCache(maxsize=2, ttl=0.05)
+    cache.set("a@example.com", _principal(1, "a@example.com"))
+    cache.set("b@example.com", _principal(2, "b@example.com"))
+    assert cache.get("a@example.com").id == 1
+    # b is now the least recently used entry
+    cache.set("c@example.com", _principal(3, "c@example.com"))
+    assert cache.get("b@example.com") is None and cache.evictions == 1
+
+    # A lookup that started before an invalidation does not repopulate the cache
+    generation = cache.generation
+    cache.invalidate("a@example.com", None)
+    assert cache.get("a@example.com") is None and cache.invalidations == 1
+    cache.set("a@example.com", _principal(1, "a@example.com"), generation)
+    assert cache.get("a@example.com") is None
+    cache.set("a@example.com", _principal(1, "a@example.com"), cache.generation)
+    assert cache.get("a@example.com").id == 1
+
+    time.sleep(0.06)
+    assert cache.get("a@example.com") is None and cache.get("c@example.com") is None
+    assert cache.stats()["size"] == 0
+
+def test_profile_update_invalidates_the_cached_principal():
+    client = _client()
+    user_cache.clear()
+    token = client.post("/api/auth/register", json={
+        "email": "rename@example.com", "full_name": "Before", "password": "password123"}).json()["access_token"]
+    assert client.get("/api/auth/me", headers=_bearer(token)).json()["full_name"] == "Before"
+    assert user_cache.get("rename@example.com").full_name == "Before"
+
+    assert client.put("/api/auth/me", json={"email": "rename@example.com", "full_name": "After"},
+                      headers=_bearer(token)).status_code == 200
+    assert user_cache.get("rename@example.com") is None
+    assert client.get("/api/auth/me", headers=_bearer(token)).json()["full_name"] == "After"
+
+def test_password_change_revokes_earlier_tokens():
+    client = _client()
+    user_cache.clear()
+    old_token = client.post("/api/auth/register", json={
+        "email": "change@example.com", "full_name": "Changer", "password": "password123"}).json()["access_token"]
+    assert client.get("/api/auth/me", headers=_bearer(old_token)).status_code == 200
+    assert user_cache.get("change@example.com").token_version == 0
+
+    assert client.post("/api/auth/change-password", headers=_bearer(old_token), json={
+        "current_password": "password123", "new_password": "password456"}).status_code == 204
+    # The cached principal was dropped, so the old token meets the new version right away
+    assert client.get("/api/auth/me", headers=_bearer(old_token)).status_code == 401
+    assert user_cache.get("change@example.com").token_version == 1
+
+    login = client.post("/api/auth/login", json={"email": "change@example.com", "password": "password456"})
+    new_token = login.json()["access_token"]
+    assert client.get("/api/auth/me", headers=_bearer(new_token)).status_code == 200
+    assert client.get("/api/auth/me", headers=_bearer(old_token)).status_code == 401
+
+def test_password_change_through_the_profile_revokes_earlier_tokens():
+    client = _client()
+    user_cache.clear()
+    old_token = client.post("/api/auth/register", json={
+        "email": "profile@example.com", "full_name": "Profile", "password": "password123"}).json()["access_token"]
+
+    assert client.put("/api/users/me", headers=_bearer(old_token), json={
+        "email": "moved@example.com", "password": "password456"}).status_code == 200
+    assert client.get("/api/auth/me", headers=_bearer(old_token)).status_code == 401
+
+    # The other fields changed along with the password
+    login = client.post("/api/auth/login", json={"email": "moved@example.com", "password": "password456"})
+    assert client.get("/api/auth/me", headers=_bearer(login.json()["access_token"])).status_code == 200
+    assert user_cache.get("moved@example.com").token_version == 1
+
+def test_register_runs_no_sql_on_the_event_loop():
+    client = _client()
+    on_loop = []
+
+    def record(conn, cursor, statement, *args):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # A threadpool worker
+        on_loop.append(statement.split("\n")[0])
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/api/auth/register", json={
+            "email": "loop@example.com", "full_name": "Loop", "password": "password123"})
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert on_loop == []
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,52 @@
+"""
+Streaming registration export (services/export.py).
+
+Usage:
+    python -m pytest -q test_export.py
+"""
+import csv
+import io
+import json
+from datetime import timedelta
+
+import models
+from conftest import EVENT_START
+from services import export
+
+def _seed(db, make_event, registrations):
+    event = make_event(title="Export", waitlist_served=1)
+    for i in range(registrations):
+        user = models.User(email=f"user{i}@example.com", full_name="=HYPERLINK(1)" if i == 0 else f"User, {i}",
+                           hashed_password="x")
+        waiting = i >= registrations - 2
+        db.add(models.Registration(
+            user=user, event=event, registration_date=EVENT_START - timedelta(minutes=registrations - i),
+            status=models.RegistrationStatus.PENDING if waiting else models.RegistrationStatus.CONFIRMED,
+            waitlist_ticket=i - registrations + 4 if waiting else None,
+        ))
+    db.commit()
+    return event
+
+def test_csv_export(monkeypatch, db, make_event):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 3)
+    event = _seed(db, make_event, 7)
+    chunks = list(export.export_registrations(db, event.id, event.waitlist_served, "csv"))
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+
+    assert len(chunks) == 3  # one chunk per batch of rows
+    assert rows[0] == list(export.COLUMNS)
+    assert [row[6] for row in rows[1:]] == ["'=HYPERLINK(1)"] + [f"User, {i}" for i in range(1, 7)]
+    assert rows[1][1] == "2030-05-01T09:23:00" and rows[1][2:5] == ["confirmed", "False", ""]
+    assert [row[4] for row in rows[-2:]] == ["1", "2"]
+
+def test_ndjson_export(db, make_event):
+    event = _seed(db, make_event, 2)
+    lines = b"".join(export.export_registrations(db, event.id, event.waitlist_served, "ndjson")).splitlines()
+    first = json.loads(lines[0])
+    assert list(first) == list(export.COLUMNS)
+    assert first["full_name"] == "=HYPERLINK(1)" and first["status"] == "pending" and first["waitlist_position"] == 1
+
+def test_empty_event(db, make_event):
+    event = _seed(db, make_event, 0)
+    assert b"".join(export.export_registrations(db, event.id, 0, "csv")).decode().strip() == ",".join(export.COLUMNS)
+    assert list(export.export_registrations(db, event.id, 0, "ndjson")) == []
@@ -0,0 +1,96 @@
+"""
+Row encoding of list responses (services/fast_json.py) must match the JSON
+the response model produces.
+
+Usage:
+    python -m pytest -q test_fast_json.py
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from pydantic import TypeAdapter
+
+import models, schemas
+from conftest import EVENT_START
+from routes import event as event_routes
+from services import fast_json
+from services.fast_json import RowEncoder, UnknownField, parse_fields
+
+def _seed(db, make_event):
+    for i in range(5):
+        start = EVENT_START + timedelta(days=i, microseconds=i * 7)
+        make_event(title=f"Event é \"{i}\"  ", description="<b>Desc</b>", start_datetime=start,
+                   end_datetime=start + timedelta(hours=2), max_participants=i or None,
+                   registration_link=None if i % 2 else "https://example.com/r")
+    db.commit()
+
+def test_rows_encode_like_the_response_model(db, make_event):
+    _seed(db, make_event)
+    encoder = RowEncoder(models.Event, schemas.Event)
+    order = (models.Event.start_datetime, models.Event.id)
+    events = db.query(models.Event).order_by(*order).all()
+    rows = db.query(*encoder.columns).order_by(*order).all()
+
+    as_list = TypeAdapter(List[schemas.Event])
+    assert encoder.encode(rows) == as_list.dump_json(as_list.validate_python(events, from_attributes=True))
+
+    page = schemas.EventPage.model_validate({"items": events[:2], "next_cursor": "abc"}, from_attributes=True)
+    assert encoder.encode({"items": rows[:2], "next_cursor": "abc"}) == page.model_dump_json().encode()
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    content = [{"at": datetime(2030, 1, 1, 8, tzinfo=timezone.utc), "naive": datetime(2030, 1, 1, 8, 0, 0, 5),
+                "text": "é \"", "n": None, "f": 1.5}]
+    expected = fast_json.dumps(content)
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert fast_json.dumps(content) == expected
+    assert json.loads(expected)[0]["at"] == "2030-01-01T08:00:00Z"
+
+def test_parse_fields():
+    views = {"card": ("title", "location"), "full": None}
+    assert parse_fields(None, schemas.Event, views) is None
+    assert parse_fields("full", schemas.Event, views) is None
+    assert parse_fields("card", schemas.Event, views) == ("title", "location", "id")
+    assert parse_fields(" location, card ,", schemas.Event, views) == ("title", "location", "id")
+    assert parse_fields("is_cancelled,title", schemas.Event, views) == ("title", "id", "is_cancelled")
+    assert parse_fields(",".join(schemas.Event.model_fields), schemas.Event, views) is None
+    with pytest.raises(UnknownField):
+        parse_fields("card,hashed_password", schemas.Event, views)
+
+def test_list_events_fields_limit_columns_and_keys(db, make_event):
+    _seed(db, make_event)
+
+    def call(**kwargs):
+        params = dict(request=None, skip=0, limit=3, category=None, upcoming_only=False, cursor=None, fields=None)
+        params.update(kwargs)
+        result = event_routes.list_events.__wrapped__(db=db, **params)
+        return json.loads(event_routes._encode_event_list(params, result))
+
+    card = call(fields="card")
+    assert [list(event) for event in card] == [["title", "category", "location", "start_datetime", "image_url", "id", "image_variants"]] * 3
+    assert card == [{key: event[key] for key in card[0]} for event in call()]
+
+    page = call(fields="title", cursor="")
+    assert list(page["items"][0]) == ["title", "id"]
+    page = call(fields="title", cursor=page["next_cursor"])
+    assert [event["id"] for event in page["items"]] == [4, 5] and page["next_cursor"] is None
+
+    with pytest.raises(HTTPException) as error:
+        call(fields="nope")
+    assert error.value.status_code == 400
+
+def test_list_events_keeps_its_openapi_schema():
+    app = FastAPI()
+    app.include_router(event_routes.router)
+    spec = app.openapi()
+    response = spec["paths"]["/api/events/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    refs = json.dumps(response)
+    assert '"#/components/schemas/Event"' in refs and '"#/components/schemas/EventPage"' in refs
+    assert list(spec["components"]["schemas"]["Event"]["properties"]) == list(schemas.Event.model_fields)
+
+if __name__ == "__main__":
+    test_parse_fields()
+    test_list_events_keeps_its_openapi_schema()
+    print("✅ fast json tests passed")
@@ -0,0 +1,217 @@
+"""
+Event image uploads, their variants (services/images.py), the image store
+(services/image_store.py) and its garbage collector (services/image_gc.py).
+
+Usage:
+    python -m pytest -q test_images.py
+"""
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import models
+from services import images
+from services.image_gc import release_unreferenced, sweep_unreferenced
+from services.image_store import LocalImageStorage, S3ImageStorage, parse_key, shard_key
+from services.images import ImagePipeline, ImageTooLarge, InvalidImage, save_upload
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+class MemoryS3Client:
+    """Stand-in for a boto3 S3 client: the calls S3ImageStorage makes, kept in a dict."""
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self):
+        self.objects = {}  # key -> (content, last_modified, headers)
+
+    def _object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.NotFound(Key)
+        return self.objects[Key]
+
+    def head_object(self, Bucket, Key):
+        return {"LastModified": self._object(Bucket, Key)[1]}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        with open(Filename, "rb") as source:
+            self.objects[Key] = (source.read(), datetime.now(timezone.utc), ExtraArgs or {})
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective, **headers):
+        content = self._object(CopySource["Bucket"], CopySource["Key"])[0]
+        self.objects[Key] = (content, datetime.now(timezone.utc), headers)
+
+    def download_file(self, Bucket, Key, Filename):
+        with open(Filename, "wb") as target:
+            target.write(self._object(Bucket, Key)[0])
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def list_objects_v2(self, Bucket, ContinuationToken=""):
+        # Pages of two, continuing after the last key like S3 does
+        keys = [key for key in sorted(self.objects) if key > ContinuationToken]
+        page = {"Contents": [{"Key": key, "LastModified": self.objects[key][1]} for key in keys[:2]]}
+        if len(keys) > 2:
+            page.update(IsTruncated=True, NextContinuationToken=keys[1])
+        return page
+
+def _png(size, mode="RGB", color=(200, 30, 30)):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new(mode, size, color + (128,) if mode == "RGBA" else color).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+def test_sniff_format():
+    assert images.sniff_format(b"\xff\xd8\xff\xe0rest") == "jpg"
+    assert images.sniff_format(PNG_HEAD + b"rest") == "png"
+    assert images.sniff_format(b"GIF89a...") == "gif"
+    assert images.sniff_format(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+    assert images.sniff_format(b"<svg xmlns=") is None
+
+def test_keys_are_sharded_by_digest():
+    digest = "ab" + "cd" + "0" * 60
+    assert shard_key(digest, "png") == f"ab/cd/{digest}.png"
+    assert shard_key(digest, "webp", "card") == f"ab/cd/{digest}-card.webp"
+    match = parse_key(f"/static/event_images/ab/cd/{digest}-card.webp")
+    assert (match["digest"], match["variant"], match["extension"]) == (digest, "card", "webp")
+    assert parse_key("/static/event_images/event_1_20250525131435.jpeg") is None
+
+def test_save_upload_names_by_content_and_deduplicates(monkeypatch):
+    monkeypatch.setattr(images, "CHUNK_SIZE", 16)
+    content = PNG_HEAD + bytes(range(200))
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalImageStorage(directory)
+        first = save_upload(io.BytesIO(content), store, max_bytes=1024)
+        os.utime(store.path(first.key), (0, 0))
+        second = save_upload(io.BytesIO(content), store, max_bytes=1024)
+
+        assert first == second and first.size == len(content) and first.extension == "png"
+        assert first.key == shard_key(first.digest, "png")
+        assert first.url == f"/static/event_images/{first.key}"
+        assert [stored.key for stored in store.list()] == [first.key]
+        assert store.modified(first.key) > 0  # Touched by the second upload
+        with open(store.path(first.key), "rb") as stored:
+            assert stored.read() == content
+
+def test_save_upload_rejects_and_leaves_nothing_behind(monkeypatch):
+    monkeypatch.setattr(images, "CHUNK_SIZE", 16)
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalImageStorage(directory)
+        with pytest.raises(ImageTooLarge):
+            save_upload(io.BytesIO(PNG_HEAD + b"x" * 100), store, max_bytes=64)
+        with pytest.raises(InvalidImage):
+            save_upload(io.BytesIO(b"#!/bin/sh\nrm -rf /\n"), store, max_bytes=64)
+        with pytest.raises(InvalidImage):
+            save_upload(io.BytesIO(b""), store, max_bytes=64)
+        assert list(store.list()) == [] and os.listdir(store.staging_dir) == []
+
+def test_render_variants():
+    Image = pytest.importorskip("PIL.Image")
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.png")
+        with open(source, "wb") as target:
+            target.write(_png((2000, 1000), "RGBA").getvalue())
+        names = images.render_variants(source, "f" * 64, directory)
+
+        assert sorted(names) == sorted(key.rsplit("/", 1)[1] for formats in images.variant_keys("f" * 64).values()
+                                       for key in formats.values())
+        for name in names:
+            longest_side = images.VARIANT_SIZES[name.split("-")[1].split(".")[0]]
+            with Image.open(os.path.join(directory, name)) as variant:
+                assert variant.size == (longest_side, longest_side // 2)
+
+def test_render_variants_refuses_images_over_the_pixel_limit(monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(images, "MAX_PIXELS", 1000)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.png")
+        # Over the limit but under twice it, where Pillow would only warn
+        with open(source, "wb") as target:
+            target.write(_png((40, 30), "RGB").getvalue())
+        with pytest.raises(Image.DecompressionBombError):
+            images.render_variants(source, "f" * 64, directory)
+        assert os.listdir(directory) == ["source.png"]
+
+        with open(source, "wb") as target:
+            target.write(_png((40, 25), "RGB").getvalue())
+        assert len(images.render_variants(source, "f" * 64, directory)) == 4
+
+@pytest.mark.parametrize("backend", ["local", "s3"])
+def test_pipeline_stores_variants_and_reports_them(backend):
+    pytest.importorskip("PIL")
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalImageStorage(directory) if backend == "local" else S3ImageStorage(
+            MemoryS3Client(), "images", "https://cdn.example.com/")
+        pipeline = ImagePipeline(workers=0, store=store)  # a thread instead of a process pool
+        results = []
+        stored = save_upload(_png((300, 200)), store)
+        pipeline.submit(stored, results.append).result()
+        pipeline.submit(stored, results.append).result()  # Already rendered: nothing to do
+        pipeline.shutdown()
+
+        variants = images.variant_map(stored.digest, "png", store)
+        assert results == [variants, variants]
+        assert pipeline.rendered == 2 and pipeline.failed == 0
+        assert sorted(item.key for item in store.list()) == sorted(
+            [stored.key] + [key for formats in images.variant_keys(stored.digest).values() for key in formats.values()])
+        if backend == "s3":
+            assert variants["card"]["webp"] == f"https://cdn.example.com/{shard_key(stored.digest, 'webp', 'card')}"
+            assert store.client.objects[stored.key][2]["ContentType"] == "image/png"
+        else:
+            assert os.listdir(store.staging_dir) == []
+
+@pytest.mark.parametrize("backend", ["local", "s3"])
+def test_garbage_collection_keeps_referenced_and_recent_blobs(backend, db, make_event):
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalImageStorage(directory) if backend == "local" else S3ImageStorage(
+            MemoryS3Client(), "images", "/images")
+        kept, dropped, unused = (save_upload(io.BytesIO(PNG_HEAD + bytes([i])), store) for i in range(3))
+        for digest in (kept.digest, dropped.digest):
+            for formats in images.variant_keys(digest).values():
+                for key in formats.values():
+                    path = os.path.join(directory, "variant")
+                    with open(path, "wb") as target:
+                        target.write(b"variant")
+                    store.put(key, path)
+        legacy = os.path.join(directory, "event_1_20250525131435.jpeg")
+        with open(legacy, "wb") as target:
+            target.write(b"\xff\xd8\xff")
+        store.put("event_1_20250525131435.jpeg", legacy)  # Uploaded before the store existed
+
+        for i, url in enumerate([kept.url, kept.url, None]):
+            make_event(title=f"Event {i}", image_url=url)
+        db.commit()
+
+        before = {item.key for item in store.list()}
+        assert sweep_unreferenced(db, store, grace_seconds=3600) == 0  # Everything is recent
+        time.sleep(0.05)
+        deleted = sweep_unreferenced(db, store, grace_seconds=0)
+        after = {item.key for item in store.list()}
+
+        assert deleted == 6  # The dropped original, its four variants and the never-used upload
+        assert before - after == {dropped.key, unused.key} | {
+            key for formats in images.variant_keys(dropped.digest).values() for key in formats.values()}
+        assert kept.key in after and "event_1_20250525131435.jpeg" in after
+
+        # Released URLs are checked against their reference count, legacy names included
+        legacy_url = f"{store.url_prefix}/event_1_20250525131435.jpeg"
+        assert release_unreferenced(db, store, [kept.url, legacy_url], grace_seconds=0) == 1
+        db.query(models.Event).filter(models.Event.image_url == kept.url).update({"image_url": None})
+        db.commit()
+        assert release_unreferenced(db, store, [kept.url], grace_seconds=0) == 5
+        assert list(store.list()) == []
+
+if __name__ == "__main__":
+    test_sniff_format()
+    test_keys_are_sharded_by_digest()
+    test_render_variants()
+    for backend in ("local", "s3"):
+        test_pipeline_stores_variants_and_reports_them(backend)
+    print("✅ image tests passed")
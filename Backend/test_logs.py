@@ -0,0 +1,80 @@
+"""
+Logging pipeline (services/logs.py): JSON records, request ids, sampling.
+
+Usage:
+    python -m pytest -q test_logs.py
+"""
+import io
+import json
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.logs import RequestIdMiddleware, SamplingFilter, configure_logging, shutdown_logging
+
+def _records(stream, logger):
+    shutdown_logging()  # drains the queue
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    return [r for r in records if r["logger"] == logger]
+
+def test_records_carry_the_request_id():
+    stream = io.StringIO()
+    configure_logging("INFO", "json", stream=stream)
+    logger = logging.getLogger("test_logs.request")
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/ping")
+    def ping():
+        logger.info("Ping %d", 7, extra={"event_id": 3})
+        logger.debug("Not at INFO")
+        return {"ok": True}
+
+    client = TestClient(app)
+    forwarded = client.get("/ping", headers={"X-Request-ID": "abc123"})
+    generated = client.get("/ping")
+    records = _records(stream, "test_logs.request")
+
+    assert forwarded.headers["x-request-id"] == "abc123"
+    assert len(generated.headers["x-request-id"]) == 32
+    assert [(r["msg"], r["logger"], r["event_id"]) for r in records] == [("Ping 7", "test_logs.request", 3)] * 2
+    assert [r["request_id"] for r in records] == ["abc123", generated.headers["x-request-id"]]
+
+def test_message_is_rendered_when_logged():
+    class Loud:
+        value = "before"
+
+        def __repr__(self):
+            return f"Loud({self.value})"
+
+    stream = io.StringIO()
+    configure_logging("DEBUG", "json", stream=stream)
+    obj = Loud()
+    logging.getLogger("test_logs.render").debug("Got %r", obj)
+    obj.value = "after"
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("test_logs.render").exception("Failed")
+    records = _records(stream, "test_logs.render")
+
+    assert records[0]["msg"] == "Got Loud(before)"
+    assert records[1]["exc"].endswith("ValueError: boom")
+
+def test_sampling_uses_the_closest_configured_logger():
+    sampler = SamplingFilter({"routes": 0.0, "routes.event": 1.0})
+
+    def record(name, level):
+        return logging.LogRecord(name, level, __file__, 1, "msg", (), None)
+
+    assert sampler.filter(record("routes.event.detail", logging.DEBUG))
+    assert not sampler.filter(record("routes.registration", logging.DEBUG))
+    assert sampler.filter(record("routes.registration", logging.INFO))
+    assert sampler.filter(record("services.email", logging.DEBUG))
+
+if __name__ == "__main__":
+    test_records_carry_the_request_id()
+    test_message_is_rendered_when_logged()
+    test_sampling_uses_the_closest_configured_logger()
+    print("✅ logging tests passed")
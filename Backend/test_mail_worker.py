@@ -0,0 +1,116 @@
+"""
+The outbox mail worker (mail_worker.py) against the local SMTP sink
+(services/smtp_sink.py): delivery, permanent failures and retries.
+
+Usage:
+    python -m pytest -q test_mail_worker.py
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from mail_worker import OutboxWorker
+from models import OutboxStatus
+from services.mailer import RateLimiter, SMTPPool
+from services.outbox import enqueue_email
+from services.smtp_sink import SMTPSink
+
+@contextmanager
+def _worker(**sink_options):
+    """Yields (worker, sessions, sink): a worker bound to a fresh database and a running sink."""
+    with tempfile.TemporaryDirectory() as directory, SMTPSink(**sink_options) as sink:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'outbox.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        sessions = sessionmaker(bind=engine)
+        worker = OutboxWorker(
+            session_factory=sessions,
+            pool=SMTPPool(2, host=sink.host, port=sink.port, timeout=5),
+            rate_limiter=RateLimiter(0),
+            batch_size=10,
+            max_attempts=3,
+            retry_base_seconds=60,
+            lease_seconds=60,
+        )
+        try:
+            yield worker, sessions, sink
+        finally:
+            worker.close()
+            engine.dispose()
+
+def _queue(sessions, recipients):
+    db = sessions()
+    enqueue_email(db, recipients, "Hello", {"content": "<p>Hi</p>"})
+    db.commit()
+    db.close()
+
+def _rows(sessions):
+    db = sessions()
+    rows = {row.recipient: row for row in db.query(models.EmailOutbox)}
+    db.close()
+    return rows
+
+def test_batch_is_delivered_and_marked_sent():
+    with _worker() as (worker, sessions, sink):
+        recipients = [f"user{i}@example.com" for i in range(5)]
+        _queue(sessions, recipients)
+
+        assert worker.run_once() == 5
+        assert sink.messages == 5 and sorted(sink.recipients) == recipients
+        # Two pooled connections carried the whole batch
+        assert sink.connections <= 2
+        for row in _rows(sessions).values():
+            assert row.status == OutboxStatus.SENT and row.attempts == 1
+            assert row.sent_at is not None and row.locked_at is None and row.last_error is None
+        assert worker.run_once() == 0
+
+def test_permanent_failures_stop_and_temporary_ones_retry():
+    with _worker(reject=["gone@example.com"], fail_rate=1.0) as (worker, sessions, sink):
+        _queue(sessions, ["gone@example.com", "busy@example.com"])
+
+        # 550 on RCPT is final, 451 after DATA is retried later with backoff
+        assert worker.run_once() == 2
+        rows = _rows(sessions)
+        assert rows["gone@example.com"].status == OutboxStatus.FAILED
+        assert "550" in rows["gone@example.com"].last_error
+        busy = rows["busy@example.com"]
+        assert busy.status == OutboxStatus.PENDING and busy.attempts == 1 and "451" in busy.last_error
+        assert busy.next_attempt_at > datetime.utcnow() + timedelta(seconds=40)
+        assert sink.refused == 1 and sink.rejected == 1 and sink.messages == 0
+        # Not due yet
+        assert worker.run_once() == 0
+
+        sink.fail_rate = 0.0
+        db = sessions()
+        db.query(models.EmailOutbox).update({models.EmailOutbox.next_attempt_at: datetime.utcnow()})
+        db.commit()
+        db.close()
+        assert worker.drain() == 1
+        rows = _rows(sessions)
+        assert rows["busy@example.com"].status == OutboxStatus.SENT and rows["busy@example.com"].attempts == 2
+        assert rows["gone@example.com"].status == OutboxStatus.FAILED
+        assert sink.recipients == ["busy@example.com"]
+
+def test_retries_give_up_after_max_attempts():
+    with _worker(fail_rate=1.0) as (worker, sessions, sink):
+        _queue(sessions, ["busy@example.com"])
+        for attempt in range(1, 4):
+            db = sessions()
+            db.query(models.EmailOutbox).update({models.EmailOutbox.next_attempt_at: datetime.utcnow()})
+            db.commit()
+            db.close()
+            assert worker.run_once() == 1
+            row = _rows(sessions)["busy@example.com"]
+            assert row.attempts == attempt
+        assert row.status == OutboxStatus.FAILED and sink.rejected == 3
+        assert worker.run_once() == 0
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
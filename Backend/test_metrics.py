@@ -0,0 +1,64 @@
+"""
+Metrics middleware and text exposition (services/metrics.py).
+
+Usage:
+    python -m pytest -q test_metrics.py
+"""
+import re
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from services.metrics import Exposition, HttpMetrics, MetricsMiddleware
+
+# One sample line of the text exposition format: name{labels} value
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]\w*="([^"\\]|\\.)*",?)*\})? (\+Inf|-?[0-9.e+-]+)$')
+
+def _client(metrics):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    return TestClient(app)
+
+def _render(metrics):
+    out = Exposition()
+    metrics.collect(out)
+    return out.render()
+
+def test_requests_are_labelled_by_route_template():
+    metrics = HttpMetrics()
+    client = _client(metrics)
+    for item_id in (1, 2, 3, 0):
+        client.get(f"/items/{item_id}")
+    client.get("/missing")
+
+    assert metrics.requests == {
+        ("GET", "/items/{item_id}", 200): 3,
+        ("GET", "/items/{item_id}", 404): 1,
+        ("GET", "<unmatched>", 404): 1,
+    }
+    assert sum(metrics.latency[("GET", "/items/{item_id}")].counts) == 4
+    assert metrics.in_flight == 0
+
+def test_exposition_format():
+    metrics = HttpMetrics()
+    metrics.observe("GET", '/odd "route"\\', 200, 0.02)
+    metrics.observe("GET", '/odd "route"\\', 200, 20.0)
+    text = _render(metrics)
+
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or SAMPLE.match(line), line
+    assert '{method="GET",route="/odd \\"route\\"\\\\",le="0.025"} 1' in text
+    assert '{method="GET",route="/odd \\"route\\"\\\\",le="+Inf"} 2' in text
+    assert 'eventnow_http_request_duration_seconds_count{method="GET",route="/odd \\"route\\"\\\\"} 2' in text
+
+if __name__ == "__main__":
+    test_requests_are_labelled_by_route_template()
+    test_exposition_format()
+    print("✅ metrics tests passed")
@@ -0,0 +1,188 @@
+"""
+SQL statement budgets for the API endpoints.
+
+Every endpoint below is called through a TestClient against a scratch SQLite
+database. Collections hold more rows than any budget (ROWS), so an endpoint
+that loads a relationship row by row exceeds its budget. It also fails the
+`query_budget` fixture's check for repeated statement shapes (conftest.py).
+The response cache is cleared before each call so the database path is
+measured, including the conditional-GET validators.
+
+When a change legitimately adds a statement, raise the budget in BUDGETS.
+
+Usage:
+    python -m pytest -q test_query_budgets.py
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI, Header
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import get_db
+from routes import comment, event, recommendation, registration
+from security import get_current_user
+from services import response_cache
+from services.pagination import keyset_paginate
+from services.search import install_search_index
+from services.user_cache import UserPrincipal
+
+ROWS = 25
+
+# (method, path, user, budget, expected status); {hot} is a full event with a waitlist, {open} has free seats
+BUDGETS = [
+    ("GET", "/api/events/?limit=50", None, 2, 200),
+    ("GET", "/api/events/?cursor=", None, 2, 200),
+    ("GET", "/api/events/{hot}", None, 2, 200),
+    ("GET", "/api/events/search?q=seeded", None, 1, 200),
+    ("POST", "/api/events/batch", None, 1, 200),
+    ("GET", "/api/events/{hot}/registrations", "admin", 2, 200),
+    ("GET", "/api/events/{hot}/registrations/export?format=csv", "admin", 2, 200),
+    ("GET", "/api/comments/event/{hot}", None, 3, 200),
+    ("GET", "/api/comments/event/{hot}?cursor=", None, 3, 200),
+    ("GET", "/api/registrations/my-registrations", "member", 1, 200),
+    ("GET", "/api/registrations/my-registrations?cursor=", "member", 1, 200),
+    ("GET", "/api/registrations/event/{hot}/waitlist", "waitlisted", 2, 200),
+    ("GET", "/api/registrations/status?event_ids={hot},{open},999999", "waitlisted", 1, 200),
+    ("GET", "/api/recommendations/events", "member", 2, 200),
+    ("GET", "/api/recommendations/similar-events/{hot}", None, 3, 200),
+    ("POST", "/api/registrations/", "newcomer", 8, 201),
+    ("DELETE", "/api/registrations/{confirmed}", "admin", 9, 204),
+]
+
+BODIES = {
+    "/api/events/batch": lambda ids: {"ids": [ids["hot"], ids["open"], 999999]},
+    "/api/registrations/": lambda ids: {"event_id": ids["open"]},
+}
+
+def _seed(Session):
+    now = datetime.utcnow()
+    with Session() as db:
+        admin = models.User(email="admin@example.com", full_name="Admin", hashed_password="x",
+                            role=models.UserRole.ADMIN)
+        users = [
+            models.User(email=f"user{i}@example.com", full_name=f"User {i}", hashed_password="x")
+            for i in range(ROWS + 1)
+        ]
+        db.add_all([admin] + users)
+        db.flush()
+
+        events = [
+            models.Event(title=f"Seeded event {i}", description="Seeded", category=["sports", "culture"][i % 2],
+                         location="Hall", start_datetime=now + timedelta(days=i + 1),
+                         end_datetime=now + timedelta(days=i + 1, hours=2), organizer=admin)
+            for i in range(ROWS)
+        ]
+        db.add_all(events)
+        hot, member, newcomer = events[0], users[0], users[ROWS]
+
+        # The hot event is full: the first 20 registrants hold a seat, the rest wait
+        hot.max_participants = 20
+        for i, user in enumerate(users[:ROWS]):
+            waiting = i >= hot.max_participants
+            db.add(models.Registration(
+                user=user, event=hot, registration_date=now - timedelta(minutes=i),
+                status=models.RegistrationStatus.PENDING if waiting else models.RegistrationStatus.CONFIRMED,
+                waitlist_ticket=i - hot.max_participants + 1 if waiting else None,
+            ))
+            db.add(models.Comment(content=f"Comment {i}", rating=1 + i % 5, author=user, event=hot,
+                                  created_at=now - timedelta(minutes=i)))
+        hot.confirmed_count = hot.max_participants
+        hot.waitlist_count = ROWS - hot.max_participants
+        hot.registrations_count = ROWS
+        hot.comments_count = ROWS
+
+        for other in events[1:]:
+            db.add(models.Registration(user=member, event=other, status=models.RegistrationStatus.CONFIRMED))
+            other.registrations_count = other.confirmed_count = 1
+        db.commit()
+
+        confirmed = db.query(models.Registration).filter_by(event_id=hot.id, user_id=users[1].id).one()
+        return {
+            "ids": {"hot": hot.id, "open": events[1].id, "confirmed": confirmed.id},
+            "principals": {
+                "admin": UserPrincipal.from_user(admin),
+                "member": UserPrincipal.from_user(member),
+                "waitlisted": UserPrincipal.from_user(users[ROWS - 1]),
+                "newcomer": UserPrincipal.from_user(newcomer),
+            },
+        }
+
+@pytest.fixture(scope="module")
+def api():
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{os.path.join(scratch, 'budgets.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        install_search_index(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seeded = _seed(Session)
+
+        def scratch_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        def test_user(x_test_user: str = Header(...)):
+            return seeded["principals"][x_test_user]
+
+        app = FastAPI()
+        for module in (event, comment, registration, recommendation):
+            app.include_router(module.router)
+        app.dependency_overrides[get_db] = scratch_db
+        app.dependency_overrides[get_current_user] = test_user
+
+        with TestClient(app) as client:
+            yield client, seeded["ids"]
+        engine.dispose()
+
+@pytest.mark.parametrize("method,path,user,budget,expected", BUDGETS, ids=[f"{m} {p}" for m, p, *_ in BUDGETS])
+def test_endpoint_query_budget(api, query_budget, method, path, user, budget, expected):
+    client, ids = api
+    url = path.format(**ids)
+    headers = {"X-Test-User": user} if user else {}
+    body = BODIES[path](ids) if method == "POST" else None
+    response_cache.response_cache.clear()
+
+    with query_budget(budget, f"{method} {path}"):
+        response = client.request(method, url, headers=headers, json=body)
+    assert response.status_code == expected, response.text
+
+@pytest.mark.parametrize("path", [
+    "/api/events/", "/api/comments/event/{hot}", "/api/registrations/my-registrations"])
+def test_page_size_is_bounded(api, path):
+    client, ids = api
+    url = path.format(**ids)
+    headers = {"X-Test-User": "member"}
+    for query in ("limit=0", "limit=-1", "cursor=&limit=0", "cursor=&limit=-1", "limit=1001", "skip=-1"):
+        assert client.get(f"{url}?{query}", headers=headers).status_code == 422, query
+    assert len(client.get(f"{url}?cursor=&limit=1", headers=headers).json()["items"]) == 1
+    with pytest.raises(ValueError):
+        keyset_paginate(None, [], "", 0)
+
+def test_batch_endpoints_answer_in_request_order(api):
+    client, ids = api
+    batch = client.post("/api/events/batch", json={"ids": [ids["open"], 999999, ids["hot"], ids["open"]],
+                                                   "fields": "card"}).json()
+    assert [item["id"] for item in batch["items"]] == [ids["open"], ids["hot"]]
+    assert batch["missing"] == [999999]
+    assert "description" not in batch["items"][0]
+
+    headers = {"X-Test-User": "waitlisted"}
+    # The budget cases above may have promoted people off the waitlist
+    waitlist = client.get(f"/api/registrations/event/{ids['hot']}/waitlist", headers=headers).json()
+    response = client.get(f"/api/registrations/status?event_ids={ids['open']},999999&event_ids={ids['hot']}",
+                          headers=headers)
+    assert response.json() == [
+        {"event_id": ids["open"], "registration_id": None, "status": None, "waitlist_position": None},
+        {"event_id": 999999, "registration_id": None, "status": None, "waitlist_position": None},
+        {"event_id": ids["hot"], "registration_id": waitlist["registration_id"], "status": "pending",
+         "waitlist_position": waitlist["position"]},
+    ]
+    assert client.get("/api/registrations/status?event_ids=1,x", headers=headers).status_code == 400
@@ -0,0 +1,113 @@
+"""
+The precomputed recommendation model (services/recommendation_model.py)
+and the query fallback of services/recommendation_service.py.
+
+Usage:
+    python -m pytest -q test_recommendations.py
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+from services import recommendation_service
+from services.recommendation_model import Interaction, RecommendationModel, UpcomingEvent
+
+def _model():
+    return RecommendationModel(refresh_seconds=0, half_life_days=90, history_days=365, cache_size=100)
+
+def _seed(db, make_event):
+    now = datetime.utcnow()
+    fan = models.User(email="fan@example.com", full_name="Fan", hashed_password="x")
+    newcomer = models.User(email="new@example.com", full_name="New", hashed_password="x")
+    past = [
+        make_event(title=f"Past {category}", category=category, start_datetime=now - timedelta(days=30))
+        for category in ("sports", "workshop", "culture")
+    ]
+    upcoming = [
+        make_event(title=f"{category} {i}", category=category, start_datetime=now + timedelta(days=days),
+                   registrations_count=count)
+        for i, (category, days, count) in enumerate([
+            ("sports", 5, 0), ("sports", 2, 1), ("workshop", 1, 0), ("culture", 3, 50), ("seminar", 4, 10)])
+    ]
+    db.add(newcomer)
+    db.flush()
+    # sports: registered and attended; workshop: registered long ago; culture: rated 1 star
+    db.add_all([
+        models.Registration(user=fan, event=past[0], status=models.RegistrationStatus.ATTENDED, attended=True,
+                            registration_date=now - timedelta(days=40)),
+        models.Registration(user=fan, event=past[1], status=models.RegistrationStatus.CONFIRMED,
+                            registration_date=now - timedelta(days=300)),
+        models.Registration(user=fan, event=past[2], status=models.RegistrationStatus.CANCELLED,
+                            registration_date=now - timedelta(days=35)),
+        models.Comment(author=fan, event=past[2], content="Boring", rating=1, created_at=now - timedelta(days=29)),
+    ])
+    db.commit()
+    return fan, newcomer, {event.title: event.id for event in upcoming}
+
+def test_falls_back_to_queries_until_built(monkeypatch, db, make_event):
+    fan, newcomer, ids = _seed(db, make_event)
+    monkeypatch.setattr(recommendation_service, "recommendation_model", _model())
+    recommended = recommendation_service.recommend_events(db, fan.id, limit=3)
+    assert [event.id for event in recommended] == [ids["workshop 2"], ids["sports 1"], ids["culture 3"]]
+
+def test_ranks_by_affinity_then_popularity(db, make_event):
+    pytest.importorskip("numpy")
+    fan, newcomer, ids = _seed(db, make_event)
+    model = _model()
+    model.rebuild(db)
+
+    # Sports (recent, attended) first. The workshop registration is old enough to count less than
+    # the seminar's popularity. Culture was rated down, below its popularity.
+    assert model.recommend(db, fan.id, 5) == [
+        ids["sports 1"], ids["sports 0"], ids["seminar 4"], ids["workshop 2"], ids["culture 3"]]
+    # No history: by popularity, soonest first among equals
+    assert model.recommend(db, newcomer.id, 5) == [
+        ids["culture 3"], ids["seminar 4"], ids["sports 1"], ids["workshop 2"], ids["sports 0"]]
+    assert model.recommend(db, fan.id, 2) == [ids["sports 1"], ids["sports 0"]]
+    stats = model.stats()
+    assert stats["users"] == 1 and stats["events"] == 5 and stats["misses"] == 3
+
+def test_incremental_updates_and_cache(db, make_event):
+    pytest.importorskip("numpy")
+    fan, newcomer, ids = _seed(db, make_event)
+    model = _model()
+    model.rebuild(db)
+    model.recommend(db, newcomer.id, 1)
+    assert model.recommend(db, newcomer.id, 1) == [ids["culture 3"]] and model.hits == 1
+
+    # A registration, committed and reported, reaches the user's next request
+    db.add(models.Registration(user_id=newcomer.id, event_id=ids["seminar 4"],
+                               status=models.RegistrationStatus.CONFIRMED, registration_date=datetime.utcnow()))
+    db.commit()
+    model.invalidate_user(newcomer.id)
+    assert model.recommend(db, newcomer.id, 1) == [ids["seminar 4"]]
+
+    # Event writes: a new category, a move to another one, a deletion
+    now = datetime.utcnow()
+    model.add_event(models.Event(id=1000, category="robotics", start_datetime=now + timedelta(days=1),
+                                 registrations_count=0))
+    event = db.get(models.Event, ids["sports 1"])
+    event.category = "seminar"
+    model.add_event(event)
+    model.remove_event(ids["seminar 4"])
+    assert model.recommend(db, newcomer.id, 2) == [ids["sports 1"], ids["culture 3"]]
+    assert 1000 in model.recommend(db, fan.id, 10)
+
+def test_weights_decay_with_age():
+    np = pytest.importorskip("numpy")
+    model = _model()
+    now = datetime.utcnow()
+    start = now + timedelta(days=1)
+    model.load(
+        [UpcomingEvent(1, "old", start, 0), UpcomingEvent(2, "new", start, 0)],
+        [Interaction(7, "old", now - timedelta(days=180), 3.0), Interaction(7, "new", now, 1.0)],
+    )
+    # 3 registrations two half-lives ago weigh 3/4 of one today
+    row = model._model.affinity[model._model.users[7]]
+    assert np.isclose(row[model._model.categories["old"]] / row[model._model.categories["new"]], 0.75, rtol=1e-3)
+    assert model.recommend(None, 7, 2) == [2, 1]
+
+if __name__ == "__main__":
+    test_weights_decay_with_age()
+    print("✅ recommendation tests passed")
@@ -0,0 +1,167 @@
+"""
+The tagged response cache (services/response_cache.py): tag invalidation,
+the generation check that keeps stale results out, and the tags event
+writes and author renames invalidate.
+
+Usage:
+    python -m pytest -q test_response_cache.py
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import get_db
+from routes import auth, comment
+from routes import event as event_routes
+from security import get_current_user
+from services import response_cache
+from services.response_cache import (
+    EVENT_LISTS, MemoryBackend, ResponseCache, author_tag, cached_response, category_tag, comments_tag,
+    event_tag,
+)
+from services.user_cache import UserPrincipal
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A fresh per-process cache in place of the global one."""
+    fresh = ResponseCache(MemoryBackend(max_entries=3), ttl=60)
+    monkeypatch.setattr(response_cache, "response_cache", fresh)
+    return fresh
+
+def _store(cache, key, *tags):
+    cache.set(key, key.encode(), None, tags, cache.backend.generation())
+
+def test_invalidation_drops_only_tagged_entries(cache):
+    _store(cache, "list", EVENT_LISTS, event_tag(1), event_tag(2))
+    _store(cache, "detail", event_tag(1))
+    _store(cache, "similar", category_tag("Sports"))
+
+    response_cache.invalidate(event_tag(2))
+    assert cache.get("list") is None and cache.get("detail")[0] == b"detail"
+    response_cache.invalidate(category_tag(" sports "))
+    assert cache.get("similar") is None
+    assert cache.stats()["invalidated_entries"] == 2
+
+    # The least recently used entry goes first once the cache is full
+    _store(cache, "a", comments_tag(1))
+    _store(cache, "b", comments_tag(1))
+    _store(cache, "c", comments_tag(1))
+    assert cache.get("detail") is None and cache.backend.size() == 3
+    response_cache.invalidate(comments_tag(1))
+    assert cache.backend.size() == 0
+
+def test_entries_expire():
+    cache = ResponseCache(MemoryBackend(max_entries=10), ttl=0.05)
+    _store(cache, "list", EVENT_LISTS)
+    assert cache.get("list") is not None
+    time.sleep(0.06)
+    assert cache.get("list") is None and cache.backend.size() == 0
+
+def test_results_read_before_an_invalidation_are_not_cached(cache):
+    calls = []
+
+    @cached_response(dict, tags=lambda params, result: [event_tag(params["event_id"])])
+    def handler(event_id: int):
+        calls.append(event_id)
+        if len(calls) == 1:
+            # A write commits and invalidates while this request is still reading
+            response_cache.invalidate(event_tag(99))
+        return {"id": event_id, "calls": len(calls)}
+
+    assert handler(event_id=1).headers["x-cache"] == "MISS"
+    assert cache.backend.size() == 0
+    assert handler(event_id=1).body == b'{"id":1,"calls":2}'
+    hit = handler(event_id=1)
+    assert hit.headers["x-cache"] == "HIT" and hit.body == b'{"id":1,"calls":2}' and len(calls) == 2
+
+    # Clearing bumps the generation too
+    generation = cache.backend.generation()
+    cache.clear()
+    assert cache.backend.generation() == generation + 1 and cache.backend.size() == 0
+
+def test_deleting_an_event_invalidates_lists_and_its_category(cache, db, make_event):
+    admin = models.User(email="admin@example.com", full_name="Admin", hashed_password="x",
+                        role=models.UserRole.ADMIN)
+    doomed = make_event(title="Doomed", category="Sports", organizer=admin)
+    db.commit()
+
+    # A list page and a similar-events page the event is not on, and an unrelated entry
+    _store(cache, "page-2", EVENT_LISTS, event_tag(1000))
+    _store(cache, "similar", category_tag("sports"), event_tag(1001))
+    _store(cache, "culture", category_tag("culture"))
+    event_routes.delete_event(doomed.id, db=db, current_user=UserPrincipal.from_user(admin))
+
+    assert cache.get("page-2") is None and cache.get("similar") is None
+    assert cache.get("culture") is not None
+    assert db.query(models.Event).count() == 0
+
+def _client(sessions, principal):
+    def scratch_db():
+        with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    for module in (event_routes, comment, auth):
+        app.include_router(module.router)
+    app.dependency_overrides[get_db] = scratch_db
+    app.dependency_overrides[get_current_user] = lambda: principal
+    return TestClient(app)
+
+def test_renaming_an_author_refreshes_comment_threads(cache, db, make_event):
+    author = models.User(email="author@example.com", full_name="Old Name", hashed_password="x")
+    event = make_event(title="Talk", category="seminar", organizer=author)
+    db.add(models.Comment(content="Nice", rating=5, author=author, event=event,
+                          created_at=datetime.utcnow() - timedelta(days=1),
+                          updated_at=datetime.utcnow() - timedelta(days=1)))
+    db.commit()
+    event_id, principal = event.id, UserPrincipal.from_user(author)
+    sessions = sessionmaker(bind=db.get_bind())
+    client = _client(sessions, principal)
+
+    first = client.get(f"/api/comments/event/{event_id}")
+    assert first.headers["x-cache"] == "MISS" and first.json()[0]["author"]["full_name"] == "Old Name"
+    assert client.get(f"/api/comments/event/{event_id}").headers["x-cache"] == "HIT"
+
+    time.sleep(0.01)
+    assert client.put("/api/auth/me", json={"email": "author@example.com", "full_name": "New Name"}).status_code == 200
+    assert cache.backend.size() == 0
+
+    renamed = client.get(f"/api/comments/event/{event_id}", headers={"If-None-Match": first.headers["etag"]})
+    assert renamed.status_code == 200 and renamed.json()[0]["author"]["full_name"] == "New Name"
+    assert renamed.headers["etag"] != first.headers["etag"]
+    assert client.get(f"/api/comments/event/{event_id}",
+                      headers={"If-None-Match": renamed.headers["etag"]}).status_code == 304
+
+    # Another user's rename leaves the thread cached
+    response_cache.invalidate(author_tag(principal.id + 1))
+    assert cache.backend.size() == 1
+
+def test_deletions_are_never_answered_with_304(cache, db, make_event):
+    admin = models.User(email="admin@example.com", full_name="Admin", hashed_password="x",
+                        role=models.UserRole.ADMIN)
+    older, newer = [make_event(title=title, category="seminar", organizer=admin) for title in ("Older", "Newer")]
+    comments = [models.Comment(content=f"Comment {i}", rating=5, author=admin, event=newer) for i in range(2)]
+    db.add_all(comments)
+    db.commit()
+    older_id, newer_id, comment_id = older.id, newer.id, comments[0].id
+    client = _client(sessionmaker(bind=db.get_bind()), UserPrincipal.from_user(admin))
+
+    # Deleting a row moves neither max(updated_at), so only the ETag may validate
+    listing = client.get("/api/events/")
+    thread = client.get(f"/api/comments/event/{newer_id}")
+    assert "last-modified" not in listing.headers and "last-modified" not in thread.headers
+    assert client.delete(f"/api/events/{older_id}").status_code == 204
+    assert client.delete(f"/api/comments/{comment_id}").status_code == 204
+    since = {"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+    assert len(client.get("/api/events/", headers=since).json()) == 1
+    assert len(client.get(f"/api/comments/event/{newer_id}", headers=since).json()) == 1
+    assert client.get("/api/events/", headers={"If-None-Match": listing.headers["etag"]}).status_code == 200
+
+    # An unknown event has no validators to match, only a 404
+    empty = client.get(f"/api/comments/event/{older_id}", headers={"If-None-Match": "*"})
+    assert empty.status_code == 404
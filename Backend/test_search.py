@@ -0,0 +1,39 @@
+"""
+Keyset pagination of full-text search results (services/search.py).
+
+Usage:
+    python -m pytest -q test_search.py
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import models
+from services.pagination import _after, keyset_paginate
+from services.search import event_search_query, install_search_index
+
+def test_postgres_rank_is_double_precision_everywhere():
+    db = Session(bind=create_engine("postgresql://localhost/unused"))
+    search = event_search_query(db, ["jazz"])
+    keys = [(search.rank, True), (models.Event.id, False)]
+    statement = search.query.filter(_after(keys, [0.0607927, 3])).order_by(search.rank.desc()).statement
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    # Selected, compared with the cursor and ordered by as a double: a real would not match the
+    # cursor's JSON value and would repeat the boundary row
+    assert sql.count("ts_rank(") == sql.count("CAST(ts_rank(") == sql.count("AS FLOAT(53))") == 4
+
+def test_pages_of_equal_ranks_neither_repeat_nor_skip_rows(db, make_event):
+    install_search_index(db.get_bind())
+    for i in range(8):
+        make_event(title=f"Jazz night {i}" if i % 3 else "Jazz jazz night", description="Live music",
+                   category="culture")
+    db.commit()
+
+    search = event_search_query(db, ["jazz"])
+    keys = [(search.rank, True), (models.Event.id, False)]
+    seen, cursor = [], ""
+    while cursor is not None:
+        rows, cursor = keyset_paginate(search.query, keys, cursor, 3, key_getter=lambda row: [row[1], row[0].id])
+        seen += [(row[1], row[0].id) for row in rows]
+    assert len(seen) == 8 and len({event_id for _, event_id in seen}) == 8
+    assert seen == sorted(seen, key=lambda hit: (-hit[0], hit[1]))
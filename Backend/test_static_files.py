@@ -0,0 +1,116 @@
+"""
+Caching, conditional, range and negotiated responses of /static
+(services/static_files.py).
+
+Usage:
+    python -m pytest -q test_static_files.py
+"""
+import gzip
+import os
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.static_files import IMMUTABLE, REVALIDATE, CachedStaticFiles, parse_range, precompress
+
+DIGEST = "ab" * 32
+
+def _client(directory):
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=directory), name="static")
+    return TestClient(app)
+
+def _write(directory, name, content):
+    path = os.path.join(directory, *name.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None and parse_range("items=0-1", 100) is None
+    for unsatisfiable in ("bytes=100-", "bytes=5-2", "bytes=-0"):
+        try:
+            parse_range(unsatisfiable, 100)
+        except ValueError:
+            continue
+        raise AssertionError(unsatisfiable)
+
+def test_content_addressed_files_are_immutable():
+    with tempfile.TemporaryDirectory() as directory:
+        key = f"event_images/ab/ab/{DIGEST}-card.jpg"
+        _write(directory, key, b"\xff\xd8\xff" + bytes(1000))
+        _write(directory, "event_images/event_1_20250525131435.jpeg", b"\xff\xd8\xff legacy")
+        _write(directory, "event_images/.staging/upload-x", b"partial")
+        client = _client(directory)
+
+        response = client.get(f"/static/{key}")
+        assert response.status_code == 200 and response.headers["content-type"] == "image/jpeg"
+        assert response.headers["cache-control"] == IMMUTABLE
+        assert response.headers["etag"] == f'"{DIGEST}-card.jpg"' and "vary" not in response.headers
+
+        revalidated = client.get(f"/static/{key}", headers={"If-None-Match": f'W/"x", {response.headers["etag"]}'})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert revalidated.headers["cache-control"] == IMMUTABLE
+
+        legacy = client.get("/static/event_images/event_1_20250525131435.jpeg")
+        assert legacy.headers["cache-control"] == REVALIDATE and legacy.headers["etag"].startswith('"')
+        assert client.get("/static/event_images/event_1_20250525131435.jpeg",
+                          headers={"If-Modified-Since": legacy.headers["last-modified"]}).status_code == 304
+
+        assert client.get("/static/event_images/.staging/upload-x").status_code == 404
+
+def test_byte_ranges():
+    with tempfile.TemporaryDirectory() as directory:
+        content = bytes(range(256)) * 1000
+        _write(directory, "video.bin", content)
+        client = _client(directory)
+        etag = client.head("/static/video.bin").headers["etag"]
+
+        partial = client.get("/static/video.bin", headers={"Range": "bytes=1000-70999"})
+        assert partial.status_code == 206 and partial.content == content[1000:71000]
+        assert partial.headers["content-range"] == f"bytes 1000-70999/{len(content)}"
+        assert partial.headers["content-length"] == "70000"
+
+        assert client.get("/static/video.bin", headers={"Range": "bytes=-5"}).content == content[-5:]
+        assert client.get("/static/video.bin", headers={"Range": "bytes=0-1", "If-Range": etag}).status_code == 206
+        assert client.get("/static/video.bin", headers={"Range": "bytes=0-1", "If-Range": '"old"'}).status_code == 200
+
+        out_of_bounds = client.get("/static/video.bin", headers={"Range": f"bytes={len(content)}-"})
+        assert out_of_bounds.status_code == 416
+        assert out_of_bounds.headers["content-range"] == f"bytes */{len(content)}"
+
+def test_negotiates_webp_and_precompressed_siblings():
+    with tempfile.TemporaryDirectory() as directory:
+        _write(directory, f"event_images/ab/ab/{DIGEST}-card.jpg", b"jpeg")
+        _write(directory, f"event_images/ab/ab/{DIGEST}-card.webp", b"webp")
+        _write(directory, "app.svg", b"<svg>" + b"<g/>" * 1000 + b"</svg>")
+        assert precompress(directory) == 1  # Only the svg: images are not compressible
+        client = _client(directory)
+
+        url = f"/static/event_images/ab/ab/{DIGEST}-card.jpg"
+        webp = client.get(url, headers={"Accept": "image/avif,image/webp,*/*;q=0.8"})
+        assert webp.content == b"webp" and webp.headers["content-type"] == "image/webp"
+        assert webp.headers["etag"] == f'"{DIGEST}-card.jpg+webp"' and webp.headers["vary"] == "Accept"
+        jpeg = client.get(url, headers={"Accept": "image/webp;q=0, image/*"})
+        assert jpeg.content == b"jpeg" and jpeg.headers["etag"] == f'"{DIGEST}-card.jpg"'
+
+        compressed = client.get("/static/app.svg", headers={"Accept-Encoding": "gzip, deflate"})
+        assert compressed.headers["content-encoding"] == "gzip" and compressed.headers["vary"] == "Accept-Encoding"
+        assert compressed.headers["content-type"].startswith("image/svg+xml")
+        assert compressed.content.startswith(b"<svg>")  # Decoded by the client
+        identity = client.get("/static/app.svg", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identity.headers and identity.headers["etag"] != compressed.headers["etag"]
+        with open(os.path.join(directory, "app.svg.gz"), "rb") as file:
+            assert gzip.decompress(file.read()) == identity.content
+
+if __name__ == "__main__":
+    test_parse_range()
+    test_content_addressed_files_are_immutable()
+    test_byte_ranges()
+    test_negotiates_webp_and_precompressed_siblings()
+    print("✅ static file tests passed")
@@ -0,0 +1,140 @@
+"""
+The in-memory manifest of static/ (services/static_manifest.py), the
+/static responses it feeds and the /api/static-test listing served from it.
+
+Usage:
+    python -m pytest -q test_static_manifest.py
+"""
+import hashlib
+import io
+import os
+import tempfile
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import static_test
+from services import images
+from services.image_store import LocalImageStorage
+from services.images import save_upload
+from services.static_files import CachedStaticFiles
+from services.static_manifest import StaticManifest
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+def _write(directory, name, content):
+    path = os.path.join(directory, *name.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+    return path
+
+def test_manifest_follows_the_image_store():
+    with tempfile.TemporaryDirectory() as directory:
+        _write(directory, "event_images/event_1_20250525131435.jpeg", b"\xff\xd8\xff legacy")
+        _write(directory, "event_images/.staging/upload-x", b"partial")
+        manifest = StaticManifest(directory)
+        manifest.build()
+        store = LocalImageStorage(os.path.join(directory, "event_images"), "/static/event_images")
+        manifest.follow(store)
+
+        legacy = manifest.get("event_images/event_1_20250525131435.jpeg")
+        assert legacy.size == 10 and legacy.digest == hashlib.sha256(b"\xff\xd8\xff legacy").hexdigest()
+        assert [entry.path for entry in manifest.list()] == ["event_images/event_1_20250525131435.jpeg"]
+
+        stored = save_upload(io.BytesIO(PNG_HEAD + b"new"), store)
+        entry = manifest.get(f"event_images/{stored.key}")
+        assert entry.digest == stored.digest and entry.size == len(PNG_HEAD) + 3
+        card = images.variant_keys(stored.digest)["card"]["webp"]
+        _write(directory, "variant", b"webp")
+        store.put(card, os.path.join(directory, "variant"))
+        assert manifest.variants(f"event_images/{stored.key}") == [f"event_images/{card}"]
+        assert manifest.describe(entry)["variants"] == [f"/{directory}/event_images/{card}"]
+
+        store.delete(stored.key)
+        assert manifest.get(f"event_images/{stored.key}") is None
+        assert [entry.path for entry in manifest.list()] == sorted([
+            "event_images/event_1_20250525131435.jpeg", f"event_images/{card}"])
+        manifest.forget("event_images")
+        assert manifest.list() == [] and manifest.stats()["files"] == 0
+
+def test_paging():
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(7):
+            _write(directory, f"files/{i}.txt", b"x" * i)
+        manifest = StaticManifest(directory)
+        manifest.build()
+        assert [entry.path for entry in manifest.list(skip=2, limit=2)] == ["files/2.txt", "files/3.txt"]
+        assert [entry.path for entry in manifest.list(after="files/5.txt")] == ["files/6.txt"]
+
+        app = FastAPI()
+        app.include_router(static_test.router)
+        client = TestClient(app)
+        original, static_test.static_manifest = static_test.static_manifest, manifest
+        try:
+            paths, cursor = [], ""
+            while cursor is not None:
+                page = client.get("/api/static-test/", params={"cursor": cursor, "limit": 3}).json()
+                paths += [item["path"] for item in page["items"]]
+                cursor = page["next_cursor"]
+            assert paths == [f"/{directory}/files/{i}.txt" for i in range(7)]
+            assert len(client.get("/api/static-test/", params={"skip": 5}).json()) == 2
+            assert client.get("/api/static-test/", params={"cursor": "!"}).status_code == 400
+
+            assert client.get("/api/static-test/check/files/3.txt").json()["size"] == 3
+            assert client.get("/api/static-test/check/files/9.txt").json()["exists"] is False
+        finally:
+            static_test.static_manifest = original
+
+def test_static_files_use_the_manifest():
+    with tempfile.TemporaryDirectory() as directory:
+        _write(directory, "banner.png", PNG_HEAD + b"png")
+        manifest = StaticManifest(directory)
+        app = FastAPI()
+        app.mount("/static", CachedStaticFiles(directory=directory, manifest=manifest), name="static")
+        client = TestClient(app)
+        accept_webp = {"Accept": "image/webp"}
+
+        # Not built yet: siblings are looked up on disk
+        assert "vary" not in client.get("/static/banner.png", headers=accept_webp).headers
+        manifest.build()
+        png = client.get("/static/banner.png", headers=accept_webp)
+        assert png.headers["etag"] == f'"{hashlib.sha256(PNG_HEAD + b"png").hexdigest()[:32]}"'
+
+        # A sibling the manifest has not seen is not negotiated...
+        _write(directory, "banner.webp", b"webp")
+        assert client.get("/static/banner.png", headers=accept_webp).content == PNG_HEAD + b"png"
+        manifest.refresh("banner.webp")
+        webp = client.get("/static/banner.png", headers=accept_webp)
+        assert webp.content == b"webp" and webp.headers["vary"] == "Accept"
+
+        # ...while a requested file that changed on disk is refreshed on the spot
+        time.sleep(0.01)
+        _write(directory, "banner.png", PNG_HEAD + b"changed")
+        changed = client.get("/static/banner.png", headers={"Accept": "image/png"})
+        assert changed.content == PNG_HEAD + b"changed" and changed.headers["etag"] != png.headers["etag"]
+        assert manifest.get("banner.png").size == len(PNG_HEAD) + 7
+
+def test_watcher_picks_up_other_writers():
+    pytest.importorskip("inotify_simple")
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = StaticManifest(directory)
+        manifest.build()
+        assert manifest.watch()
+        try:
+            time.sleep(0.2)
+            _write(directory, "event_images/ab/cd/new.txt", b"new")
+            deadline = time.monotonic() + 5
+            while manifest.get("event_images/ab/cd/new.txt") is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert manifest.get("event_images/ab/cd/new.txt").size == 3
+        finally:
+            manifest.stop()
+
+if __name__ == "__main__":
+    test_manifest_follows_the_image_store()
+    test_paging()
+    test_static_files_use_the_manifest()
+    print("✅ static manifest tests passed")
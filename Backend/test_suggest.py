@@ -0,0 +1,109 @@
+"""
+The autocomplete index (services/suggest.py): prefix and typo matching,
+accent folding, past events, and writes made during a rebuild.
+
+Usage:
+    python -m pytest -q test_suggest.py
+"""
+from datetime import datetime, timedelta
+
+from services.suggest import SuggestIndex, Suggestion, _Index, normalize
+
+NOW = datetime(2030, 1, 1, 12, 0)
+
+def _index(*events):
+    index = _Index()
+    index.load(Suggestion(event_id, title, location, NOW + timedelta(days=days))
+               for event_id, title, location, days in events)
+    return index
+
+def _search(index, prefix, limit=10, fuzzy=False):
+    return [hit.id for hit in index.search(normalize(prefix), limit, NOW, fuzzy)]
+
+EVENTS = [
+    (1, "Python workshop", "Lab 1", 3),
+    (2, "Python for data science", "Auditorium", 1),
+    (3, "Pottery class", "Studio", 2),
+    (4, "Jazz night", "Café Central", 4),
+    (5, "Workshop on writing", "Library", 5),
+]
+
+def test_prefixes_match_soonest_first():
+    index = _index(*EVENTS)
+    assert _search(index, "py") == [2, 1]
+    assert _search(index, "p") == [2, 3, 1]
+    # Earlier words must match whole, the last one as a prefix, in the title or the location
+    assert _search(index, "python work") == [1]
+    assert _search(index, "pyth work") == []
+    assert _search(index, "workshop lib") == [5]
+    assert _search(index, "py", limit=1) == [2]
+    assert _search(index, "ruby") == []
+
+def test_typos_within_one_or_two_edits():
+    index = _index(*EVENTS)
+    # One edit from 4 letters on: a swap, a missing letter, a wrong letter
+    assert _search(index, "pyhton", fuzzy=True) == [2, 1]
+    assert _search(index, "jaz nigt", fuzzy=True) == []  # "jaz" is too short to be fuzzy
+    assert _search(index, "jazz nigt", fuzzy=True) == [4]
+    assert _search(index, "pottrey", fuzzy=True) == [3]
+    # Two edits from 7 letters on, but not from 4
+    assert _search(index, "wrkshoq", fuzzy=True) == [1, 5]
+    assert _search(index, "pyxxon", fuzzy=True) == []
+    assert _search(index, "pyhton", fuzzy=False) == []
+
+    # Exact matches rank before typo matches, whatever the date
+    index = _index((1, "Python", "Lab", 5), (2, "Pythin", "Lab", 1))
+    assert _search(index, "python", fuzzy=True) == [1, 2]
+
+def test_accents_and_case_are_folded():
+    index = _index(*EVENTS, (6, "Crème brûlée tasting", "Café", 6))
+    assert _search(index, "CAFE") == [4, 6]
+    assert _search(index, "café cent") == [4]
+    assert _search(index, "creme brulee") == [6]
+    assert normalize("Ärger im Café!") == ["arger", "im", "cafe"]
+
+def test_past_events_are_excluded():
+    index = _index(*EVENTS, (6, "Python meetup", "Lab 2", -1))
+    assert _search(index, "python") == [2, 1]
+    assert _search(index, "meetup") == []
+
+def test_updates_and_removals():
+    index = _index(*EVENTS)
+    index.add(Suggestion(3, "Python pottery", "Studio", NOW + timedelta(days=2)))
+    assert _search(index, "python") == [2, 3, 1]
+    index.remove(2)
+    index.remove(2)
+    assert _search(index, "python") == [3, 1]
+    assert "data" not in index.words and "science" not in index.postings
+
+def test_writes_during_a_rebuild_are_replayed(db, make_event):
+    start = datetime.utcnow() + timedelta(days=1)
+    events = [make_event(title=title, start_datetime=start + timedelta(hours=i))
+              for i, title in enumerate(["Chess club", "Chess final", "Chess open"])]
+    db.commit()
+
+    suggest_index = SuggestIndex(refresh_seconds=0)
+    load = suggest_index.load
+
+    def load_after_concurrent_writes(rows):
+        # Committed after the rebuild read its rows: one event deleted, one renamed
+        suggest_index.remove(events[0].id)
+        events[1].title = "Go final"
+        suggest_index.add(events[1])
+        load(rows)
+
+    suggest_index.load = load_after_concurrent_writes
+    suggest_index.rebuild(db)
+    assert [hit.id for hit in suggest_index.suggest("chess", 10)] == [events[2].id]
+    assert [hit.title for hit in suggest_index.suggest("go", 10)] == ["Go final"]
+    assert suggest_index.stats()["events"] == 2
+
+    # Writes after the rebuild go straight to the index
+    suggest_index.remove(events[2].id)
+    assert suggest_index.suggest("chess", 10) == []
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test) and not test.__code__.co_argcount:  # fixtures: pytest only
+            test()
+            print(f"✅ {name}")
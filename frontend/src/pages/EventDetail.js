@@ -97,6 +97,8 @@ const EventDetail = () => {
   const isRegistered = registrationStatus === 'registered';
   const isRegistrationUpcoming = registrationStatus === 'upcoming';
   const isRegistrationClosed = registrationStatus === 'closed';
+  // Variant URLs may already be absolute (a CDN); local ones are served by the backend
+  const imageSrc = (url) => (url.startsWith('http') ? url : `${config.API_URL.replace('/api', '')}${url.startsWith('/') ? '' : '/'}${url}`);
 
   return (
     <div className="min-h-screen bg-gray-50">
@@ -108,17 +110,25 @@ const EventDetail = () => {
       <div className="relative h-64 md:h-96 w-full overflow-hidden bg-gray-200">
         {event.image_url ? (
           <>
-            <img 
-              src={`${config.API_URL.replace('/api', '')}${event.image_url.startsWith('/') ? '' : '/'}${event.image_url}`}
-              alt={event.title}
-              className="w-full h-full object-cover"
-              onError={(e) => {
-                console.error('Error loading image:', event.image_url);
-                e.target.onerror = null;
-                e.target.src = 'https://via.placeholder.com/1200x400?text=Event+Image+Not+Found';
-              }}
-              loading="lazy"
-            />
+            <picture className="contents">
+              {event.image_variants?.detail?.webp && (
+                <source srcSet={imageSrc(event.image_variants.detail.webp)} type="image/webp" />
+              )}
+              <img 
+                src={imageSrc(event.image_variants?.detail?.jpeg || event.image_url)}
+                alt={event.title}
+                className="w-full h-full object-cover"
+                onError={(e) => {
+                  console.error('Error loading image:', event.image_url);
+                  const placeholder = 'https://via.placeholder.com/1200x400?text=Event+Image+Not+Found';
+                  e.target.onerror = null;
+                  // A <picture> shows its matching <source>, whatever the <img> src says
+                  e.target.parentNode.querySelectorAll('source').forEach((source) => { source.srcset = placeholder; });
+                  e.target.src = placeholder;
+                }}
+                loading="lazy"
+              />
+            </picture>
             {/* Overlay with title when image loads */}
             <div className="absolute inset-0 bg-black/30 flex items-center justify-center">
               <div className="text-center text-white px-4">
@@ -138,8 +138,11 @@ const Events = () => {
   
   // Handle image error
   const handleImageError = (e) => {
+    const placeholder = 'https://via.placeholder.com/400x225?text=Event+Image+Not+Available';
     e.target.onerror = null; // Prevent infinite loop if placeholder also fails
-    e.target.src = 'https://via.placeholder.com/400x225?text=Event+Image+Not+Available';
+    // A <picture> shows its matching <source>, whatever the <img> src says
+    e.target.parentNode.querySelectorAll('source').forEach((source) => { source.srcset = placeholder; });
+    e.target.src = placeholder;
   };
   
   // Process image URL
@@ -270,7 +273,8 @@ const Events = () => {
           {filteredEvents.length > 0 ? (
             <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-8">
               {filteredEvents.map((event, index) => {
-                const imageUrl = getImageUrl(event.image_url || event.image);
+                const imageUrl = getImageUrl(event.image_variants?.card?.jpeg || event.image_url || event.image);
+                const webpUrl = event.image_variants?.card?.webp && getImageUrl(event.image_variants.card.webp);
                 
                 return (
                   <motion.div
@@ -283,12 +287,15 @@ const Events = () => {
                   >
                     <div className="relative h-48 overflow-hidden">
                       {imageUrl ? (
-                        <img
-                          src={imageUrl}
-                          alt={event.title || 'Event'}
-                          onError={handleImageError}
-                          className="w-full h-full object-cover transition-transform duration-500 hover:scale-110"
-                        />
+                        <picture className="contents">
+                          {webpUrl && <source srcSet={webpUrl} type="image/webp" />}
+                          <img
+                            src={imageUrl}
+                            alt={event.title || 'Event'}
+                            onError={handleImageError}
+                            className="w-full h-full object-cover transition-transform duration-500 hover:scale-110"
+                          />
+                        </picture>
                       ) : (
                         <div className="w-full h-full bg-gradient-to-r from-yellow-100 to-blue-100 flex items-center justify-center">
                           <span className="text-gray-400">No Image Available</span>
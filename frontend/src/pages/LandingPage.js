@@ -147,8 +147,11 @@ const LandingPage = () => {
   
   // Handle image error
   const handleImageError = (e) => {
+    const placeholder = 'https://via.placeholder.com/400x225?text=Event+Image+Not+Available';
     e.target.onerror = null; // Prevent infinite loop if placeholder also fails
-    e.target.src = 'https://via.placeholder.com/400x225?text=Event+Image+Not+Available';
+    // A <picture> shows its matching <source>, whatever the <img> src says
+    e.target.parentNode.querySelectorAll('source').forEach((source) => { source.srcset = placeholder; });
+    e.target.src = placeholder;
   };
 
   // Get the next upcoming event for the countdown
@@ -257,12 +260,17 @@ const LandingPage = () => {
                         onClick={() => navigate(`/events/${event.id}`)}
                       >
                         <div className="relative h-48 overflow-hidden">
-                          <img
-                            src={getImageUrl(event.image_url || event.image)}
-                            alt={event.title || 'Event'}
-                            className="w-full h-full object-cover transition-transform duration-500 hover:scale-110"
-                            onError={handleImageError}
-                          />
+                          <picture className="contents">
+                            {event.image_variants?.card?.webp && (
+                              <source srcSet={getImageUrl(event.image_variants.card.webp)} type="image/webp" />
+                            )}
+                            <img
+                              src={getImageUrl(event.image_variants?.card?.jpeg || event.image_url || event.image)}
+                              alt={event.title || 'Event'}
+                              className="w-full h-full object-cover transition-transform duration-500 hover:scale-110"
+                              onError={handleImageError}
+                            />
+                          </picture>
                           {(!event.price || event.price === 0) && (
                             <div className="absolute top-3 right-3 bg-green-500 text-white text-xs font-bold px-2 py-1 rounded-full">
                               FREE